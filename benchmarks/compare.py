@@ -0,0 +1,69 @@
+"""Compare two benchmark reports produced by benchmarks/run.py or benchmarks/startup.py.
+
+Prints latency percentiles and throughput per scenario and route side by
+side, and exits non-zero when a route regressed beyond --threshold.
+
+    python benchmarks/compare.py base.json head.json --threshold 0.15
+"""
+import argparse
+import json
+import sys
+from typing import Dict, Any, List, Tuple
+
+# Metric, and whether a higher value is worse
+METRICS: List[Tuple[str, bool]] = [
+    ("p50_ms", True),
+    ("p95_ms", True),
+    ("p99_ms", True),
+    ("rps", False)
+]
+
+def _change(base: float, head: float) -> float:
+    return (head - base) / base if base else 0.0
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the comparison and return the regressions found."""
+    regressions = []
+    print(f"base {base.get('commit') or '?'}  ->  head {head.get('commit') or '?'}")
+    for scenario, head_result in head["scenarios"].items():
+        base_routes = base["scenarios"].get(scenario, {}).get("routes", {})
+        print(f"\n{scenario}")
+        for route, head_stats in head_result["routes"].items():
+            base_stats = base_routes.get(route)
+            if base_stats is None:
+                print(f"  {route}: new route")
+                continue
+            cells = []
+            for metric, higher_is_worse in METRICS:
+                if metric not in base_stats or metric not in head_stats:
+                    continue
+                change = _change(base_stats[metric], head_stats[metric])
+                cells.append(f"{metric} {base_stats[metric]:>9} -> {head_stats[metric]:>9} ({change:+.1%})")
+                if (change if higher_is_worse else -change) > threshold:
+                    regressions.append(f"{scenario} {route} {metric} {change:+.1%}")
+            if head_stats["errors"] > base_stats["errors"]:
+                regressions.append(f"{scenario} {route} errors {base_stats['errors']} -> {head_stats['errors']}")
+            print(f"  {route}")
+            for cell in cells:
+                print(f"      {cell}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative change counted as a regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base_report = json.load(f)
+    with open(args.head) as f:
+        head_report = json.load(f)
+
+    found = compare(base_report, head_report, args.threshold)
+    if found:
+        print("\nRegressions:")
+        for regression in found:
+            print(f"  {regression}")
+        sys.exit(1)
@@ -0,0 +1,193 @@
+"""Fake Anthropic Messages API for local load and failure testing.
+
+Serves `POST /v1/messages` (plain and streaming) with injectable latency,
+token rate, error responses and stalled streams. Point the backend at it with
+ANTHROPIC_BASE_URL=http://127.0.0.1:8100 and any ANTHROPIC_API_KEY.
+
+Requests whose system prompt asks for JSON (the generation agents) get a
+small JSON document that every agent stage can parse; others get filler text.
+
+Tests can script the next calls with `POST /script`, e.g.
+`{"calls": [{"status": 529, "retry_after_ms": 50}, {"latency_ms": 2000}]}`:
+each call takes the next entry (keys: latency_ms, status, retry_after,
+retry_after_ms, stall_after, stall_ms) and falls back to the command-line
+options once the script is used up. `GET /requests` returns the bodies of
+the most recent calls.
+
+    python benchmarks/fake_anthropic.py --latency-ms 300 --error-rate 0.1 --error-status 529
+"""
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from collections import deque
+from typing import Dict, Any, AsyncIterator, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Parseable by every agent stage: requirements, architecture, implementation units and QA
+JSON_REPLY = {
+    "features": ["Sample feature"],
+    "component_hierarchy": [{"name": "App", "children": []}],
+    "folder_structure": {"src": ["App.tsx"]},
+    "data_flow": "Props flow from App to its children",
+    "files": {"src/App.tsx": "export default function App() {\n  return <div>App</div>;\n}\n"},
+    "issues": [],
+    "recommendations": []
+}
+
+ERROR_TYPES = {
+    400: "invalid_request_error",
+    429: "rate_limit_error",
+    500: "api_error",
+    529: "overloaded_error"
+}
+
+def create_app(options: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Fake Anthropic")
+    app.state.calls = 0
+    # Scripted behaviour for the next calls, one entry per call
+    app.state.script = deque()
+    app.state.requests = deque(maxlen=500)
+
+    async def delay(step: Dict[str, Any]) -> None:
+        if "latency_ms" in step:
+            latency = step["latency_ms"]
+        else:
+            latency = options.latency_ms + random.uniform(0, options.jitter_ms)
+            if random.random() < options.slow_rate:
+                latency += options.slow_ms
+        await asyncio.sleep(latency / 1000)
+
+    def error_status(step: Dict[str, Any]) -> Optional[int]:
+        if "status" in step:
+            return step["status"]
+        return options.error_status if random.random() < options.error_rate else None
+
+    def error_response(status: int, step: Dict[str, Any]) -> JSONResponse:
+        headers = {}
+        retry_after = step.get("retry_after", options.retry_after)
+        if retry_after is not None:
+            headers["retry-after"] = str(retry_after)
+        if "retry_after_ms" in step:
+            headers["retry-after-ms"] = str(step["retry_after_ms"])
+        return JSONResponse(
+            status_code=status,
+            headers=headers,
+            content={
+                "type": "error",
+                "error": {
+                    "type": ERROR_TYPES.get(status, "api_error"),
+                    "message": "Injected failure"
+                }
+            }
+        )
+
+    def reply_text(body: Dict[str, Any]) -> str:
+        if "JSON" in json.dumps(body.get("system", "")):
+            return json.dumps(JSON_REPLY)
+        words = min(options.reply_words, body.get("max_tokens", options.reply_words))
+        return " ".join(random.choice(["lorem", "ipsum", "dolor", "sit", "amet"]) for _ in range(words))
+
+    def input_tokens(body: Dict[str, Any]) -> int:
+        return len(json.dumps(body.get("system", "")) + json.dumps(body.get("messages", []))) // 4 + 1
+
+    def message(body: Dict[str, Any], text: str, output_tokens: int) -> Dict[str, Any]:
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "fake"),
+            "content": [{"type": "text", "text": text}] if text else [],
+            "stop_reason": "end_turn" if text else None,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens(body), "output_tokens": output_tokens}
+        }
+
+    def sse(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    async def stream_events(body: Dict[str, Any], text: str, step: Dict[str, Any]) -> AsyncIterator[str]:
+        words = text.split(" ")
+        yield sse("message_start", {"type": "message_start", "message": message(body, "", 1)})
+        yield sse("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+        })
+        if "stall_after" in step:
+            stall_at = step["stall_after"]
+        else:
+            stall_at = random.randrange(len(words)) if random.random() < options.stall_rate else None
+        for i, word in enumerate(words):
+            if i == stall_at:
+                await asyncio.sleep(step.get("stall_ms", options.stall_ms) / 1000)
+            await asyncio.sleep(1 / options.tokens_per_second)
+            chunk = word if i == 0 else f" {word}"
+            yield sse("content_block_delta", {
+                "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}
+            })
+        yield sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield sse("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": len(words)}
+        })
+        yield sse("message_stop", {"type": "message_stop"})
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        app.state.calls += 1
+        step = app.state.script.popleft() if app.state.script else {}
+        body = await request.json()
+        app.state.requests.append(body)
+        await delay(step)
+        status = error_status(step)
+        if status is not None:
+            return error_response(status, step)
+
+        text = reply_text(body)
+        if body.get("stream"):
+            return StreamingResponse(stream_events(body, text, step), media_type="text/event-stream")
+        # Non-streaming replies arrive once the whole output has been "generated"
+        output_tokens = len(text.split(" "))
+        await asyncio.sleep(output_tokens / options.tokens_per_second)
+        return message(body, text, output_tokens)
+
+    @app.post("/script")
+    async def script(request: Request):
+        """Replace the scripted behaviour of the next calls."""
+        app.state.script = deque((await request.json())["calls"])
+        return {"scripted": len(app.state.script)}
+
+    @app.get("/requests")
+    async def requests():
+        return list(app.state.requests)
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": app.state.calls, "scripted": len(app.state.script)}
+
+    return app
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency-ms", type=float, default=200, help="Base latency before responding")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Uniform random latency added on top")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of calls given extra tail latency")
+    parser.add_argument("--slow-ms", type=float, default=5000)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with an error")
+    parser.add_argument("--error-status", type=int, default=529)
+    parser.add_argument("--retry-after", type=float, default=None, help="retry-after header sent with errors")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="Fraction of streams that stall mid-reply")
+    parser.add_argument("--stall-ms", type=float, default=60000)
+    parser.add_argument("--tokens-per-second", type=float, default=200, help="Streaming output rate (one word per token)")
+    parser.add_argument("--reply-words", type=int, default=200)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,439 @@
+"""In-memory stand-in for the Supabase services the backend uses.
+
+Implements the subset of GoTrue (`/auth/v1`: signup, password login, logout)
+and PostgREST (`/rest/v1`: select with filters, `or`, ordering, limits and the
+conversations -> messages embed; insert, upsert and update; the
+`claim_generation_job` RPC) that `app.services` exercises, with the schema's
+defaults, foreign keys and primary keys from supabase/migrations.
+
+Issued access tokens are HS256 JWTs signed with --jwt-secret, which must match
+the backend's SUPABASE_JWT_TOKEN so local token verification accepts them.
+
+    python benchmarks/fake_supabase.py --port 8101 --jwt-secret bench-secret
+"""
+import argparse
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+from jose import jwt, JWTError
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+def _uuid() -> str:
+    return str(uuid.uuid4())
+
+# Column defaults per table, mirroring supabase/migrations
+TABLE_DEFAULTS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "user_profiles": lambda: {"full_name": None, "avatar_url": None, "created_at": _now(), "updated_at": _now()},
+    "projects": lambda: {
+        "id": _uuid(), "description": None, "requirements": None, "status": "draft",
+        "stackblitz_id": None, "settings": {}, "created_at": _now(), "updated_at": _now()
+    },
+    "conversations": lambda: {
+        "id": _uuid(), "project_id": None, "summary": None, "summarized_until_created_at": None,
+        "summarized_until_id": None, "created_at": _now(), "updated_at": _now()
+    },
+    "messages": lambda: {"id": _uuid(), "metadata": {}, "created_at": _now()},
+    "code_versions": lambda: {
+        "id": _uuid(), "files": None, "manifest": None, "commit_message": None,
+        "metadata": {}, "created_at": _now()
+    },
+    "code_blobs": lambda: {"created_at": _now()},
+    "generation_jobs": lambda: {
+        "id": _uuid(), "status": "queued", "attempts": 0, "max_attempts": 3, "checkpoints": {},
+        "payload": {}, "error": None, "locked_by": None, "locked_at": None, "run_after": _now(),
+        "created_at": _now(), "updated_at": _now()
+    }
+}
+
+PRIMARY_KEYS = {"code_blobs": "hash"}
+
+FOREIGN_KEYS = {
+    "conversations": ("project_id", "projects"),
+    "messages": ("conversation_id", "conversations"),
+    "code_versions": ("project_id", "projects"),
+    "generation_jobs": ("project_id", "projects")
+}
+
+# parent table -> {embedded table: foreign key column on the embedded table}
+EMBEDS = {"conversations": {"messages": "conversation_id"}}
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns", "or"}
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        self.status = status
+        self.code = code
+        self.message = message
+
+def _split_top_level(text: str) -> List[str]:
+    """Split on commas that are not inside parentheses or double quotes."""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        if char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+    return [part.strip() for part in parts]
+
+def _column_value(row: Dict[str, Any], column: str) -> Any:
+    if "->>" in column:
+        base, key = column.split("->>", 1)
+        value = (row.get(base) or {}).get(key)
+        if value is None or isinstance(value, str):
+            return value
+        return json.dumps(value)
+    return row.get(column)
+
+def _coerce(value: Any, raw: str) -> Any:
+    """Convert a filter literal to the type of the stored value it is compared with."""
+    raw = raw.strip('"')
+    if isinstance(value, bool):
+        return raw == "true"
+    if isinstance(value, int):
+        return int(raw)
+    if isinstance(value, float):
+        return float(raw)
+    return raw
+
+def _matches(row: Dict[str, Any], column: str, op: str, raw: str) -> bool:
+    value = _column_value(row, column)
+    if op == "is":
+        return value is None if raw == "null" else value == (raw == "true")
+    if op == "in":
+        return str(value) in {item.strip('"') for item in _split_top_level(raw.strip("()"))}
+    if value is None:
+        return False
+    operand = _coerce(value, raw)
+    if op == "eq":
+        return value == operand
+    if op == "neq":
+        return value != operand
+    if op == "gt":
+        return value > operand
+    if op == "gte":
+        return value >= operand
+    if op == "lt":
+        return value < operand
+    if op == "lte":
+        return value <= operand
+    raise PostgrestError(400, "PGRST100", f"Unsupported operator: {op}")
+
+def _logic_matches(row: Dict[str, Any], expression: str, combine: Callable = any) -> bool:
+    """Evaluate an `or=(...)` / `and(...)` expression against a row."""
+    results = []
+    for item in _split_top_level(expression):
+        if item.startswith("and(") or item.startswith("or("):
+            name, inner = item.split("(", 1)
+            results.append(_logic_matches(row, inner[:-1], all if name == "and" else any))
+        else:
+            column, op, raw = item.split(".", 2)
+            results.append(_matches(row, column, op, raw))
+    return combine(results)
+
+def _order(rows: List[Dict[str, Any]], order: Optional[str]) -> List[Dict[str, Any]]:
+    if not order:
+        return rows
+    for term in reversed(order.split(",")):
+        column, *modifiers = term.split(".")
+        rows = sorted(
+            rows,
+            key=lambda row: (_column_value(row, column) is None, _column_value(row, column) or ""),
+            reverse="desc" in modifiers
+        )
+    return rows
+
+class FakeDatabase:
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TABLE_DEFAULTS}
+        self.requests = 0
+
+    def _table(self, name: str) -> List[Dict[str, Any]]:
+        if name not in self.tables:
+            raise PostgrestError(404, "42P01", f'relation "public.{name}" does not exist')
+        return self.tables[name]
+
+    def _filtered(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        rows = self._table(table)
+        for key, value in params:
+            if key == "or":
+                rows = [row for row in rows if _logic_matches(row, value[1:-1])]
+            elif key not in RESERVED_PARAMS and "." not in key.split("->>")[0]:
+                op, raw = value.split(".", 1)
+                rows = [row for row in rows if _matches(row, key, op, raw)]
+        return rows
+
+    def _project(self, table: str, row: Dict[str, Any], select: str, params: Dict[str, str]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for item in _split_top_level(select.replace(" ", "")):
+            if "(" in item:
+                embedded, columns = item[:-1].split("(", 1)
+                foreign_key = EMBEDS.get(table, {}).get(embedded)
+                if foreign_key is None:
+                    raise PostgrestError(400, "PGRST200", f"No relationship between {table} and {embedded}")
+                children = [child for child in self._table(embedded) if child.get(foreign_key) == row["id"]]
+                children = _order(children, params.get(f"{embedded}.order"))
+                if f"{embedded}.limit" in params:
+                    children = children[:int(params[f"{embedded}.limit"])]
+                result[embedded] = [self._project(embedded, child, columns, {}) for child in children]
+            elif item == "*":
+                result.update(row)
+            else:
+                result[item] = row.get(item)
+        return result
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        named = dict(params)
+        rows = _order(self._filtered(table, params), named.get("order"))
+        if "offset" in named:
+            rows = rows[int(named["offset"]):]
+        if "limit" in named:
+            rows = rows[:int(named["limit"])]
+        return [self._project(table, row, named.get("select", "*"), named) for row in rows]
+
+    def insert(self, table: str, body: Any, resolution: Optional[str], on_conflict: Optional[str]) -> List[Dict[str, Any]]:
+        rows = self._table(table)
+        key = on_conflict or PRIMARY_KEYS.get(table, "id")
+        inserted = []
+        # NOW() is evaluated once per statement, so every row of a batch gets the same timestamps
+        now = _now()
+        timestamps = {column: now for column in ("created_at", "updated_at", "run_after")}
+        for data in body if isinstance(body, list) else [body]:
+            existing = next((row for row in rows if key in data and row.get(key) == data[key]), None)
+            if existing is not None:
+                if resolution == "ignore-duplicates":
+                    continue
+                if resolution == "merge-duplicates":
+                    existing.update(data)
+                    inserted.append(existing)
+                    continue
+                raise PostgrestError(409, "23505", f'duplicate key value violates unique constraint "{table}_pkey"')
+
+            defaults = TABLE_DEFAULTS[table]()
+            defaults.update({column: value for column, value in timestamps.items() if column in defaults})
+            row = {**defaults, **data}
+            if table in FOREIGN_KEYS:
+                column, parent = FOREIGN_KEYS[table]
+                if row.get(column) is not None and not any(p["id"] == row[column] for p in self.tables[parent]):
+                    raise PostgrestError(
+                        409, "23503",
+                        f'insert or update on table "{table}" violates foreign key constraint "{table}_{column}_fkey"'
+                    )
+            rows.append(row)
+            inserted.append(row)
+        return inserted
+
+    def update(self, table: str, params: List[Tuple[str, str]], data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        rows = self._filtered(table, params)
+        for row in rows:
+            row.update(data)
+            if "updated_at" in row:
+                row["updated_at"] = _now()
+        return rows
+
+    def claim_generation_job(self, p_worker_id: str, p_lease_seconds: int) -> List[Dict[str, Any]]:
+        now = datetime.now(timezone.utc)
+        expired_before = (now - timedelta(seconds=p_lease_seconds)).isoformat(timespec="microseconds")
+        jobs = self.tables["generation_jobs"]
+        for job in jobs:
+            if job["status"] == "running" and job["locked_at"] < expired_before and job["attempts"] >= job["max_attempts"]:
+                job.update(status="failed", error="Lease expired after max attempts", locked_by=None)
+
+        claimable = [
+            job for job in jobs
+            if (job["status"] == "queued" and job["run_after"] <= _now())
+            or (job["status"] == "running" and job["locked_at"] < expired_before)
+        ]
+        if not claimable:
+            return []
+        job = _order(claimable, "run_after,created_at")[0]
+        job.update(
+            status="running", attempts=job["attempts"] + 1, locked_by=p_worker_id,
+            locked_at=_now(), updated_at=_now()
+        )
+        return [dict(job)]
+
+def create_app(options: argparse.Namespace) -> FastAPI:
+    app = FastAPI(title="Fake Supabase")
+    db = FakeDatabase()
+    users: Dict[str, Dict[str, Any]] = {}
+    # (user id, session id, scope) of each sign-out, in order
+    logouts: List[Dict[str, str]] = []
+    app.state.db = db
+
+    def error(e: PostgrestError) -> JSONResponse:
+        return JSONResponse(
+            status_code=e.status,
+            content={"code": e.code, "message": e.message, "details": None, "hint": None}
+        )
+
+    def representation(request: Request, rows: List[Dict[str, Any]], status_code: int) -> Response:
+        if "return=minimal" in request.headers.get("prefer", ""):
+            return Response(status_code=status_code)
+        return JSONResponse(status_code=status_code, content=rows)
+
+    @app.get("/rest/v1/{table}")
+    async def select(table: str, request: Request):
+        db.requests += 1
+        try:
+            return db.select(table, list(request.query_params.multi_items()))
+        except PostgrestError as e:
+            return error(e)
+
+    @app.post("/rest/v1/rpc/{function}")
+    async def rpc(function: str, request: Request):
+        db.requests += 1
+        if function != "claim_generation_job":
+            return error(PostgrestError(404, "PGRST202", f"Could not find the function public.{function}"))
+        return db.claim_generation_job(**(await request.json()))
+
+    @app.post("/rest/v1/{table}")
+    async def insert(table: str, request: Request):
+        db.requests += 1
+        prefer = request.headers.get("prefer", "")
+        resolution = next(
+            (part.split("=", 1)[1] for part in prefer.split(",") if part.strip().startswith("resolution=")),
+            None
+        )
+        try:
+            rows = db.insert(table, await request.json(), resolution, request.query_params.get("on_conflict"))
+        except PostgrestError as e:
+            return error(e)
+        return representation(request, rows, 201)
+
+    @app.patch("/rest/v1/{table}")
+    async def update(table: str, request: Request):
+        db.requests += 1
+        try:
+            rows = db.update(table, list(request.query_params.multi_items()), await request.json())
+        except PostgrestError as e:
+            return error(e)
+        return representation(request, rows, 200)
+
+    def user_json(user: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": user["id"],
+            "aud": "authenticated",
+            "role": "authenticated",
+            "email": user["email"],
+            "phone": "",
+            "email_confirmed_at": user["created_at"],
+            "confirmed_at": user["created_at"],
+            "last_sign_in_at": _now(),
+            "app_metadata": {"provider": "email", "providers": ["email"]},
+            "user_metadata": user["user_metadata"],
+            "identities": [],
+            "created_at": user["created_at"],
+            "updated_at": user["created_at"]
+        }
+
+    def session(user: Dict[str, Any]) -> Dict[str, Any]:
+        issued = int(time.time())
+        token = jwt.encode(
+            {
+                "sub": user["id"],
+                "email": user["email"],
+                "role": "authenticated",
+                "aud": "authenticated",
+                "session_id": str(uuid.uuid4()),
+                "iat": issued,
+                "exp": issued + options.token_ttl
+            },
+            options.jwt_secret,
+            algorithm="HS256"
+        )
+        return {
+            "access_token": token,
+            "token_type": "bearer",
+            "expires_in": options.token_ttl,
+            "expires_at": issued + options.token_ttl,
+            "refresh_token": uuid.uuid4().hex,
+            "user": user_json(user)
+        }
+
+    @app.post("/auth/v1/signup")
+    async def signup(request: Request):
+        body = await request.json()
+        if body["email"] in users:
+            return JSONResponse(
+                status_code=422,
+                content={"code": 422, "error_code": "user_already_exists", "msg": "User already registered"}
+            )
+        user = {
+            "id": _uuid(),
+            "email": body["email"],
+            "password": body["password"],
+            "user_metadata": body.get("data") or {},
+            "created_at": _now()
+        }
+        users[user["email"]] = user
+        return session(user)
+
+    @app.post("/auth/v1/token")
+    async def token(request: Request):
+        body = await request.json()
+        user = users.get(body.get("email"))
+        if request.query_params.get("grant_type") != "password" or not user or user["password"] != body.get("password"):
+            return JSONResponse(
+                status_code=400,
+                content={"error": "invalid_grant", "error_description": "Invalid login credentials"}
+            )
+        return session(user)
+
+    @app.post("/auth/v1/logout")
+    async def logout(request: Request):
+        # GoTrue signs out the session of the bearer token, not whoever the client last logged in as
+        try:
+            claims = jwt.decode(
+                request.headers.get("authorization", "").removeprefix("Bearer "),
+                options.jwt_secret,
+                algorithms=["HS256"],
+                audience="authenticated"
+            )
+        except JWTError:
+            return JSONResponse(status_code=401, content={"msg": "invalid JWT"})
+        logouts.append({
+            "user_id": claims["sub"],
+            "session_id": claims["session_id"],
+            "scope": request.query_params.get("scope", "global")
+        })
+        return Response(status_code=204)
+
+    @app.get("/stats")
+    async def stats():
+        return {
+            "requests": db.requests,
+            "users": len(users),
+            "logouts": logouts,
+            "rows": {table: len(rows) for table, rows in db.tables.items()}
+        }
+
+    return app
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8101)
+    parser.add_argument("--jwt-secret", default="bench-secret")
+    parser.add_argument("--token-ttl", type=int, default=3600)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    uvicorn.run(create_app(args), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,339 @@
+"""Offline end-to-end load benchmark for the Devoo API.
+
+Boots the fake Anthropic and Supabase servers and the app (each as a uvicorn
+subprocess), drives scripted scenarios through the public API and reports
+p50/p95/p99 latency and requests/second per route as JSON. Compare two
+reports with benchmarks/compare.py.
+
+    python benchmarks/run.py --users 20 --iterations 10 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCHMARKS = Path(__file__).resolve().parent
+JWT_SECRET = "bench-secret"
+PASSWORD = "bench-password"
+
+def percentile(values: List[float], p: float) -> float:
+    """Linearly interpolated percentile of already sorted values."""
+    if len(values) == 1:
+        return values[0]
+    rank = p * (len(values) - 1)
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+class Recorder:
+    """Collects latency samples and status codes per route template."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, route: str, seconds: float, status: Any) -> None:
+        self.latencies[route].append(seconds)
+        self.statuses[route][str(status)] += 1
+
+    async def request(self, client: httpx.AsyncClient, method: str, route: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.record(f"{method} {route}", time.perf_counter() - started, type(e).__name__)
+            raise
+        self.record(f"{method} {route}", time.perf_counter() - started, response.status_code)
+        return response
+
+    async def stream(self, client: httpx.AsyncClient, method: str, route: str, url: str, **kwargs) -> List[str]:
+        """Consume a server-sent event stream, recording time to first event and to completion."""
+        started = time.perf_counter()
+        events: List[str] = []
+        status: Any = None
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                status = response.status_code
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        if not events:
+                            self.record(f"{method} {route} [first event]", time.perf_counter() - started, status)
+                        events.append(line[len("event:"):].strip())
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+            raise
+        finally:
+            self.record(f"{method} {route}", time.perf_counter() - started, status)
+        return events
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            statuses = self.statuses[route]
+            errors = sum(count for status, count in statuses.items() if not status.isdigit() or int(status) >= 400)
+            routes[route] = {
+                "count": len(ordered),
+                "errors": errors,
+                "rps": round(len(ordered) / duration, 2),
+                "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+                "status": dict(statuses)
+            }
+        return {"duration_seconds": round(duration, 3), "routes": routes}
+
+class BenchContext:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.run_id = uuid.uuid4().hex[:8]
+        self.tokens: List[str] = []
+        self.projects: List[str] = []
+
+    def token(self, vu: int) -> Dict[str, str]:
+        if not self.tokens:
+            raise RuntimeError("No logged-in users; the signup_login scenario must succeed first")
+        return {"Authorization": f"Bearer {self.tokens[vu % len(self.tokens)]}"}
+
+    def project(self, vu: int) -> str:
+        if not self.projects:
+            raise RuntimeError("No projects; the create_project scenario must succeed first")
+        return self.projects[vu % len(self.projects)]
+
+Scenario = Callable[[httpx.AsyncClient, Recorder, BenchContext, int], Awaitable[None]]
+
+async def signup_login(client: httpx.AsyncClient, rec: Recorder, ctx: BenchContext, vu: int) -> None:
+    for i in range(ctx.args.iterations):
+        email = f"bench-{ctx.run_id}-{vu}-{i}@example.com"
+        await rec.request(client, "POST", "/api/v1/auth/signup", "/api/v1/auth/signup", json={
+            "email": email,
+            "password": PASSWORD,
+            "full_name": f"Bench User {vu}"
+        })
+        response = await rec.request(client, "POST", "/api/v1/auth/login", "/api/v1/auth/login", json={
+            "email": email,
+            "password": PASSWORD
+        })
+        if response.status_code == 200:
+            ctx.tokens.append(response.json()["access_token"])
+
+async def create_project(client: httpx.AsyncClient, rec: Recorder, ctx: BenchContext, vu: int) -> None:
+    for i in range(ctx.args.iterations):
+        response = await rec.request(client, "POST", "/api/v1/projects/", "/api/v1/projects/", json={
+            "name": f"Bench project {vu}-{i}",
+            "description": "Created by the load benchmark",
+            "requirements": "Build a todo list application with user accounts",
+            "settings": {}
+        }, headers=ctx.token(vu))
+        if response.status_code == 201:
+            ctx.projects.append(response.json()["id"])
+
+async def list_projects(client: httpx.AsyncClient, rec: Recorder, ctx: BenchContext, vu: int) -> None:
+    headers = ctx.token(vu)
+    for _ in range(ctx.args.iterations):
+        params = {"limit": 5, "fields": "id,name,status"}
+        while True:
+            response = await rec.request(client, "GET", "/api/v1/projects/", "/api/v1/projects/",
+                                         params=params, headers=headers)
+            if response.status_code != 200 or not response.json()["next_cursor"]:
+                break
+            params = {**params, "cursor": response.json()["next_cursor"]}
+
+async def chat_burst(client: httpx.AsyncClient, rec: Recorder, ctx: BenchContext, vu: int) -> None:
+    headers = ctx.token(vu)
+    response = await rec.request(client, "POST", "/api/v1/chat/conversations", "/api/v1/chat/conversations",
+                                 json={"project_id": ctx.project(vu)}, headers=headers)
+    response.raise_for_status()
+    conversation = f"/api/v1/chat/conversations/{response.json()['id']}"
+
+    for i in range(ctx.args.iterations):
+        await rec.request(client, "POST", "/api/v1/chat/conversations/{id}/messages", f"{conversation}/messages",
+                          json={"content": f"Question {i}: how should I structure the state?", "role": "user"},
+                          headers=headers)
+        await rec.stream(client, "POST", "/api/v1/chat/conversations/{id}/reply", f"{conversation}/reply",
+                         headers=headers)
+        await rec.request(client, "GET", "/api/v1/chat/conversations/{id}/messages", f"{conversation}/messages",
+                          params={"limit": 20}, headers=headers)
+    await rec.request(client, "GET", "/api/v1/chat/conversations/{id}", conversation, headers=headers)
+
+async def status_polling(client: httpx.AsyncClient, rec: Recorder, ctx: BenchContext, vu: int) -> None:
+    headers = ctx.token(vu)
+    url = f"/api/v1/projects/{ctx.project(vu)}/status"
+    etag: Optional[str] = None
+    for _ in range(ctx.args.iterations * 5):
+        response = await rec.request(client, "GET", "/api/v1/projects/{id}/status", url,
+                                     headers={**headers, **({"If-None-Match": etag} if etag else {})})
+        etag = response.headers.get("etag", etag)
+        await asyncio.sleep(ctx.args.poll_interval)
+
+SCENARIOS: Dict[str, Scenario] = {
+    "signup_login": signup_login,
+    "create_project": create_project,
+    "list_projects": list_projects,
+    "chat_burst": chat_burst,
+    "status_polling": status_polling
+}
+
+async def run_scenario(name: str, ctx: BenchContext) -> Dict[str, Any]:
+    rec = Recorder()
+    scenario = SCENARIOS[name]
+    limits = httpx.Limits(max_connections=ctx.args.users, max_keepalive_connections=ctx.args.users)
+    async with httpx.AsyncClient(base_url=ctx.args.app_url, limits=limits, timeout=ctx.args.timeout) as client:
+
+        async def virtual_user(vu: int) -> Optional[str]:
+            try:
+                await scenario(client, rec, ctx, vu)
+            except Exception as e:
+                return f"{type(e).__name__}: {e}"
+            return None
+
+        started = time.perf_counter()
+        failures = await asyncio.gather(*(virtual_user(vu) for vu in range(ctx.args.users)))
+        duration = time.perf_counter() - started
+
+    result = rec.summary(duration)
+    result["failed_users"] = sum(1 for failure in failures if failure)
+    first_failure = next((failure for failure in failures if failure), None)
+    if first_failure:
+        result["first_failure"] = first_failure
+    return result
+
+def _start(name: str, command: List[str], env: Dict[str, str], log_dir: Path) -> subprocess.Popen:
+    log = open(log_dir / f"{name}.log", "w")
+    return subprocess.Popen(command, env=env, cwd=ROOT, stdout=log, stderr=subprocess.STDOUT)
+
+async def _wait_ready(name: str, url: str, process: subprocess.Popen, log_dir: Path, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                break
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    output = (log_dir / f"{name}.log").read_text()[-2000:]
+    raise RuntimeError(f"{name} did not become ready at {url}:\n{output}")
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    log_dir = Path(tempfile.mkdtemp(prefix="devoo-bench-"))
+    anthropic_url = f"http://127.0.0.1:{args.anthropic_port}"
+    supabase_url = f"http://127.0.0.1:{args.supabase_port}"
+    processes: List[subprocess.Popen] = []
+    try:
+        if not args.external_app:
+            processes.append(_start("fake_anthropic", [
+                sys.executable, str(BENCHMARKS / "fake_anthropic.py"),
+                "--port", str(args.anthropic_port),
+                "--latency-ms", str(args.model_latency_ms),
+                "--tokens-per-second", str(args.model_tokens_per_second),
+                "--error-rate", str(args.model_error_rate),
+                "--reply-words", str(args.model_reply_words)
+            ], dict(os.environ), log_dir))
+            processes.append(_start("fake_supabase", [
+                sys.executable, str(BENCHMARKS / "fake_supabase.py"),
+                "--port", str(args.supabase_port),
+                "--jwt-secret", JWT_SECRET
+            ], dict(os.environ), log_dir))
+            await _wait_ready("fake_anthropic", f"{anthropic_url}/stats", processes[0], log_dir)
+            await _wait_ready("fake_supabase", f"{supabase_url}/stats", processes[1], log_dir)
+
+            app_env = {
+                **os.environ,
+                "SUPABASE_URL": supabase_url,
+                "SUPABASE_KEY": "bench-anon-key",
+                "SUPABASE_SERVICE_ROLE_KEY": "bench-service-role-key",
+                "SUPABASE_JWT_TOKEN": JWT_SECRET,
+                "ANTHROPIC_API_KEY": "bench-anthropic-key",
+                "ANTHROPIC_BASE_URL": anthropic_url,
+                "PERPLEXITY_API_KEY": "bench-perplexity-key",
+                "DATABASE_URL": "",
+                "GENERATION_WORKERS": str(args.generation_workers)
+            }
+            processes.append(_start("app", [
+                sys.executable, "-m", "uvicorn", "main:app",
+                "--app-dir", str(ROOT / "src"),
+                "--port", str(args.app_port),
+                "--workers", str(args.app_workers),
+                "--log-level", "warning"
+            ], app_env, log_dir))
+            await _wait_ready("app", f"{args.app_url}/api/v1/", processes[2], log_dir)
+
+        ctx = BenchContext(args)
+        results = {}
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            results[name] = await run_scenario(name, ctx)
+
+        return {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "config": {key: value for key, value in vars(args).items() if key != "output"},
+            "logs": str(log_dir),
+            "scenarios": results
+        }
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="Scenarios to run, in order; later ones reuse users and projects from earlier ones")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users per scenario")
+    parser.add_argument("--iterations", type=int, default=5, help="Iterations per virtual user")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="Delay between status polls")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request client timeout")
+    parser.add_argument("--app-port", type=int, default=8000)
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--generation-workers", type=int, default=2)
+    parser.add_argument("--external-app", action="store_true",
+                        help="Benchmark an already running app at --app-url instead of booting one")
+    parser.add_argument("--app-url", default=None)
+    parser.add_argument("--anthropic-port", type=int, default=8100)
+    parser.add_argument("--supabase-port", type=int, default=8101)
+    parser.add_argument("--model-latency-ms", type=float, default=200)
+    parser.add_argument("--model-tokens-per-second", type=float, default=200)
+    parser.add_argument("--model-error-rate", type=float, default=0.0)
+    parser.add_argument("--model-reply-words", type=int, default=100)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+    args.app_url = args.app_url or f"http://127.0.0.1:{args.app_port}"
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
@@ -0,0 +1,156 @@
+"""Cold-start benchmark for the Devoo API.
+
+Measures, over several fresh processes:
+- import: the time to import `main` in a new interpreter
+- first_response: from spawning uvicorn to the first successful response
+- openapi: the first request for /openapi.json on a freshly started server
+
+Nothing is contacted except the app itself: the settings point at unused
+local ports and the in-process generation workers are disabled.
+
+    python benchmarks/startup.py --runs 10 --output startup.json
+
+The report has the same shape as run.py's, so compare.py diffs two of them.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+
+import httpx
+
+from run import ROOT, percentile, _git_commit
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import main; "
+    "print(time.perf_counter() - started)"
+)
+
+def _app_env() -> Dict[str, str]:
+    return {
+        **os.environ,
+        "SUPABASE_URL": "http://127.0.0.1:9",
+        "SUPABASE_KEY": "startup-anon-key",
+        "SUPABASE_SERVICE_ROLE_KEY": "startup-service-role-key",
+        "SUPABASE_JWT_TOKEN": "startup-secret",
+        "ANTHROPIC_API_KEY": "startup-anthropic-key",
+        "ANTHROPIC_BASE_URL": "http://127.0.0.1:9",
+        "PERPLEXITY_API_KEY": "startup-perplexity-key",
+        "DATABASE_URL": "",
+        "GENERATION_WORKERS": "0"
+    }
+
+def measure_import(env: Dict[str, str]) -> float:
+    output = subprocess.check_output(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=ROOT / "src",
+        env=env,
+        text=True
+    )
+    return float(output.strip().splitlines()[-1])
+
+def measure_server(env: Dict[str, str], port: int, timeout: float, log_dir: Path, run: int) -> Tuple[float, float]:
+    """Seconds from spawn to the first response, and the latency of the first /openapi.json request."""
+    url = f"http://127.0.0.1:{port}"
+    log_path = log_dir / f"app-{run}.log"
+    with open(log_path, "w") as log:
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(ROOT / "src"),
+             "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT
+        )
+        try:
+            with httpx.Client(timeout=5) as client:
+                while True:
+                    if process.poll() is not None or time.perf_counter() - started > timeout:
+                        raise RuntimeError(f"App did not start:\n{log_path.read_text()[-2000:]}")
+                    try:
+                        client.get(f"{url}/api/v1/").raise_for_status()
+                        break
+                    except httpx.HTTPError:
+                        time.sleep(0.005)
+                first_response = time.perf_counter() - started
+
+                requested = time.perf_counter()
+                client.get(f"{url}/openapi.json").raise_for_status()
+                openapi = time.perf_counter() - requested
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    return first_response, openapi
+
+def summarize(samples: List[float]) -> Dict[str, Any]:
+    """Same shape as a route in benchmarks/run.py reports, so compare.py can diff startup runs."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "errors": 0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "min_ms": round(ordered[0] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2)
+    }
+
+def main(args: argparse.Namespace) -> Dict[str, Any]:
+    env = _app_env()
+    log_dir = Path(tempfile.mkdtemp(prefix="devoo-startup-"))
+    imports: List[float] = []
+    first_responses: List[float] = []
+    openapi: List[float] = []
+    for run in range(args.runs):
+        print(f"Run {run + 1}/{args.runs}...", file=sys.stderr)
+        imports.append(measure_import(env))
+        first_response, openapi_latency = measure_server(env, args.port, args.timeout, log_dir, run)
+        first_responses.append(first_response)
+        openapi.append(openapi_latency)
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "openapi_file": Path(env.get("OPENAPI_FILE", ROOT / "openapi.json")).exists(),
+        "logs": str(log_dir),
+        "scenarios": {
+            "startup": {
+                "routes": {
+                    "import": summarize(imports),
+                    "first_response": summarize(first_responses),
+                    "openapi": summarize(openapi)
+                }
+            }
+        }
+    }
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to measure")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the app to respond")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = main(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
@@ -0,0 +1,114 @@
+"""Reconstruct traces from JSON-lines span files (TRACE_EXPORTER=jsonl).
+
+Prints a trace as a tree with start offsets and durations, marks its
+critical path (the chain of spans that finished last at each level) and
+totals the path's time by span name.
+
+    python scripts/trace_tree.py traces-*.jsonl --project-id <uuid>
+    python scripts/trace_tree.py traces-*.jsonl --trace <trace_id>
+"""
+import argparse
+import json
+import sys
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+def load(paths: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    traces[record["trace_id"]].append(record)
+    return traces
+
+def _end(span: Dict[str, Any]) -> float:
+    return span["start"] + span["duration_ms"] / 1000
+
+def critical_path(
+    span: Dict[str, Any],
+    children: Dict[str, List[Dict[str, Any]]],
+    end: float,
+    path: List[Dict[str, Any]],
+    totals: Dict[str, float]
+) -> None:
+    """Walk back from `end`, following the child that finished last before the cursor.
+
+    Time on the path not covered by a child counts as the span's own time.
+    Children may outlive their parent (a queued job outlives its request),
+    so a child's end is the latest end in its subtree.
+    """
+    path.append(span)
+    cursor = end
+    for child in sorted(children.get(span["span_id"], []), key=lambda c: _subtree_end(c, children), reverse=True):
+        if cursor <= span["start"]:
+            break
+        if child["start"] >= cursor:
+            continue
+        child_end = min(_subtree_end(child, children), cursor)
+        totals[span["name"]] += (cursor - child_end) * 1000
+        critical_path(child, children, child_end, path, totals)
+        cursor = child["start"]
+    totals[span["name"]] += max(cursor - span["start"], 0) * 1000
+
+def _subtree_end(span: Dict[str, Any], children: Dict[str, List[Dict[str, Any]]]) -> float:
+    return max([_end(span)] + [_subtree_end(child, children) for child in children.get(span["span_id"], [])])
+
+def render(spans: List[Dict[str, Any]]) -> None:
+    ids = {span["span_id"] for span in spans}
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    roots = []
+    for span in sorted(spans, key=lambda s: s["start"]):
+        if span["parent_id"] in ids:
+            children[span["parent_id"]].append(span)
+        else:
+            roots.append(span)
+
+    origin = roots[0]["start"]
+    path: List[Dict[str, Any]] = []
+    totals: Dict[str, float] = defaultdict(float)
+    for root in roots:
+        critical_path(root, children, _subtree_end(root, children), path, totals)
+    on_path = {span["span_id"] for span in path}
+
+    def walk(span: Dict[str, Any], depth: int) -> None:
+        marker = "*" if span["span_id"] in on_path else " "
+        attributes = " ".join(f"{k}={v}" for k, v in span["attributes"].items() if v is not None)
+        error = f" ERROR {span['error']}" if span["status"] == "error" else ""
+        print(f"{marker} {(span['start'] - origin) * 1000:>10.1f}ms {span['duration_ms']:>10.1f}ms  "
+              f"{'  ' * depth}{span['name']} {attributes}{error}")
+        for child in children.get(span["span_id"], []):
+            walk(child, depth + 1)
+
+    for root in roots:
+        walk(root, 0)
+
+    print("\nCritical path time by span:")
+    for name, total in sorted(totals.items(), key=lambda item: -item[1]):
+        print(f"  {total:>10.1f}ms  {name}")
+
+def find_trace(traces: Dict[str, List[Dict[str, Any]]], trace_id: Optional[str], project_id: Optional[str]) -> Optional[str]:
+    if trace_id:
+        return trace_id if trace_id in traces else None
+    matches = [
+        (min(span["start"] for span in spans), tid)
+        for tid, spans in traces.items()
+        if any(span["attributes"].get("project_id") == project_id for span in spans)
+    ]
+    return max(matches)[1] if matches else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--trace", help="Trace ID to show")
+    group.add_argument("--project-id", help="Show the latest trace touching this project")
+    args = parser.parse_args()
+
+    all_traces = load(args.files)
+    selected = find_trace(all_traces, args.trace, args.project_id)
+    if selected is None:
+        sys.exit("No matching trace found")
+    print(f"Trace {selected}\n")
+    render(all_traces[selected])
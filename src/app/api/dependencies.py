@@ -1,24 +1,48 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from ..services.supabase import supabase
-from typing import Optional
+from ..core.exceptions import AuthenticationError
+from ..core.security import token_verifier
+from ..models.auth import AuthenticatedUser
+from ..services.database import (
+    database,
+    Database,
+    ProjectRepository,
+    ConversationRepository,
+    MessageRepository,
+    CodeVersionRepository
+)
 
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get the current authenticated user."""
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> AuthenticatedUser:
+    """Get the current authenticated user from a locally verified access token."""
     try:
-        user = supabase.auth.get_user(credentials.credentials)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return user
-    except Exception as e:
+        claims = token_verifier.verify(credentials.credentials)
+    except AuthenticationError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
-        ) 
\ No newline at end of file
+        )
+    return AuthenticatedUser(
+        id=claims["sub"],
+        email=claims.get("email"),
+        role=claims.get("role"),
+        claims=claims
+    )
+
+def get_database() -> Database:
+    """Get the shared, lifespan-managed database."""
+    return database
+
+def get_project_repository(db: Database = Depends(get_database)) -> ProjectRepository:
+    return db.projects
+
+def get_conversation_repository(db: Database = Depends(get_database)) -> ConversationRepository:
+    return db.conversations
+
+def get_message_repository(db: Database = Depends(get_database)) -> MessageRepository:
+    return db.messages
+
+def get_code_version_repository(db: Database = Depends(get_database)) -> CodeVersionRepository:
+    return db.code_versions
@@ -0,0 +1,37 @@
+import time
+from ..core.metrics import HTTP_REQUEST_DURATION, HTTP_RESPONSES
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request latency and status per route template.
+
+    Latency runs until the last body chunk is sent, so streamed responses are
+    measured end to end. Requests that match no route share one label to keep
+    cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route on the scope
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, template).observe(time.perf_counter() - started)
+            HTTP_RESPONSES.labels(method, template, str(status)).inc()
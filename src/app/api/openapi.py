@@ -0,0 +1,40 @@
+import json
+import logging
+import os
+from typing import Dict, Any
+from fastapi import FastAPI
+from fastapi.openapi.utils import get_openapi
+
+logger = logging.getLogger(__name__)
+
+def build_openapi(app: FastAPI) -> Dict[str, Any]:
+    """Generate the schema from the app's routes, with bearer authentication applied globally."""
+    schema = get_openapi(
+        title=app.title,
+        version=app.version,
+        description=app.description,
+        routes=app.routes,
+        tags=app.openapi_tags
+    )
+    components = schema.setdefault("components", {})
+    components["securitySchemes"] = {
+        "Bearer": {
+            "type": "http",
+            "scheme": "bearer",
+            "bearerFormat": "JWT",
+            "description": "Enter the token you received from the login endpoint"
+        }
+    }
+    schema["security"] = [{"Bearer": []}]
+    return schema
+
+def load_openapi(app: FastAPI, path: str) -> Dict[str, Any]:
+    """Serve the schema exported at build time, generating it on first use when the file is missing."""
+    if app.openapi_schema is None:
+        if os.path.exists(path):
+            with open(path) as f:
+                app.openapi_schema = json.load(f)
+        else:
+            logger.warning("OpenAPI schema not found at %s; generating it (run scripts/export_openapi.py at build time)", path)
+            app.openapi_schema = build_openapi(app)
+    return app.openapi_schema
@@ -0,0 +1,24 @@
+from typing import Any
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+JSON_MEDIA_TYPE = "application/json"
+
+def model_response(model: BaseModel, status_code: int = 200, exclude_unset: bool = False) -> Response:
+    """Serialize a validated model straight to JSON bytes.
+
+    Returning a Response makes FastAPI skip its own `response_model`
+    validation and encoding, so each response is serialized exactly once.
+    The `response_model` on the route still documents the schema.
+    `exclude_unset` leaves out fields that were never given a value
+    (e.g. columns a client did not select).
+    """
+    return Response(
+        content=model.model_dump_json(exclude_unset=exclude_unset),
+        media_type=JSON_MEDIA_TYPE,
+        status_code=status_code
+    )
+
+def adapter_response(adapter: TypeAdapter, value: Any, status_code: int = 200) -> Response:
+    """Serialize a validated value (e.g. a list of models) with its TypeAdapter."""
+    return Response(content=adapter.dump_json(value), media_type=JSON_MEDIA_TYPE, status_code=status_code)
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
 from .routers import projects, auth, chat
 from ...core.config import get_settings
+from ...services.scheduler import token_scheduler
+from ...services.resilience import model_call_policy
 
 router = APIRouter()
 
@@ -38,4 +40,14 @@ async def debug_settings():
         "has_jwt_token": bool(settings.SUPABASE_JWT_TOKEN),
         "has_anthropic_key": bool(settings.ANTHROPIC_API_KEY),
         "has_perplexity_key": bool(settings.PERPLEXITY_API_KEY),
-    } 
\ No newline at end of file
+    }
+
+@router.get("/debug/scheduler")
+async def debug_scheduler():
+    """Queue depth, wait times and remaining token budget per model for this worker"""
+    return token_scheduler.stats()
+
+@router.get("/debug/models")
+async def debug_models():
+    """Circuit breaker state and recent call latency per model for this worker"""
+    return model_call_policy.stats()
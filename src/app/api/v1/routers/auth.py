@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, Security
+from fastapi import APIRouter, HTTPException, Depends, Response, Security
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer, HTTPAuthorizationCredentials
 from ....models.auth import (
     UserSignUp, 
@@ -8,6 +8,7 @@ from ....models.auth import (
     HTTPError
 )
 from ....services.auth import auth_service
+from ...responses import model_response
 from typing import Dict
 
 router = APIRouter(tags=["auth"])
@@ -60,7 +61,7 @@ async def sign_up(user_data: UserSignUp) -> UserResponse:
         }
     }
 )
-async def login(credentials: UserLogin) -> LoginResponse:
+async def login(credentials: UserLogin) -> Response:
     """
     Log in a user.
     
@@ -72,7 +73,7 @@ async def login(credentials: UserLogin) -> LoginResponse:
     - Access token and user information
     """
     try:
-        return await auth_service.login(credentials)
+        return model_response(await auth_service.login(credentials))
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -110,7 +111,6 @@ async def logout(credentials: HTTPAuthorizationCredentials = Security(security))
     - Success message
     """
     try:
-        # The token is automatically added to the Supabase client's session
         await auth_service.logout(credentials.credentials)
         return {"message": "Successfully logged out"}
     except Exception as e:
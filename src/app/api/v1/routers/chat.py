@@ -1,17 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, AsyncIterator, Optional
 from uuid import UUID
+import json
 from ....models.chat import (
     MessageCreate,
+    MessageBatchCreate,
     MessageResponse,
+    MessagePage,
     ConversationCreate,
     ConversationResponse
 )
 from ....models.responses import HTTPError, HTTPValidationError
-from ....services.chat import chat_service
+from ....models.auth import AuthenticatedUser
+from ....services.chat import chat_service, message_list_adapter
+from ...responses import model_response, adapter_response
+from ....core.config import get_settings
 from ...dependencies import get_current_user
 
 router = APIRouter()
+settings = get_settings()
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a single server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _sse_stream(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield _format_sse(event["event"], event["data"])
 
 @router.post(
     "/conversations",
@@ -39,9 +55,12 @@ router = APIRouter()
 async def create_conversation(
     conversation: ConversationCreate,
     _=Depends(get_current_user)
-) -> ConversationResponse:
+) -> Response:
     """Create a new conversation."""
-    return await chat_service.create_conversation(conversation)
+    return model_response(
+        await chat_service.create_conversation(conversation),
+        status_code=status.HTTP_201_CREATED
+    )
 
 @router.get(
     "/conversations/{conversation_id}",
@@ -68,9 +87,9 @@ async def create_conversation(
 async def get_conversation(
     conversation_id: UUID,
     _=Depends(get_current_user)
-) -> ConversationResponse:
-    """Get a conversation and its messages."""
-    return await chat_service.get_conversation(conversation_id)
+) -> Response:
+    """Get a conversation and its newest page of messages."""
+    return model_response(await chat_service.get_conversation(conversation_id))
 
 @router.post(
     "/conversations/{conversation_id}/messages",
@@ -103,16 +122,58 @@ async def create_message(
     conversation_id: UUID,
     message: MessageCreate,
     _=Depends(get_current_user)
-) -> MessageResponse:
+) -> Response:
     """Create a new message in a conversation."""
-    return await chat_service.create_message(conversation_id, message)
+    return model_response(
+        await chat_service.create_message(conversation_id, message),
+        status_code=status.HTTP_201_CREATED
+    )
+
+@router.post(
+    "/conversations/{conversation_id}/messages/batch",
+    response_model=List[MessageResponse],
+    responses={
+        201: {
+            "model": List[MessageResponse],
+            "description": "Messages created successfully"
+        },
+        400: {
+            "model": HTTPError,
+            "description": "Bad request"
+        },
+        401: {
+            "model": HTTPError,
+            "description": "Not authenticated"
+        },
+        404: {
+            "model": HTTPError,
+            "description": "Conversation not found"
+        },
+        422: {
+            "model": HTTPValidationError,
+            "description": "Validation error"
+        }
+    },
+    status_code=status.HTTP_201_CREATED
+)
+async def create_messages(
+    conversation_id: UUID,
+    batch: MessageBatchCreate,
+    _=Depends(get_current_user)
+) -> Response:
+    """Create several messages in a conversation in one request."""
+    return adapter_response(
+        message_list_adapter,
+        await chat_service.create_messages(conversation_id, batch),
+        status_code=status.HTTP_201_CREATED
+    )
 
 @router.get(
     "/conversations/{conversation_id}/messages",
-    response_model=List[MessageResponse],
+    response_model=MessagePage,
     responses={
         200: {
-            "model": List[MessageResponse],
+            "model": MessagePage,
             "description": "Messages retrieved successfully"
         },
         401: {
@@ -131,7 +192,58 @@ async def create_message(
 )
 async def get_messages(
     conversation_id: UUID,
+    limit: int = Query(settings.MESSAGE_PAGE_SIZE, ge=1, le=settings.MESSAGE_PAGE_MAX),
+    before: Optional[str] = Query(None, description="Cursor; return messages older than it"),
+    after: Optional[str] = Query(None, description="Cursor; return messages newer than it"),
     _=Depends(get_current_user)
-) -> List[MessageResponse]:
-    """Get all messages in a conversation."""
-    return await chat_service.get_messages(conversation_id) 
\ No newline at end of file
+) -> Response:
+    """
+    Get a page of messages in a conversation, oldest first.
+
+    Without a cursor the newest page is returned. Use the `before` cursor from
+    a page to load older messages and the `after` cursor to load newer ones.
+    """
+    return model_response(await chat_service.get_messages(conversation_id, limit, before, after)) 
+
+@router.post(
+    "/conversations/{conversation_id}/reply",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"text/event-stream": {}},
+            "description": "Assistant reply streamed as server-sent events"
+        },
+        400: {
+            "model": HTTPError,
+            "description": "Bad request"
+        },
+        401: {
+            "model": HTTPError,
+            "description": "Not authenticated"
+        },
+        422: {
+            "model": HTTPValidationError,
+            "description": "Validation error"
+        }
+    }
+)
+async def reply(
+    conversation_id: UUID,
+    current_user: AuthenticatedUser = Depends(get_current_user)
+) -> StreamingResponse:
+    """
+    Generate an assistant reply to the conversation and stream it over SSE.
+
+    Emits `delta` events with `{"text": ...}` chunks as they are generated,
+    then a `done` event with the persisted assistant message, or an `error` event.
+    """
+    # Build the prompt before streaming so request errors return a proper status code
+    history = await chat_service.build_prompt(conversation_id, user_id=current_user.id)
+    return StreamingResponse(
+        _sse_stream(chat_service.stream_reply(conversation_id, history, user_id=current_user.id)),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
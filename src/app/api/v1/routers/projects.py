@@ -1,20 +1,59 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+import time
+from typing import Dict, Any, List, Optional
 from uuid import UUID
 from ....models.schemas import (
     ProjectCreate, 
     ProjectResponse, 
     ProjectStatus,
-    AgentProgressUpdate
+    AgentProgressUpdate,
+    CodeVersionDiff,
+    PROJECT_FIELDS,
+    PartialProjectResponse,
+    ProjectPage
 )
 from ....models.responses import HTTPError, HTTPValidationError
-from ....services.agent_system import agent_coordinator
-from ....services.supabase import create_client
+from ....models.auth import AuthenticatedUser
+from ....services.job_queue import generation_workers
+from ....services.database import ProjectRepository, CodeVersionRepository
+from ....services.code_store import CodeStore
+from ....services.progress import progress_manager
+from ....core.exceptions import AuthenticationError
+from ....core.security import token_verifier
 from ....core.config import get_settings
+from ....core.tracing import span
+from ....core.pagination import encode_cursor, decode_cursor
+from ...responses import model_response
+from ...dependencies import get_current_user, get_project_repository, get_code_version_repository
 
 router = APIRouter()
 settings = get_settings()
 
+FIELDS_DESCRIPTION = f"Comma-separated columns to return, from: {', '.join(PROJECT_FIELDS)}"
+
+def _parse_fields(fields: Optional[str]) -> List[str]:
+    """Validate a `fields=` projection against the allowlist; all fields when omitted."""
+    if fields is None:
+        return list(PROJECT_FIELDS)
+    selected = list(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in selected if field not in PROJECT_FIELDS]
+    if unknown or not selected:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}" if unknown else "No fields requested"
+        )
+    return selected
+
+async def _check_owner(projects: ProjectRepository, project_id: UUID, user_id: str) -> None:
+    """Raise 404, as for a missing project, unless the project belongs to `user_id`."""
+    project = await projects.get(project_id, columns="user_id")
+    if not project or str(project["user_id"]) != str(user_id):
+        raise HTTPException(status_code=404, detail="Project not found")
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
 @router.post(
     "/",
     response_model=ProjectResponse,
@@ -28,36 +67,80 @@ settings = get_settings()
 )
 async def create_project(
     project: ProjectCreate,
-    background_tasks: BackgroundTasks
-) -> ProjectResponse:
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    projects: ProjectRepository = Depends(get_project_repository)
+) -> Response:
     """Create a new project and initialize agents"""
     try:
-        # Create a fresh service role client
-        service_client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_ROLE_KEY
-        )
-        
-        # Create project in Supabase using service role client
+        # Create project in Supabase using the shared service role connection
         data = {
             "name": project.name,
             "description": project.description,
             "requirements": project.requirements,
             "status": "initialized",
             "settings": project.settings,
-            "user_id": "49734f1d-97d0-4e54-a84a-9e9101cb7693"  # Hardcoded user ID for development
+            "user_id": current_user.id
         }
         
-        result = service_client.table("projects").insert(data).execute()
-        project_data = result.data[0]
+        # The job carries this span's context, so its generation shows up in the same trace
+        with span("projects.create") as current:
+            project_data = await projects.create(data)
+            current.set(project_id=project_data["id"])
+
+            # Queue the generation; a worker picks it up and checkpoints each stage
+            await generation_workers.enqueue(project_data["id"])
         
-        # Start the generation process in background
-        background_tasks.add_task(
-            agent_coordinator.start_generation,
-            project_data["id"]
+        return model_response(
+            ProjectResponse.model_validate(project_data),
+            status_code=status.HTTP_201_CREATED
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get(
+    "/",
+    response_model=ProjectPage,
+    responses={
+        200: {"description": "Projects retrieved successfully"},
+        400: {"model": HTTPError, "description": "Bad request"},
+        401: {"model": HTTPError, "description": "Not authenticated"},
+        422: {"model": HTTPValidationError, "description": "Validation error"}
+    }
+)
+async def list_projects(
+    limit: int = Query(settings.PROJECT_PAGE_SIZE, ge=1, le=settings.PROJECT_PAGE_MAX),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    projects: ProjectRepository = Depends(get_project_repository)
+) -> Response:
+    """
+    List the current user's projects, most recently updated first.
+
+    Pass a page's `next_cursor` as `cursor` to get the next page. `fields`
+    limits the columns read from the database and returned per project.
+    """
+    selected = _parse_fields(fields)
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        # The cursor is built from updated_at and id, so they are read even when not requested
+        columns = ",".join(dict.fromkeys([*selected, "updated_at", "id"]))
+        rows, has_more = await projects.list_page(current_user.id, limit, after=after, columns=columns)
+        return model_response(
+            ProjectPage(
+                projects=[
+                    PartialProjectResponse.model_validate({field: row[field] for field in selected})
+                    for row in rows
+                ],
+                has_more=has_more,
+                next_cursor=encode_cursor(rows[-1]["updated_at"], rows[-1]["id"]) if has_more else None
+            ),
+            exclude_unset=True
         )
-        
-        return ProjectResponse(**project_data)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -65,25 +148,29 @@ async def create_project(
     "/{project_id}",
     response_model=ProjectResponse,
     responses={
-        200: {"description": "Project retrieved successfully"},
+        200: {"description": "Project retrieved successfully; only the requested `fields` when given"},
+        400: {"model": HTTPError, "description": "Bad request"},
         401: {"model": HTTPError, "description": "Not authenticated"},
         404: {"model": HTTPError, "description": "Project not found"},
         422: {"model": HTTPValidationError, "description": "Validation error"}
     }
 )
-async def get_project(project_id: UUID) -> ProjectResponse:
+async def get_project(
+    project_id: UUID,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    projects: ProjectRepository = Depends(get_project_repository)
+) -> Response:
     """Get project details"""
     try:
-        # Create a fresh service role client
-        service_client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_ROLE_KEY
-        )
-        
-        result = service_client.table("projects").select("*").eq("id", str(project_id)).execute()
-        if not result.data:
+        selected = _parse_fields(fields)
+        project = await projects.get(project_id, columns=",".join(selected))
+        if not project:
             raise HTTPException(status_code=404, detail="Project not found")
-        return ProjectResponse(**result.data[0])
+        if fields is None:
+            return model_response(ProjectResponse.model_validate(project))
+        return model_response(PartialProjectResponse.model_validate(project), exclude_unset=True)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -92,33 +179,112 @@ async def get_project(project_id: UUID) -> ProjectResponse:
     response_model=ProjectStatus,
     responses={
         200: {"description": "Project status retrieved successfully"},
+        304: {"description": "Status unchanged since the given ETag"},
         401: {"model": HTTPError, "description": "Not authenticated"},
         404: {"model": HTTPError, "description": "Project not found"},
         422: {"model": HTTPValidationError, "description": "Validation error"}
     }
 )
-async def get_project_status(project_id: UUID) -> ProjectStatus:
-    """Get current project status and progress"""
-    try:
-        # Create a fresh service role client
-        service_client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_ROLE_KEY
+async def get_project_status(
+    project_id: UUID,
+    request: Request,
+    wait: float = Query(0, ge=0, le=settings.STATUS_LONG_POLL_MAX, description="Seconds to wait for a change from If-None-Match"),
+    projects: ProjectRepository = Depends(get_project_repository)
+) -> Response:
+    """
+    Get current project status and progress.
+
+    Served from the in-process status cache. Send `If-None-Match` with a
+    previous `ETag` to get 304 when nothing changed, and add `wait` to hold
+    the request open until the status changes or the timeout passes.
+    """
+    async def load_status():
+        # Not generating in this process: read the database and cache it briefly
+        entry = await progress_manager.load_status(
+            project_id,
+            lambda: projects.get(project_id, columns="status, updated_at")
         )
-        
-        result = service_client.table("projects").select("*").eq("id", str(project_id)).execute()
-        if not result.data:
+        if entry is None:
             raise HTTPException(status_code=404, detail="Project not found")
-        
-        project = result.data[0]
-        
-        # Create a ProjectStatus response with default values
-        return ProjectStatus(
-            current_agent="initializing",
-            overall_progress=0.0,
-            stage_progress=0.0,
-            status_message=f"Project is in {project['status']} state",
-            last_update=project['updated_at']
+        return entry
+
+    try:
+        entry = await load_status()
+        if_none_match = request.headers.get("if-none-match")
+
+        deadline = time.monotonic() + wait
+        while if_none_match and _etag_matches(if_none_match, entry.etag):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": entry.etag})
+            # Database-backed entries are re-read when they go stale
+            if entry.expires_at is not None:
+                remaining = min(remaining, max(entry.expires_at - time.monotonic(), 0.05))
+            await progress_manager.wait_for_status_change(project_id, entry.etag, remaining)
+            entry = await load_status()
+
+        return Response(
+            content=entry.body,
+            media_type="application/json",
+            headers={"ETag": entry.etag, "Cache-Control": "no-cache"}
         )
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get(
+    "/{project_id}/versions/{base_version}/diff/{target_version}",
+    response_model=CodeVersionDiff,
+    responses={
+        200: {"description": "Version diff computed successfully"},
+        401: {"model": HTTPError, "description": "Not authenticated"},
+        404: {"model": HTTPError, "description": "Project or version not found"},
+        422: {"model": HTTPValidationError, "description": "Validation error"}
+    }
+)
+async def diff_versions(
+    project_id: UUID,
+    base_version: int,
+    target_version: int,
+    current_user: AuthenticatedUser = Depends(get_current_user),
+    projects: ProjectRepository = Depends(get_project_repository),
+    code_versions: CodeVersionRepository = Depends(get_code_version_repository)
+) -> Response:
+    """Compare the files of two code versions by their content-hash manifests"""
+    try:
+        await _check_owner(projects, project_id, current_user.id)
+        base = await code_versions.get(project_id, base_version, columns="manifest")
+        target = await code_versions.get(project_id, target_version, columns="manifest")
+        if not base or not target:
+            raise HTTPException(status_code=404, detail="Version not found")
+
+        return model_response(CodeVersionDiff(
+            base_version=base_version,
+            target_version=target_version,
+            **CodeStore.diff(base["manifest"] or {}, target["manifest"] or {})
+        ))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.websocket("/{project_id}/progress")
+async def project_progress_websocket(
+    websocket: WebSocket,
+    project_id: UUID,
+    token: str = Query(..., description="Access token (browsers cannot set headers on websockets)"),
+    projects: ProjectRepository = Depends(get_project_repository)
+):
+    """WebSocket connection for real-time progress updates"""
+    try:
+        claims = token_verifier.verify(token)
+        await _check_owner(projects, project_id, claims["sub"])
+    except (AuthenticationError, HTTPException):
+        # Not the owner looks the same as a bad token, so project ids cannot be probed
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    await progress_manager.subscribe(project_id, websocket)
@@ -1,9 +1,10 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Dict, Optional
 from pathlib import Path
 import os
 
-# Get the absolute path to the root directory (where .env is located)
+# Get the absolute path to the root directory (where the optional .env is located)
 ROOT_DIR = Path(__file__).resolve().parent.parent.parent.parent
 ENV_FILE = os.path.join(ROOT_DIR, '.env')
 
@@ -12,22 +13,120 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str  # This is the anon key
     SUPABASE_SERVICE_ROLE_KEY: str
-    SUPABASE_JWT_TOKEN: str
+    SUPABASE_JWT_TOKEN: str  # JWT secret used to verify access tokens
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    TOKEN_CACHE_SIZE: int = 10000  # Max verified tokens kept in memory
+    
+    # Direct Postgres connection for LISTEN/NOTIFY; events stay local to the worker when unset
+    DATABASE_URL: Optional[str] = None
+    EVENT_BUS_OUTBOX: int = 10000  # Events waiting to be published before new ones are dropped
+    
+    # Database connection pool settings (PostgREST over HTTP)
+    DB_MAX_CONNECTIONS: int = 50
+    DB_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    DB_KEEPALIVE_EXPIRY: float = 30.0
+    DB_TIMEOUT: float = 10.0
+    
+    # Generation job queue settings
+    GENERATION_WORKERS: int = 2  # Worker tasks run inside the web process; 0 to run them only via worker.py
+    GENERATION_POLL_INTERVAL: float = 2.0
+    GENERATION_JOB_LEASE: int = 900  # Seconds before a silent worker's job is reclaimed
+    GENERATION_MAX_ATTEMPTS: int = 3
+    GENERATION_RETRY_DELAY: float = 30.0
+    
+    # Implementation stage fan-out
+    IMPLEMENTATION_CONCURRENCY: int = 4  # Components generated at once per project
+    IMPLEMENTATION_UNIT_RETRIES: int = 2
+    
+    # Progress websocket settings
+    PROGRESS_SEND_TIMEOUT: float = 5.0  # Seconds before a stalled client is dropped
+    PROGRESS_MAX_SEND_LAG: float = 1.0  # Seconds a send may be outstanding before new updates drop the client
+    PROGRESS_STATE_SIZE: int = 10000  # Projects whose latest progress is kept in memory
+    
+    # Project status cache settings
+    STATUS_CACHE_TTL: float = 2.0  # Seconds a status read from the database is served from memory
+    STATUS_LONG_POLL_MAX: float = 30.0  # Upper bound for the `wait` parameter
+    
+    # QA review settings
+    QA_BATCH_FILES: int = 20  # Files sent to the model per review call
+    QA_VERDICT_CACHE_SIZE: int = 5000
+    
+    # Pagination settings
+    MESSAGE_PAGE_SIZE: int = 50
+    MESSAGE_PAGE_MAX: int = 200
+    PROJECT_PAGE_SIZE: int = 20
+    PROJECT_PAGE_MAX: int = 100
+
+    # Chat context window
+    CHAT_CONTEXT_TOKENS: int = 8000  # Budget for recent turns per reply; older turns are folded into a rolling summary
+    CHAT_SUMMARY_MODEL: str = "claude-3-haiku-20240307"
+    CHAT_SUMMARY_MAX_TOKENS: int = 1024
+
+    # OpenAPI schema, written at build time by scripts/export_openapi.py
+    OPENAPI_FILE: str = os.path.join(ROOT_DIR, "openapi.json")
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting for the writer thread before new ones are dropped
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # Fraction of DEBUG records kept
+    LOG_SAMPLE_RATES: Dict[str, float] = {}  # Per-logger DEBUG rates, e.g. {"app.services.database": 0.01}
+
+    # Tracing
+    TRACE_EXPORTER: str = "none"  # "none" or "jsonl"
+    TRACE_FILE: str = "traces-{pid}.jsonl"  # {pid} keeps worker processes from interleaving writes
     
     # AI API settings
     ANTHROPIC_API_KEY: str
     PERPLEXITY_API_KEY: str
     
+    # Anthropic client settings
+    ANTHROPIC_DEFAULT_MODEL: str = "claude-3-opus-20240229"
+    ANTHROPIC_MAX_TOKENS: int = 4096
+    ANTHROPIC_MAX_CONNECTIONS: int = 100
+    ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    ANTHROPIC_KEEPALIVE_EXPIRY: float = 30.0
+    ANTHROPIC_CONNECT_TIMEOUT: float = 5.0
+    ANTHROPIC_READ_TIMEOUT: float = 600.0
+    ANTHROPIC_MAX_CONCURRENCY: int = 32  # Global limit on in-flight model calls
+    ANTHROPIC_MODEL_CONCURRENCY: Dict[str, int] = {}  # Per-model limits, e.g. {"claude-3-opus-20240229": 8}
+    ANTHROPIC_PROMPT_CACHE_MIN_TOKENS: int = 1024  # Shortest prefix the API will cache (2048 for Haiku models)
+    ANTHROPIC_INPUT_TOKENS_PER_MINUTE: int = 400000  # Org rate limits, applied per model
+    ANTHROPIC_OUTPUT_TOKENS_PER_MINUTE: int = 80000
+    ANTHROPIC_RATE_LIMITS: Dict[str, Dict[str, int]] = {}  # Per-model overrides, e.g. {"claude-3-opus-20240229": {"input": 200000, "output": 40000}}
+
+    # Model call resilience
+    ANTHROPIC_BASE_URL: Optional[str] = None  # Point at a fake server (benchmarks/fake_anthropic.py) for local testing
+    ANTHROPIC_CALL_TIMEOUT: float = 120.0  # Per attempt, non-streaming calls
+    ANTHROPIC_STREAM_IDLE_TIMEOUT: float = 30.0  # Max wait for the first or next stream event
+    ANTHROPIC_MAX_RETRIES: int = 4
+    ANTHROPIC_RETRY_BASE_DELAY: float = 0.5
+    ANTHROPIC_RETRY_MAX_DELAY: float = 20.0
+    ANTHROPIC_BREAKER_THRESHOLD: int = 5  # Consecutive server failures before a model's circuit opens
+    ANTHROPIC_BREAKER_RESET: float = 30.0  # Seconds before an open circuit lets a probe call through
+    ANTHROPIC_HEDGE_PERCENTILE: float = 0.95  # Hedge short calls slower than this latency percentile; 0 disables
+    ANTHROPIC_HEDGE_MAX_TOKENS: int = 1024  # Only calls with at most this many output tokens are hedged
+    ANTHROPIC_HEDGE_MIN_SAMPLES: int = 20
+    STAGE_DEADLINES: Dict[str, float] = {
+        "requirements": 180.0,
+        "architecture": 240.0,
+        "implementation": 900.0,
+        "qa": 600.0
+    }
+    
+    # Agent response memoization
+    RESPONSE_CACHE_SIZE: int = 256
+    RESPONSE_CACHE_TTL: int = 86400  # Seconds
+    RESPONSE_CACHE_DIR: Optional[str] = None  # Enables the on-disk tier when set
+    
     class Config:
         env_file = ENV_FILE
         case_sensitive = True
 
 @lru_cache()
 def get_settings() -> Settings:
-    """Get settings with explicit .env file path."""
-    if not os.path.exists(ENV_FILE):
-        raise FileNotFoundError(f"Environment file not found at: {ENV_FILE}")
-    return Settings(_env_file=ENV_FILE)
+    """Get settings from the environment; a .env file, when present, fills in unset variables."""
+    return Settings()
 
 # Add this for debugging
 def debug_env():
@@ -0,0 +1,212 @@
+import dataclasses
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from enum import Enum
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, Optional
+from uuid import UUID
+from .metrics import LOG_RECORDS_DROPPED
+from .tracing import current_context
+
+REDACTED = "[REDACTED]"
+
+# Field names whose values are never written; `..._tokens` counts are not secrets, `access_token` is
+_SECRET_FIELD = re.compile(r"password|secret|authorization|api_?key|cookie|jwt|(^|_)token$", re.IGNORECASE)
+# Bearer credentials and JWTs that reach a message through an object's repr
+_SECRET_TEXT = re.compile(r"\bbearer\s+[\w\-.~+/]+=*|\beyJ[\w-]+\.[\w-]+\.[\w-]+", re.IGNORECASE)
+
+# Attributes every LogRecord has; anything else was passed with `extra=` and is written as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+# Arguments of these types cannot change before the writer thread formats them
+_IMMUTABLE = (str, int, float, bool, type(None), bytes, UUID, datetime, date, Decimal, Enum)
+
+def _fields(value: Any) -> Optional[Dict[str, Any]]:
+    """The fields of a pydantic model or dataclass instance, or None for anything else."""
+    if isinstance(value, type):
+        return None
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    return None
+
+def redact(value: Any) -> Any:
+    """Copy of `value` with secret fields masked, recursing into dicts, lists, pydantic models and dataclasses.
+
+    Models and dataclasses are replaced by a dict of their fields. Other
+    objects are written through their own str(), which is only scrubbed of
+    bearer tokens and JWTs: a secret in a custom __repr__ is not masked.
+    """
+    if isinstance(value, dict):
+        return {key: REDACTED if _SECRET_FIELD.search(str(key)) else redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return _SECRET_TEXT.sub(REDACTED, value)
+    fields = _fields(value)
+    if fields is not None:
+        return redact(fields)
+    return value
+
+def _render(record: logging.LogRecord) -> str:
+    """Merge the message with its arguments, redacting structured arguments field by field."""
+    message = str(record.msg)
+    args = record.args
+    if not args:
+        return message
+    if isinstance(args, dict):
+        return message % redact(args)
+    return message % tuple(redact(arg) for arg in args)
+
+def _message(record: logging.LogRecord) -> str:
+    return _SECRET_TEXT.sub(REDACTED, _render(record))
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra=` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": _message(record)
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = REDACTED if _SECRET_FIELD.search(key) else redact(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, redacted like the JSON output."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record)} {record.levelname} {record.name}: {_message(record)}"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+class _SamplingQueueHandler(QueueHandler):
+    """Hand records to the writer thread, sampling DEBUG records and dropping records when the queue is full.
+
+    Runs on the caller's thread, so it does as little as possible: formatting
+    happens on the writer thread unless an argument is mutable and could change
+    before the writer gets to it.
+    """
+
+    def __init__(self, records: queue.Queue, debug_sample_rate: float, sample_rates: Dict[str, float]):
+        super().__init__(records)
+        self.debug_sample_rate = debug_sample_rate
+        self.sample_rates = sample_rates
+        self._rates: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        """Sample rate of the most specific configured logger name, cached per logger."""
+        rate = self._rates.get(name)
+        if rate is None:
+            rate = self.debug_sample_rate
+            prefix = name
+            while prefix:
+                if prefix in self.sample_rates:
+                    rate = self.sample_rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._rates[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno <= logging.DEBUG:
+            rate = self._rate(record.name)
+            if rate < 1.0:
+                if random.random() >= rate:
+                    return False
+                # Lets readers scale sampled counts back up
+                record.sample_rate = rate
+        return super().filter(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args:
+            values = args.values() if isinstance(args, dict) else args
+            if not all(isinstance(value, _IMMUTABLE) for value in values):
+                record.msg = _render(record)
+                record.args = None
+        context = current_context()
+        if context and not hasattr(record, "trace_id"):
+            record.trace_id = context["trace_id"]
+            record.span_id = context["span_id"]
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room, so stopping under load still flushes every queued record
+        self.queue.put(self._sentinel)
+
+# Loggers configured by uvicorn's default log_config, with handlers of their own and propagate=False
+_SERVER_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_handler: Optional[_SamplingQueueHandler] = None
+_listener: Optional[_Listener] = None
+
+def configure_logging(
+    level: str = "INFO",
+    fmt: str = "json",
+    queue_size: int = 10000,
+    debug_sample_rate: float = 1.0,
+    sample_rates: Optional[Dict[str, float]] = None
+) -> None:
+    """Route all records, uvicorn's included, through a bounded queue to a thread that writes them to stderr.
+
+    `fmt` is "json" or "text". DEBUG records are kept at `debug_sample_rate`,
+    or at the rate configured for the logger (or its nearest parent) in `sample_rates`.
+    """
+    global _handler, _listener
+    if fmt == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    elif fmt == "text":
+        formatter = TextFormatter()
+    else:
+        raise ValueError(f"Unknown log format: {fmt}")
+    shutdown_logging()
+
+    records: queue.Queue = queue.Queue(queue_size)
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(formatter)
+    _handler = _SamplingQueueHandler(records, debug_sample_rate, sample_rates or {})
+    _listener = _Listener(records, stream)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+    # uvicorn installs its own synchronous stream handlers; send its records through the queue too
+    for name in _SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        for handler in list(server_logger.handlers):
+            server_logger.removeHandler(handler)
+        server_logger.propagate = True
+    _listener.start()
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread."""
+    global _handler, _listener
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,92 @@
+import os
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+    CONTENT_TYPE_LATEST
+)
+
+# Metric values are process-local unless PROMETHEUS_MULTIPROC_DIR is set (to an
+# empty directory shared by all workers) before the app starts; /metrics then
+# aggregates every worker's samples.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+MODEL_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "devoo_http_request_duration_seconds",
+    "Time to complete an HTTP request, including streamed bodies",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_RESPONSES = Counter(
+    "devoo_http_responses_total",
+    "HTTP responses by status code",
+    ["method", "route", "status"]
+)
+
+DB_QUERY_DURATION = Histogram(
+    "devoo_db_query_duration_seconds",
+    "PostgREST query latency",
+    ["table", "operation"],
+    buckets=LATENCY_BUCKETS
+)
+DB_QUERY_ERRORS = Counter(
+    "devoo_db_query_errors_total",
+    "PostgREST queries that raised",
+    ["table", "operation"]
+)
+
+MODEL_QUEUE_WAIT = Histogram(
+    "devoo_model_queue_wait_seconds",
+    "Time model calls waited for the token scheduler",
+    ["model", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+MODEL_CALL_DURATION = Histogram(
+    "devoo_model_call_duration_seconds",
+    "Latency of a single model API attempt",
+    ["model", "stage", "outcome"],
+    buckets=MODEL_BUCKETS
+)
+MODEL_TIME_TO_FIRST_TOKEN = Histogram(
+    "devoo_model_time_to_first_token_seconds",
+    "Time until the first text delta of a streamed model response",
+    ["model", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+MODEL_TOKENS = Counter(
+    "devoo_model_tokens_total",
+    "Tokens billed by model calls",
+    ["model", "stage", "direction"]
+)
+
+LOG_RECORDS_DROPPED = Counter(
+    "devoo_log_records_dropped_total",
+    "Log records dropped because the logging queue was full"
+)
+
+def render_metrics() -> bytes:
+    """Render all metrics in Prometheus text format, aggregated across workers in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+__all__ = [
+    "HTTP_REQUEST_DURATION",
+    "HTTP_RESPONSES",
+    "DB_QUERY_DURATION",
+    "DB_QUERY_ERRORS",
+    "MODEL_QUEUE_WAIT",
+    "MODEL_CALL_DURATION",
+    "MODEL_TIME_TO_FIRST_TOKEN",
+    "MODEL_TOKENS",
+    "LOG_RECORDS_DROPPED",
+    "render_metrics",
+    "CONTENT_TYPE_LATEST"
+]
@@ -0,0 +1,37 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+def _position(sort_value: str, row_id: str) -> Tuple[str, str]:
+    """Check a keyset position, raising ValueError unless it is a timestamp and a UUID.
+
+    Both values end up inside a PostgREST filter string, so nothing else may get through.
+    """
+    sort_value = str(sort_value)
+    datetime.fromisoformat(sort_value)
+    return sort_value, str(UUID(str(row_id)))
+
+def encode_cursor(sort_value: str, row_id: str) -> str:
+    """Encode a keyset position (sort timestamp, id) as an opaque cursor."""
+    raw = json.dumps([sort_value, str(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Decode a cursor produced by `encode_cursor`; raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return _position(sort_value, row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def keyset_filter(column: str, sort_value: str, row_id: str, op: str, id_op: Optional[str] = None) -> str:
+    """Build a PostgREST `or` filter selecting rows strictly past (column, id).
+
+    `op` is "lt" to page backwards or "gt" to page forwards. Pass `id_op`
+    when the id tiebreaker is ordered the other way from `column`.
+    """
+    sort_value, row_id = _position(sort_value, row_id)
+    return f'{column}.{op}."{sort_value}",and({column}.eq."{sort_value}",id.{id_op or op}.{row_id})'
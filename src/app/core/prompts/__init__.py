@@ -1,7 +1,9 @@
+import hashlib
 from .requirements_agent import REQUIREMENTS_PROMPTS
 from .architecture_agent import ARCHITECTURE_PROMPTS
 from .implementation_agent import IMPLEMENTATION_PROMPTS
 from .qa_agent import QA_PROMPTS
+from .chat_agent import CHAT_PROMPTS
 
 class PromptsManager:
     def __init__(self):
@@ -9,7 +11,15 @@ class PromptsManager:
             "requirements": REQUIREMENTS_PROMPTS,
             "architecture": ARCHITECTURE_PROMPTS,
             "implementation": IMPLEMENTATION_PROMPTS,
-            "qa": QA_PROMPTS
+            "qa": QA_PROMPTS,
+            "chat": CHAT_PROMPTS
+        }
+        self.versions = {
+            agent_type: {
+                key: hashlib.sha256(prompt.encode()).hexdigest()[:12]
+                for key, prompt in prompts.items()
+            }
+            for agent_type, prompts in self.prompts.items()
         }
     
     def get_prompt(self, agent_type: str, prompt_key: str) -> str:
@@ -23,4 +33,9 @@ class PromptsManager:
         
         return prompts[prompt_key]
 
+    def get_prompt_version(self, agent_type: str, prompt_key: str) -> str:
+        """Get a content hash identifying the current version of a prompt."""
+        self.get_prompt(agent_type, prompt_key)
+        return self.versions[agent_type][prompt_key]
+
 prompts_manager = PromptsManager() 
\ No newline at end of file
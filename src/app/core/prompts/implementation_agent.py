@@ -26,6 +26,22 @@ Please generate the component following these guidelines:
 6. Proper commenting
 7. Unit tests""",
 
+    "generate_unit": """You are an expert React developer specializing in TypeScript and modern React patterns.
+
+The application architecture follows these instructions. You will then receive one component
+from it, and the file paths already generated for the components it depends on.
+
+Generate only the files for this component, importing its dependencies from the given paths.
+Follow the folder structure from the architecture and use TypeScript with strict mode,
+Tailwind CSS and accessible markup.
+
+Please provide output in the following JSON format:
+{
+    "files": {
+        "<path relative to the project root>": "<file contents>"
+    }
+}""",
+
     "generate_styles": """You are a Tailwind CSS expert.
     Generate styles following Tailwind best practices and maintaining consistency.""",
 
@@ -0,0 +1,92 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Tuple, Optional
+from jose import jwt, JWTError
+from .config import get_settings
+from .exceptions import AuthenticationError
+
+settings = get_settings()
+
+class TokenVerifier:
+    """Verify Supabase access tokens locally and cache the verified claims.
+
+    Tokens are checked against the project's JWT secret, so authenticated
+    requests do not need a round-trip to Supabase Auth. Verified claims are
+    kept in a bounded LRU keyed by token hash until the token expires.
+    """
+
+    def __init__(self, secret: str, audience: str, max_entries: int):
+        self.secret = secret
+        self.audience = audience
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the claims of a valid token or raise AuthenticationError."""
+        key = self._key(token)
+        now = time.time()
+
+        if self._revoked.get(key, 0) > now:
+            raise AuthenticationError("Token has been revoked")
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires_at, claims = cached
+            if expires_at > now:
+                self._cache.move_to_end(key)
+                return claims
+            del self._cache[key]
+
+        try:
+            # Signature, expiry and audience are all checked by decode
+            claims = jwt.decode(
+                token,
+                self.secret,
+                algorithms=["HS256"],
+                audience=self.audience
+            )
+        except JWTError as e:
+            raise AuthenticationError(f"Invalid token: {str(e)}")
+
+        if "sub" not in claims or "exp" not in claims:
+            raise AuthenticationError("Token is missing required claims")
+
+        self._cache[key] = (float(claims["exp"]), claims)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return claims
+
+    def revoke(self, token: str) -> Optional[Tuple[str, float]]:
+        """Add a token to the denylist until it would have expired anyway.
+
+        Returns the (token hash, expiry) entry so it can be shared with other workers.
+        """
+        try:
+            expires_at = float(jwt.get_unverified_claims(token).get("exp", 0))
+        except JWTError:
+            return None
+        key = self._key(token)
+        self.revoke_key(key, expires_at)
+        return key, expires_at
+
+    def revoke_key(self, key: str, expires_at: float) -> None:
+        """Deny a token by its hash."""
+        now = time.time()
+        self._cache.pop(key, None)
+        if expires_at > now:
+            self._revoked[key] = expires_at
+
+        # Drop denylist entries for tokens that have since expired
+        self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+
+token_verifier = TokenVerifier(
+    secret=settings.SUPABASE_JWT_TOKEN,
+    audience=settings.SUPABASE_JWT_AUDIENCE,
+    max_entries=settings.TOKEN_CACHE_SIZE
+)
@@ -0,0 +1,155 @@
+import abc
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+class SpanExporter(abc.ABC):
+    """Receives finished spans; implementations must not block the event loop."""
+
+    @abc.abstractmethod
+    def export(self, span: Dict[str, Any]) -> None:
+        ...
+
+    def shutdown(self) -> None:
+        pass
+
+class JsonLinesExporter(SpanExporter):
+    """Append spans as JSON lines to a file, written from a background thread."""
+
+    def __init__(self, path: str):
+        self.path = path.format(pid=os.getpid())
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Dict[str, Any]) -> None:
+        self._queue.put(span)
+
+    def _run(self) -> None:
+        with open(self.path, "a") as f:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    break
+                f.write(json.dumps(span, default=str) + "\n")
+                if self._queue.empty():
+                    f.flush()
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_time", "_started", "_finished")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self._finished = False
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def context(self) -> Dict[str, str]:
+        return {"trace_id": self.trace_id, "span_id": self.span_id}
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        if self._finished or _exporter is None:
+            return
+        self._finished = True
+        _exporter.export({
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_time,
+            "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            "status": "error" if error is not None else "ok",
+            "error": f"{type(error).__name__}: {error}" if error is not None else None,
+            "pid": os.getpid(),
+            "attributes": self.attributes
+        })
+
+class _NoopSpan(Span):
+    """Returned while tracing is disabled, so instrumented code needs no checks."""
+
+    def __init__(self):
+        pass
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def context(self) -> Dict[str, str]:
+        return {}
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        pass
+
+_NOOP = _NoopSpan()
+_exporter: Optional[SpanExporter] = None
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Install the exporter for finished spans; None disables tracing."""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    if previous is not None and previous is not exporter:
+        previous.shutdown()
+
+def configure_tracing(exporter: str, path: str) -> None:
+    """Configure tracing from settings: exporter "jsonl" writes to `path`, "none" disables it."""
+    if exporter == "jsonl":
+        set_exporter(JsonLinesExporter(path))
+    elif exporter == "none":
+        set_exporter(None)
+    else:
+        raise ValueError(f"Unknown trace exporter: {exporter}")
+
+def shutdown_tracing() -> None:
+    set_exporter(None)
+
+def start_span(name: str, parent: Optional[Dict[str, str]] = None, **attributes: Any) -> Span:
+    """Start a span without making it current; the caller must call `finish()`.
+
+    The parent is the current span unless a propagated `parent` context
+    (from `current_context()`) is given.
+    """
+    if _exporter is None:
+        return _NOOP
+    if parent:
+        return Span(name, parent["trace_id"], parent["span_id"], attributes)
+    current = _current.get()
+    if current is not None and current is not _NOOP:
+        return Span(name, current.trace_id, current.span_id, attributes)
+    return Span(name, os.urandom(16).hex(), None, attributes)
+
+@contextmanager
+def span(name: str, parent: Optional[Dict[str, str]] = None, **attributes: Any):
+    """Trace the enclosed block as a span that is current for code (and tasks) started inside it."""
+    current = start_span(name, parent, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.finish(e)
+        raise
+    finally:
+        current.finish()
+        _current.reset(token)
+
+def current_context() -> Optional[Dict[str, str]]:
+    """Context of the current span, to propagate a trace to another process (e.g. a job payload)."""
+    current = _current.get()
+    if current is None or current is _NOOP:
+        return None
+    return current.context()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, constr
-from typing import Optional
+from typing import Optional, Dict, Any
 
 class UserSignUp(BaseModel):
     email: EmailStr
@@ -22,6 +22,12 @@ class UserProfileResponse(BaseModel):
     full_name: str
     avatar_url: Optional[str] = None
 
+class AuthenticatedUser(BaseModel):
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+    claims: Dict[str, Any] = {}
+
 class LoginResponse(BaseModel):
     access_token: str
     token_type: str
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, UUID4
+from pydantic import BaseModel, UUID4, Field
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
@@ -7,6 +7,9 @@ class MessageCreate(BaseModel):
     role: str = "user"  # default to user, can be 'user' or 'assistant'
     metadata: Dict[str, Any] = {}
 
+class MessageBatchCreate(BaseModel):
+    messages: List[MessageCreate] = Field(..., min_length=1, max_length=100)
+
 class MessageResponse(BaseModel):
     id: UUID4
     conversation_id: UUID4
@@ -15,6 +18,12 @@ class MessageResponse(BaseModel):
     created_at: datetime
     metadata: Dict[str, Any]
 
+class MessagePage(BaseModel):
+    messages: List[MessageResponse] = []
+    has_more: bool = False
+    before: Optional[str] = None  # Cursor for the page of older messages
+    after: Optional[str] = None  # Cursor for messages newer than this page
+
 class ConversationCreate(BaseModel):
     project_id: UUID4
 
@@ -23,4 +32,5 @@ class ConversationResponse(BaseModel):
     project_id: UUID4
     created_at: datetime
     updated_at: datetime
-    messages: List[MessageResponse] = [] 
\ No newline at end of file
+    messages: List[MessageResponse] = []  # Newest page of messages, oldest first
+    next_cursor: Optional[str] = None  # Pass as `before` to fetch older messages 
\ No newline at end of file
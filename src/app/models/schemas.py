@@ -1,6 +1,6 @@
 from enum import Enum
 from typing import Dict, Any, Optional, List
-from pydantic import BaseModel, UUID4, Field
+from pydantic import BaseModel, UUID4, Field, ConfigDict
 from datetime import datetime
 
 class AgentStatus(str, Enum):
@@ -18,8 +18,8 @@ class ProjectCreate(BaseModel):
     requirements: str = Field(..., description="Project requirements")
     settings: Dict[str, Any] = Field(default_factory=dict, description="Project settings")
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "name": "My Project",
                 "description": "A sample project",
@@ -27,6 +27,7 @@ class ProjectCreate(BaseModel):
                 "settings": {}
             }
         }
+    )
 
 class ProjectResponse(BaseModel):
     id: UUID4 = Field(..., description="Project ID")
@@ -37,8 +38,8 @@ class ProjectResponse(BaseModel):
     created_at: datetime = Field(..., description="Creation timestamp")
     updated_at: datetime = Field(..., description="Last update timestamp")
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "id": "123e4567-e89b-12d3-a456-426614174000",
                 "name": "My Project",
@@ -49,6 +50,25 @@ class ProjectResponse(BaseModel):
                 "updated_at": "2024-03-20T12:00:00Z"
             }
         }
+    )
+
+# Columns a client may request with `fields=`; requirements and settings are never listed
+PROJECT_FIELDS = ("id", "name", "description", "status", "stackblitz_id", "created_at", "updated_at")
+
+class PartialProjectResponse(BaseModel):
+    """A project with only the requested `fields`; serialize with `exclude_unset=True`."""
+    id: Optional[UUID4] = Field(None, description="Project ID")
+    name: Optional[str] = Field(None, description="Project name")
+    description: Optional[str] = Field(None, description="Project description")
+    status: Optional[str] = Field(None, description="Project status")
+    stackblitz_id: Optional[str] = Field(None, description="StackBlitz project ID")
+    created_at: Optional[datetime] = Field(None, description="Creation timestamp")
+    updated_at: Optional[datetime] = Field(None, description="Last update timestamp")
+
+class ProjectPage(BaseModel):
+    projects: List[PartialProjectResponse] = Field(default_factory=list, description="Projects, most recently updated first")
+    has_more: bool = Field(False, description="Whether another page follows")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page")
 
 class AgentProgressUpdate(BaseModel):
     agent_type: str = Field(..., description="Type of agent")
@@ -57,8 +77,8 @@ class AgentProgressUpdate(BaseModel):
     progress: float = Field(..., description="Progress percentage", ge=0, le=1)
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Additional metadata")
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "agent_type": "requirements",
                 "status": "analyzing",
@@ -67,6 +87,7 @@ class AgentProgressUpdate(BaseModel):
                 "metadata": {}
             }
         }
+    )
 
 class ProjectStatus(BaseModel):
     current_agent: str = Field(..., description="Currently active agent")
@@ -75,8 +96,8 @@ class ProjectStatus(BaseModel):
     status_message: str = Field(..., description="Current status message")
     last_update: datetime = Field(..., description="Last status update timestamp")
 
-    class Config:
-        schema_extra = {
+    model_config = ConfigDict(
+        json_schema_extra={
             "example": {
                 "current_agent": "requirements",
                 "overall_progress": 0.25,
@@ -85,12 +106,36 @@ class ProjectStatus(BaseModel):
                 "last_update": "2024-03-20T12:00:00Z"
             }
         }
+    )
+
+class CodeVersionDiff(BaseModel):
+    base_version: int = Field(..., description="Version compared from")
+    target_version: int = Field(..., description="Version compared to")
+    added: List[str] = Field(default_factory=list, description="Paths only in the target version")
+    removed: List[str] = Field(default_factory=list, description="Paths only in the base version")
+    modified: List[str] = Field(default_factory=list, description="Paths whose contents changed")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "base_version": 1,
+                "target_version": 2,
+                "added": ["src/components/Header.tsx"],
+                "removed": [],
+                "modified": ["src/App.tsx"]
+            }
+        }
+    )
 
 # Export all models
 __all__ = [
     'AgentStatus',
     'ProjectCreate',
     'ProjectResponse',
+    'PROJECT_FIELDS',
+    'PartialProjectResponse',
+    'ProjectPage',
     'AgentProgressUpdate',
-    'ProjectStatus'
+    'ProjectStatus',
+    'CodeVersionDiff'
 ] 
\ No newline at end of file
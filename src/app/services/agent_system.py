@@ -1,50 +1,366 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable, Awaitable, List
+from collections import OrderedDict
 from uuid import UUID
+import asyncio
+import hashlib
+import json
+import logging
 from ..models.schemas import AgentStatus, AgentProgressUpdate
 from .anthropic_service import anthropic_service
-from .supabase import supabase
+from .response_cache import response_cache, normalize_input
+from .database import database
+from .code_graph import import_graph, direct_importers, content_hash
+from .code_store import code_store
+from .progress import progress_manager
+from .scheduler import current_flow
+from .resilience import deadline
+from ..core.tracing import span
+from ..core.config import get_settings
+from ..core.exceptions import AIGenerationError
 from ..core.prompts import prompts_manager
 
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
 class BaseAgent:
+    agent_type: str = ""
+
     def __init__(self):
         self.anthropic = anthropic_service
+        self.cache = response_cache
         
     async def process(self, message: str) -> str:
         raise NotImplementedError
 
+    async def _generate(
+        self,
+        prompt_key: str,
+        user_input: Any,
+        model: str = settings.ANTHROPIC_DEFAULT_MODEL,
+        temperature: float = 0.7,
+        refresh: bool = False,
+        shared_context: Optional[str] = None
+    ) -> str:
+        """Run a model call for one of this agent's prompts, memoizing the response.
+
+        With `refresh`, a cached response is ignored and replaced. `shared_context`
+        is context several calls send verbatim; it goes into the prompt cache
+        prefix rather than the user message.
+        """
+        with span("agent.generate", agent=self.agent_type, prompt=prompt_key, model=model) as current:
+            system_prompt = prompts_manager.get_prompt(self.agent_type, prompt_key)
+            normalized = normalize_input(user_input)
+            key = self.cache.make_key(
+                self.agent_type,
+                prompt_key,
+                prompts_manager.get_prompt_version(self.agent_type, prompt_key),
+                normalized if shared_context is None else f"{shared_context}\n{normalized}",
+                model,
+                temperature
+            )
+
+            cached = None if refresh else await self.cache.get(key)
+            current.set(cached=cached is not None)
+            if cached is not None:
+                return cached
+
+            # Whitespace collapsing is only for the key: code and formatting in the input must reach the model intact
+            user_message = user_input if isinstance(user_input, str) else normalized
+            response = await self.anthropic.generate_response(
+                system_prompt=system_prompt,
+                user_message=user_message,
+                model=model,
+                temperature=temperature,
+                stage=self.agent_type,
+                shared_context=shared_context
+            )
+            await self.cache.set(key, response)
+            return response
+
+    def _parse_response(self, response: str) -> Dict[str, Any]:
+        """Extract the JSON object from a model response."""
+        start = response.find("{")
+        end = response.rfind("}")
+        if start == -1 or end < start:
+            return {"raw": response}
+        try:
+            return json.loads(response[start:end + 1])
+        except ValueError:
+            return {"raw": response}
+
 class RequirementsAgent(BaseAgent):
+    agent_type = "requirements"
+
     async def analyze_requirements(self, user_input: str) -> Dict[str, Any]:
-        system_prompt = prompts_manager.get_prompt("requirements", "analyze_requirements")
-        
-        response = await self.anthropic.generate_response(
-            system_prompt=system_prompt,
-            user_message=user_input
-        )
+        response = await self._generate("analyze_requirements", user_input)
         return self._parse_response(response)
-    
-    def _parse_response(self, response: str) -> Dict[str, Any]:
-        # Implement response parsing logic
-        pass
 
 class ArchitectureAgent(BaseAgent):
+    agent_type = "architecture"
+
     async def design_architecture(self, project_spec: Dict[str, Any]) -> Dict[str, Any]:
-        system_prompt = prompts_manager.get_prompt("architecture", "design_architecture")
-        
-        response = await self.anthropic.generate_response(
-            system_prompt=system_prompt,
-            user_message=str(project_spec)
-        )
+        response = await self._generate("design_architecture", project_spec)
         return self._parse_response(response)
 
+UnitProgressCallback = Callable[[str, int, int], Awaitable[None]]
+
 class ImplementationAgent(BaseAgent):
-    async def generate_code(self, architecture: Dict[str, Any]) -> Dict[str, Any]:
-        # Implementation
-        pass
+    agent_type = "implementation"
+
+    async def generate_code(
+        self,
+        architecture: Dict[str, Any],
+        on_progress: Optional[UnitProgressCallback] = None
+    ) -> Dict[str, str]:
+        """Generate the codebase as a map of file path to contents.
+
+        Each unit of the architecture's `component_hierarchy` is generated
+        separately, leaves first, with at most IMPLEMENTATION_CONCURRENCY units
+        in flight. `on_progress` is awaited with (unit, completed, total).
+        """
+        units = {
+            unit["name"]: unit
+            for unit in architecture.get("component_hierarchy") or []
+            if isinstance(unit, dict) and unit.get("name")
+        }
+        if not units:
+            # No hierarchy to fan out over; generate the whole app as one unit
+            units = {"App": {"name": "App", "type": "page", "children": []}}
+
+        # Every unit is generated against the same architecture, serialized once so the
+        # prompt prefix is byte-identical across units and read from the prompt cache
+        shared_context = f"Application architecture:\n{normalize_input(architecture)}"
+        semaphore = asyncio.Semaphore(settings.IMPLEMENTATION_CONCURRENCY)
+        unit_files: Dict[str, Dict[str, str]] = {}
+        completed = 0
+
+        async def run_unit(name: str, dependencies: List[str], waits: List[asyncio.Task]) -> None:
+            nonlocal completed
+            # A unit starts only once the units it depends on have been generated
+            await asyncio.gather(*waits)
+            async with semaphore:
+                unit_files[name] = await self._generate_unit(
+                    units[name],
+                    shared_context,
+                    {dep: sorted(unit_files[dep]) for dep in dependencies}
+                )
+            completed += 1
+            if on_progress is not None:
+                await on_progress(name, completed, len(units))
+
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self._dependency_order(units):
+            dependencies = [child for child in units[name].get("children") or [] if child in tasks]
+            tasks[name] = asyncio.create_task(
+                run_unit(name, dependencies, [tasks[dep] for dep in dependencies])
+            )
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            raise
+
+        # Merge per-unit files into one file map, in dependency order
+        files: Dict[str, str] = {}
+        for name in tasks:
+            files.update(unit_files[name])
+        return files
+
+    async def _generate_unit(
+        self,
+        unit: Dict[str, Any],
+        shared_context: str,
+        dependency_files: Dict[str, List[str]]
+    ) -> Dict[str, str]:
+        """Generate one unit's files, retrying only this unit when its output is unusable."""
+        request = {"component": unit, "dependencies": dependency_files}
+        attempts = settings.IMPLEMENTATION_UNIT_RETRIES + 1
+        for attempt in range(attempts):
+            try:
+                response = await self._generate(
+                    "generate_unit", request, refresh=attempt > 0, shared_context=shared_context
+                )
+                files = self._parse_response(response).get("files")
+                if not isinstance(files, dict) or not files:
+                    raise ValueError(f"No files generated for unit {unit['name']}")
+                return {str(path): str(content) for path, content in files.items()}
+            except AIGenerationError:
+                # Transient model failures were already retried by model_call_policy
+                raise
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise
+                logger.warning("Unit %s failed (attempt %d/%d): %s", unit["name"], attempt + 1, attempts, e)
+                await asyncio.sleep(2 ** attempt)
+
+    @staticmethod
+    def _dependency_order(units: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Order units so each comes after the children it depends on (leaves first).
+
+        Units caught in a dependency cycle are appended at the end.
+        """
+        pending = {
+            name: {child for child in unit.get("children") or [] if child in units and child != name}
+            for name, unit in units.items()
+        }
+        order: List[str] = []
+        ready = [name for name, deps in pending.items() if not deps]
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            del pending[name]
+            for other, deps in pending.items():
+                if name in deps:
+                    deps.discard(name)
+                    if not deps and other not in ready:
+                        ready.append(other)
+        return order + list(pending)
 
 class QAAgent(BaseAgent):
-    async def review_code(self, code: Dict[str, Any]) -> Dict[str, Any]:
-        # Implementation
-        pass
+    agent_type = "qa"
+
+    def __init__(self):
+        super().__init__()
+        # Per-file verdicts keyed by the hash of the file and its direct imports
+        self._verdicts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    async def review_code(
+        self,
+        code: Dict[str, str],
+        previous_manifest: Optional[Dict[str, str]] = None,
+        previous_review: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Review a codebase incrementally against the previously reviewed version.
+
+        Only files whose hash differs from `previous_manifest` (path -> content
+        hash), plus files that directly import a changed or removed file, are
+        sent to the model. All other files keep their verdict from `previous_review`.
+
+        Issues the model does not tie to a file of its batch, and the batch's
+        recommendations, are kept per batch. They are carried over while none of
+        the batch's files is re-reviewed or removed.
+        """
+        graph = import_graph(code, known_paths=set(previous_manifest or {}))
+        keys = {path: self._review_key(path, code, graph) for path in code}
+
+        if previous_manifest is None:
+            candidates = set(code)
+        else:
+            changed = {
+                path for path, content in code.items()
+                if previous_manifest.get(path) != content_hash(content)
+            }
+            removed = set(previous_manifest) - set(code)
+            candidates = changed | direct_importers(graph, changed | removed)
+
+        previous_verdicts = (previous_review or {}).get("files") or {}
+        verdicts: Dict[str, Dict[str, Any]] = {}
+        to_review: List[str] = []
+        for path in sorted(code):
+            previous = previous_verdicts.get(path)
+            if path not in candidates and previous and previous.get("key") == keys[path]:
+                verdicts[path] = previous
+            elif keys[path] in self._verdicts:
+                verdicts[path] = self._verdicts[keys[path]]
+            else:
+                to_review.append(path)
+
+        batches = [
+            to_review[i:i + settings.QA_BATCH_FILES]
+            for i in range(0, len(to_review), settings.QA_BATCH_FILES)
+        ]
+        results = await asyncio.gather(*(self._review_batch(batch, code, graph) for batch in batches))
+
+        previous_batches = (previous_review or {}).get("batches")
+        if previous_batches is None and previous_review:
+            # Reviews stored before batches were recorded: their recommendations cover every file
+            previous_batches = [{
+                "paths": sorted(previous_verdicts),
+                "issues": [],
+                "recommendations": previous_review.get("recommendations") or {}
+            }]
+        reviewed = set(to_review)
+        batch_results = [
+            batch for batch in previous_batches or []
+            if all(path in code and path not in reviewed for path in batch["paths"])
+        ]
+
+        for batch, result in zip(batches, results):
+            issues: Dict[str, List[Dict[str, Any]]] = {path: [] for path in batch}
+            unmatched = []
+            for issue in result["issues"]:
+                path = self._issue_path(issue, batch)
+                (issues[path] if path is not None else unmatched).append(issue)
+            for path in batch:
+                verdict = {"key": keys[path], "issues": issues[path]}
+                verdicts[path] = verdict
+                self._remember_verdict(keys[path], verdict)
+            batch_results.append({"paths": batch, "issues": unmatched, "recommendations": result["recommendations"]})
+
+        recommendations: Dict[str, List[Any]] = {}
+        for batch in batch_results:
+            for area, items in batch["recommendations"].items():
+                merged = recommendations.setdefault(area, [])
+                merged.extend(item for item in items if item not in merged)
+
+        return {
+            "issues": [issue for path in sorted(verdicts) for issue in verdicts[path]["issues"]]
+                + [issue for batch in batch_results for issue in batch["issues"]],
+            "recommendations": recommendations,
+            "files": verdicts,
+            "batches": batch_results,
+            "reviewed_files": to_review
+        }
+
+    @staticmethod
+    def _issue_path(issue: Dict[str, Any], paths: List[str]) -> Optional[str]:
+        """The batch file an issue names, ignoring a leading "./" or "/" in either path."""
+        def normalize(path: str) -> str:
+            return (path[2:] if path.startswith("./") else path).lstrip("/")
+
+        file = issue.get("file")
+        if not isinstance(file, str):
+            return None
+        return next((path for path in paths if normalize(path) == normalize(file)), None)
+
+    async def _review_batch(
+        self,
+        paths: List[str],
+        code: Dict[str, str],
+        graph: Dict[str, List[str]]
+    ) -> Dict[str, Any]:
+        response = await self._generate("review_code", {
+            "files": {path: code[path] for path in paths},
+            "imports": {path: graph[path] for path in paths}
+        })
+        parsed = self._parse_response(response)
+        issues = parsed.get("issues")
+        recommendations = parsed.get("recommendations")
+        return {
+            "issues": [issue for issue in issues if isinstance(issue, dict)] if isinstance(issues, list) else [],
+            "recommendations": {
+                area: items for area, items in recommendations.items() if isinstance(items, list)
+            } if isinstance(recommendations, dict) else {}
+        }
+
+    @staticmethod
+    def _review_key(path: str, code: Dict[str, str], graph: Dict[str, List[str]]) -> str:
+        """Hash a file together with its direct imports, so a dependency change invalidates the verdict."""
+        imports = [[dep, content_hash(code[dep]) if dep in code else None] for dep in graph[path]]
+        raw = json.dumps([path, content_hash(code[path]), imports], separators=(",", ":"))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _remember_verdict(self, key: str, verdict: Dict[str, Any]) -> None:
+        self._verdicts[key] = verdict
+        if len(self._verdicts) > settings.QA_VERDICT_CACHE_SIZE:
+            self._verdicts.popitem(last=False)
+
+# Checkpointable pipeline stages, in order
+STAGES = ["requirements", "architecture", "implementation", "qa"]
+
+CheckpointCallback = Callable[[str, Any], Awaitable[None]]
 
 class AgentCoordinator:
     def __init__(self):
@@ -52,11 +368,45 @@ class AgentCoordinator:
         self.architecture_agent = ArchitectureAgent()
         self.implementation_agent = ImplementationAgent()
         self.qa_agent = QAAgent()
+        self.db = database
+        self._statuses: Dict[str, AgentStatus] = {}
         
-    async def start_generation(self, project_id: UUID):
+    async def start_generation(
+        self,
+        project_id: UUID,
+        checkpoints: Optional[Dict[str, Any]] = None,
+        on_checkpoint: Optional[CheckpointCallback] = None
+    ) -> Dict[str, Any]:
+        """Run the agent pipeline for a project.
+
+        Stages already present in `checkpoints` are skipped and their stored
+        output reused, so a resumed job continues from the last finished stage.
+        `on_checkpoint` is awaited with each newly finished stage's output.
+        """
+        outputs = dict(checkpoints or {})
+        # Model calls made by this run (including fanned-out tasks) share one fairness flow
+        flow_token = current_flow.set(f"project:{project_id}")
         try:
-            # Implementation of the coordination logic
-            pass
+            project = await self.db.projects.get(project_id, columns="requirements")
+            if not project:
+                raise ValueError(f"Project {project_id} not found")
+
+            for stage in STAGES:
+                if stage in outputs:
+                    continue
+                with span(f"stage.{stage}", project_id=str(project_id)), \
+                        deadline(settings.STAGE_DEADLINES.get(stage)):
+                    outputs[stage] = await self._run_stage(project_id, stage, project, outputs)
+                if on_checkpoint is not None:
+                    await on_checkpoint(stage, outputs[stage])
+
+            await self._update_progress(project_id, {
+                "agent_type": "system",
+                "status": AgentStatus.COMPLETED,
+                "message": "Project generated successfully!",
+                "progress": 1.0
+            })
+            return outputs
         except Exception as e:
             await self._update_progress(project_id, {
                 "agent_type": "system",
@@ -64,5 +414,103 @@ class AgentCoordinator:
                 "message": f"Error: {str(e)}",
                 "progress": 0
             })
+            raise
+        finally:
+            current_flow.reset(flow_token)
+
+    async def _run_stage(
+        self,
+        project_id: UUID,
+        stage: str,
+        project: Dict[str, Any],
+        outputs: Dict[str, Any]
+    ) -> Any:
+        if stage == "requirements":
+            await self._update_progress(project_id, {
+                "agent_type": "requirements",
+                "status": AgentStatus.ANALYZING,
+                "message": "Analyzing project requirements...",
+                "progress": 0.1
+            })
+            return await self.requirements_agent.analyze_requirements(project["requirements"] or "")
+
+        if stage == "architecture":
+            await self._update_progress(project_id, {
+                "agent_type": "architecture",
+                "status": AgentStatus.DESIGNING,
+                "message": "Designing system architecture...",
+                "progress": 0.3
+            })
+            return await self.architecture_agent.design_architecture(outputs["requirements"])
+
+        if stage == "implementation":
+            await self._update_progress(project_id, {
+                "agent_type": "implementation",
+                "status": AgentStatus.IMPLEMENTING,
+                "message": "Generating code...",
+                "progress": 0.6
+            })
+
+            async def on_unit_progress(unit: str, completed: int, total: int) -> None:
+                await self._update_progress(project_id, {
+                    "agent_type": "implementation",
+                    "status": AgentStatus.IMPLEMENTING,
+                    "message": f"Generated {unit} ({completed}/{total})",
+                    "progress": 0.6 + 0.3 * completed / total,
+                    "metadata": {"unit": unit, "completed": completed, "total": total}
+                })
+
+            files = await self.implementation_agent.generate_code(
+                outputs["architecture"],
+                on_progress=on_unit_progress
+            )
+            version = await code_store.save_version(
+                project_id,
+                files,
+                commit_message="Generated by implementation agent"
+            )
+            # Checkpointed into the job row, so only the manifest; contents stay in the blob store
+            return {"version": version["version"], "manifest": version["manifest"]}
+
+        if stage == "qa":
+            await self._update_progress(project_id, {
+                "agent_type": "qa",
+                "status": AgentStatus.REVIEWING,
+                "message": "Reviewing generated code...",
+                "progress": 0.9
+            })
+            implementation = outputs["implementation"]
+            # Checkpoints from before manifests were recorded still carry the files inline
+            files = await code_store.get_files(implementation)
+            previous = await self.db.code_versions.latest_reviewed(project_id, columns="manifest, metadata")
+            review = await self.qa_agent.review_code(
+                files,
+                previous_manifest=previous["manifest"] if previous else None,
+                previous_review=previous["metadata"].get("review") if previous else None
+            )
+            await self.db.code_versions.update(project_id, implementation["version"], {
+                "metadata": {"reviewed": True, "review": review}
+            })
+            return review
+
+        raise ValueError(f"Unknown stage: {stage}")
+
+    async def _update_progress(self, project_id: UUID, update: Dict[str, Any]) -> None:
+        progress_update = AgentProgressUpdate(**update)
+        logger.info("Project %s [%s] %s", project_id, progress_update.agent_type, progress_update.message)
+        progress_manager.broadcast_update(project_id, progress_update)
+
+        # Persist the project status only when it changes, not on every unit update
+        key = str(project_id)
+        if self._statuses.get(key) == progress_update.status:
+            return
+        if progress_update.status in (AgentStatus.COMPLETED, AgentStatus.ERROR):
+            self._statuses.pop(key, None)
+        else:
+            self._statuses[key] = progress_update.status
+        try:
+            await self.db.projects.update(project_id, {"status": progress_update.status.value})
+        except Exception as e:
+            logger.error("Progress update error: %s", e)
 
-agent_coordinator = AgentCoordinator() 
\ No newline at end of file
+agent_coordinator = AgentCoordinator()
@@ -1,33 +1,364 @@
-from anthropic import Anthropic
+import asyncio
+import time
+from contextlib import asynccontextmanager, aclosing
+import httpx
 from ..core.config import get_settings
 from ..core.exceptions import AIGenerationError
-from typing import Optional, Dict, Any
+from .scheduler import token_scheduler, estimate_tokens, Grant, BACKGROUND
+from .resilience import model_call_policy, remaining, DeadlineExceeded, Attempt
+from ..core.tracing import start_span, Span
+from ..core.metrics import (
+    MODEL_QUEUE_WAIT,
+    MODEL_CALL_DURATION,
+    MODEL_TIME_TO_FIRST_TOKEN,
+    MODEL_TOKENS
+)
+from typing import Optional, Dict, Any, List, AsyncIterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from anthropic import AsyncAnthropic
 
 settings = get_settings()
 
 class AnthropicService:
     def __init__(self):
-        self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-    
+        self.http_client: Optional[httpx.AsyncClient] = None
+        self._client: Optional["AsyncAnthropic"] = None
+        self.policy = model_call_policy
+        self._global_limit = asyncio.Semaphore(settings.ANTHROPIC_MAX_CONCURRENCY)
+        self._model_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def connect(self) -> None:
+        """Create the shared client; called by the application lifespan, not at import."""
+        if self._client is not None:
+            return
+        # Imported here: the SDK is slow to import and only needed once the app serves requests
+        from anthropic import AsyncAnthropic
+
+        # One shared async client per worker; all calls reuse its connection pool
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.ANTHROPIC_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.ANTHROPIC_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.ANTHROPIC_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                settings.ANTHROPIC_READ_TIMEOUT,
+                connect=settings.ANTHROPIC_CONNECT_TIMEOUT
+            )
+        )
+        # Retries are handled by model_call_policy, so the SDK's own are disabled
+        self._client = AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            base_url=settings.ANTHROPIC_BASE_URL,
+            http_client=self.http_client,
+            max_retries=0
+        )
+
+    @property
+    def client(self) -> "AsyncAnthropic":
+        if self._client is None:
+            raise AIGenerationError("Anthropic client is not connected")
+        return self._client
+
+    def _model_limit(self, model: str) -> Optional[asyncio.Semaphore]:
+        """Get the concurrency limiter for a model, if one is configured."""
+        if model not in settings.ANTHROPIC_MODEL_CONCURRENCY:
+            return None
+        if model not in self._model_limits:
+            self._model_limits[model] = asyncio.Semaphore(settings.ANTHROPIC_MODEL_CONCURRENCY[model])
+        return self._model_limits[model]
+
+    @asynccontextmanager
+    async def _limit(self, model: str):
+        """Hold a global and (optional) per-model slot for the duration of a call."""
+        model_limit = self._model_limit(model)
+        if model_limit is not None:
+            async with model_limit:
+                async with self._global_limit:
+                    yield
+        else:
+            async with self._global_limit:
+                yield
+
+    @asynccontextmanager
+    async def _admit(self, request: Dict[str, Any], flow: Optional[str], priority: int, stage: str):
+        """Reserve the call's estimated tokens with the scheduler and settle the actual usage afterwards.
+
+        Held around all attempts of a call (retries and hedges included), so
+        the call keeps its queue position and its tokens are reserved once.
+        Yields a dict holding the call's `span`, which the attempts fill with
+        the response's `usage`.
+        """
+        model = request["model"]
+        input_estimate = self._estimate_input(request)
+        # Spans are started explicitly: streams resume in other tasks, so they cannot be made current
+        queued_at = time.perf_counter()
+        queue_span = start_span("model.queue", model=model, stage=stage, estimated_input_tokens=input_estimate)
+        try:
+            # Queueing counts against the caller's deadline, but never against the model's health
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded("Deadline exceeded before the model call was queued")
+            acquire = token_scheduler.acquire(
+                model, input_estimate, request["max_tokens"], flow=flow, priority=priority
+            )
+            try:
+                grant = await (acquire if left is None else asyncio.wait_for(acquire, left))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded("Deadline exceeded while queued for the model")
+        except BaseException as e:
+            queue_span.finish(e)
+            raise
+        queue_span.finish()
+        MODEL_QUEUE_WAIT.labels(model, stage).observe(time.perf_counter() - queued_at)
+
+        call_span = start_span("model.call", model=model, stage=stage)
+        call: Dict[str, Any] = {"span": call_span}
+        error: Optional[BaseException] = None
+        try:
+            async with self._limit(model):
+                yield call
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            used = call.get("usage")
+            if used is not None:
+                call_span.set(input_tokens=used.input_tokens, output_tokens=used.output_tokens)
+            self._settle(grant, stage, used, input_estimate)
+            call_span.finish(error)
+
+    @asynccontextmanager
+    async def _hedge_lane(
+        self,
+        request: Dict[str, Any],
+        flow: Optional[str],
+        priority: int,
+        stage: str,
+        call: Dict[str, Any]
+    ):
+        """Reserve a slot and tokens of its own for a hedge request, yielding its attempt function.
+
+        Yields None, so the call is not hedged, when that would mean waiting:
+        a hedge must not exceed ANTHROPIC_MAX_CONCURRENCY or queue ahead of
+        other calls. The hedge's usage is settled separately from the call's,
+        so a cancelled loser is still charged for its prompt.
+        """
+        model = request["model"]
+        model_limit = self._model_limit(model)
+        if self._global_limit.locked() or (model_limit is not None and model_limit.locked()):
+            yield None
+            return
+        input_estimate = self._estimate_input(request)
+        grant = token_scheduler.try_acquire(model, input_estimate, request["max_tokens"], flow=flow, priority=priority)
+        if grant is None:
+            yield None
+            return
+        hedge_call: Dict[str, Any] = {"span": call["span"]}
+        try:
+            async with self._limit(model):
+                yield lambda attempt: self._create(request, stage, hedge_call, attempt)
+        finally:
+            self._settle(grant, stage, hedge_call.get("usage"), input_estimate)
+
+    @staticmethod
+    def _estimate_input(request: Dict[str, Any]) -> int:
+        return estimate_tokens(str(request["system"])) + sum(
+            estimate_tokens(str(message["content"])) for message in request["messages"]
+        )
+
+    @staticmethod
+    def _settle(grant: Grant, stage: str, used: Any, input_estimate: int) -> None:
+        """Reconcile a grant with the tokens its request actually used."""
+        if used is not None:
+            token_scheduler.release(grant, used.input_tokens, used.output_tokens)
+            MODEL_TOKENS.labels(grant.model, stage, "input").inc(used.input_tokens)
+            MODEL_TOKENS.labels(grant.model, stage, "output").inc(used.output_tokens)
+        else:
+            # Failed before usage was reported: assume the prompt was billed but nothing was generated
+            token_scheduler.release(grant, input_estimate, 0)
+
+    @staticmethod
+    def _system_blocks(system_prompt: str, shared_context: Optional[str] = None) -> Any:
+        """Mark the system prompt cacheable once it is long enough for the API to cache.
+
+        The static instructions alone are too short; `shared_context`, reused
+        verbatim by a run of calls, follows them so that together they form a
+        prefix repeat calls can read from the prompt cache.
+        """
+        texts = [system_prompt] if shared_context is None else [system_prompt, shared_context]
+        if sum(estimate_tokens(text) for text in texts) < settings.ANTHROPIC_PROMPT_CACHE_MIN_TOKENS:
+            return "\n\n".join(texts)
+        blocks: List[Dict[str, Any]] = [{"type": "text", "text": text} for text in texts]
+        blocks[-1]["cache_control"] = {"type": "ephemeral"}
+        return blocks
+
+    def _build_request(
+        self,
+        system_prompt: str,
+        user_message: Optional[str],
+        model: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        messages: Optional[List[Dict[str, str]]] = None,
+        shared_context: Optional[str] = None
+    ) -> Dict[str, Any]:
+        if messages is None:
+            messages = [{"role": "user", "content": user_message}]
+        return {
+            "model": model,
+            "system": self._system_blocks(system_prompt, shared_context),
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens or settings.ANTHROPIC_MAX_TOKENS
+        }
+
+    @staticmethod
+    def _attempt_span(request: Dict[str, Any], stage: str, call: Dict[str, Any], attempt: Attempt) -> Span:
+        return start_span(
+            "model.attempt",
+            parent=call["span"].context(),
+            model=request["model"],
+            stage=stage,
+            attempt=attempt.number,
+            hedge=attempt.hedge
+        )
+
+    async def _create(self, request: Dict[str, Any], stage: str, call: Dict[str, Any], attempt: Attempt) -> str:
+        """One HTTP attempt; queueing and concurrency limits are handled once by `_admit` around all attempts."""
+        started = time.perf_counter()
+        attempt_span = self._attempt_span(request, stage, call, attempt)
+        error: Optional[BaseException] = None
+        try:
+            response = await self.client.messages.create(**request)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            outcome = attempt.outcome(error)
+            MODEL_CALL_DURATION.labels(request["model"], stage, outcome).observe(time.perf_counter() - started)
+            attempt_span.set(outcome=outcome)
+            attempt_span.finish(error if outcome in ("error", "timeout") else None)
+        call["usage"] = response.usage
+        return "".join(block.text for block in response.content if block.type == "text")
+
+    async def _stream(
+        self,
+        request: Dict[str, Any],
+        stage: str,
+        call: Dict[str, Any],
+        attempt: Attempt
+    ) -> AsyncIterator[str]:
+        model = request["model"]
+        started = time.perf_counter()
+        attempt_span = self._attempt_span(request, stage, call, attempt)
+        error: Optional[BaseException] = None
+        try:
+            async with self.client.messages.stream(**request) as stream:
+                first = True
+                async for text in stream.text_stream:
+                    if first:
+                        MODEL_TIME_TO_FIRST_TOKEN.labels(model, stage).observe(time.perf_counter() - started)
+                        first = False
+                    yield text
+                call["usage"] = (await stream.get_final_message()).usage
+        except BaseException as e:
+            # GeneratorExit when the consumer stops reading; the attempt knows whether the policy timed it out
+            error = e
+            raise
+        finally:
+            outcome = attempt.outcome(error)
+            MODEL_CALL_DURATION.labels(model, stage, outcome).observe(time.perf_counter() - started)
+            attempt_span.set(outcome=outcome)
+            attempt_span.finish(error if outcome in ("error", "timeout") else None)
+
     async def generate_response(
-        self, 
+        self,
         system_prompt: str,
-        user_message: str,
-        model: str = "claude-3-opus-20240229",
+        user_message: Optional[str] = None,
+        model: str = settings.ANTHROPIC_DEFAULT_MODEL,
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        messages: Optional[List[Dict[str, str]]] = None,
+        flow: Optional[str] = None,
+        priority: int = BACKGROUND,
+        hedge: Optional[bool] = None,
+        stage: str = "other",
+        shared_context: Optional[str] = None
     ) -> str:
-        """Generate a response using the Anthropic API."""
-        try:
-            response = await self.client.messages.create(
-                model=model,
-                system=system_prompt,
-                messages=[{"role": "user", "content": user_message}],
-                temperature=temperature,
-                max_tokens=max_tokens
+        """Generate a response using the Anthropic API.
+
+        Pass either a single `user_message` or a full `messages` history.
+        `shared_context` is sent after the system prompt, as part of the cached
+        prefix, for context that several calls share. `flow`
+        and `priority` control how the call is queued by the token scheduler;
+        `stage` labels its metrics. The call is queued once; transient failures
+        are then retried within the current deadline, and short calls are hedged
+        (when a spare slot and tokens are free) unless `hedge` is False.
+        """
+        request = self._build_request(
+            system_prompt, user_message, model, temperature, max_tokens, messages, shared_context
+        )
+        if hedge is None:
+            hedge = (
+                settings.ANTHROPIC_HEDGE_PERCENTILE > 0
+                and request["max_tokens"] <= settings.ANTHROPIC_HEDGE_MAX_TOKENS
             )
-            return response.content
+        try:
+            # Fail fast rather than queue for a model whose circuit is open
+            self.policy.check(model)
+            async with self._admit(request, flow, priority, stage) as call:
+                return await self.policy.call(
+                    model,
+                    lambda attempt: self._create(request, stage, call, attempt),
+                    timeout=settings.ANTHROPIC_CALL_TIMEOUT,
+                    hedge=(lambda: self._hedge_lane(request, flow, priority, stage, call)) if hedge else None
+                )
+        except AIGenerationError:
+            raise
         except Exception as e:
             raise AIGenerationError(f"Error generating AI response: {str(e)}")
 
-anthropic_service = AnthropicService() 
\ No newline at end of file
+    async def stream_response(
+        self,
+        system_prompt: str,
+        user_message: Optional[str] = None,
+        model: str = settings.ANTHROPIC_DEFAULT_MODEL,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        messages: Optional[List[Dict[str, str]]] = None,
+        flow: Optional[str] = None,
+        priority: int = BACKGROUND,
+        stage: str = "other"
+    ) -> AsyncIterator[str]:
+        """Stream a response from the Anthropic API, yielding text deltas as they arrive.
+
+        The stream is cut off if no event arrives within ANTHROPIC_STREAM_IDLE_TIMEOUT
+        of the request being sent; time spent queued does not count.
+        """
+        request = self._build_request(system_prompt, user_message, model, temperature, max_tokens, messages)
+        try:
+            self.policy.check(model)
+            async with self._admit(request, flow, priority, stage) as call:
+                # Closed here, not left to garbage collection, so a consumer that stops
+                # reading ends the HTTP stream before its slot and tokens are released
+                async with aclosing(self.policy.stream(
+                    model,
+                    lambda attempt: self._stream(request, stage, call, attempt)
+                )) as stream:
+                    async for text in stream:
+                        yield text
+        except AIGenerationError:
+            raise
+        except Exception as e:
+            raise AIGenerationError(f"Error streaming AI response: {str(e)}")
+
+    async def close(self) -> None:
+        """Close the shared HTTP connection pool."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+            self.http_client = None
+
+anthropic_service = AnthropicService()
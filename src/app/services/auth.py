@@ -1,23 +1,33 @@
 from typing import Dict, Any
 from ..models.auth import UserSignUp, UserLogin, LoginResponse, UserProfileResponse
-from .supabase import supabase, service_role_client
+from .supabase import get_supabase_client
+from .database import database
+from .events import event_bus
+from ..core.security import token_verifier
 from fastapi import HTTPException
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AuthService:
     def __init__(self):
-        self.supabase = supabase
-        self.service_role_client = service_role_client
+        self.db = database
+        # Logouts on other workers deny the token here too
+        event_bus.on_invalidate("tokens", self._on_token_revoked)
+
+    @staticmethod
+    def _on_token_revoked(payload: Dict[str, Any]) -> None:
+        token_verifier.revoke_key(payload["key"], float(payload["expires_at"]))
+
+    @property
+    def supabase(self):
+        return get_supabase_client()
     
     async def sign_up(self, user_data: UserSignUp) -> Dict[str, Any]:
         """Sign up a new user."""
         try:
             # Create auth user with regular client
-            auth_response = self.supabase.auth.sign_up({
+            auth_response = await self.supabase.auth.sign_up({
                 "email": user_data.email,
                 "password": user_data.password,
                 "options": {
@@ -27,24 +37,22 @@ class AuthService:
                 }
             })
             
-            logger.info(f"Auth response: {auth_response}")
-            
             if not auth_response.user:
                 raise HTTPException(status_code=400, detail="Failed to create user")
             
-            # Create user profile with service role client to bypass RLS
+            # Create user profile over the service role connection to bypass RLS
             profile_data = {
                 "id": auth_response.user.id,
                 "full_name": user_data.full_name,
                 "avatar_url": None
             }
             
-            # Insert into user_profiles table using service role client
-            profile_result = self.service_role_client.table("user_profiles").insert(profile_data).execute()
-            logger.info(f"Profile creation result: {profile_result}")
+            # Insert into user_profiles table using service role connection
+            profile_result = await self.db.profiles.create(profile_data)
             
-            if not profile_result.data:
+            if not profile_result:
                 raise HTTPException(status_code=400, detail="Failed to create user profile")
+            logger.info("Signed up user %s", auth_response.user.id)
             
             return {
                 "id": auth_response.user.id,
@@ -53,40 +61,31 @@ class AuthService:
                 "avatar_url": None
             }
         except Exception as e:
-            logger.error(f"Sign up error: {str(e)}")
+            logger.error("Sign up error: %s", e)
             raise HTTPException(status_code=400, detail=str(e))
 
     async def login(self, credentials: UserLogin) -> LoginResponse:
         """Log in a user."""
         try:
-            logger.info(f"Attempting login for email: {credentials.email}")
-            
             # Try to sign in
-            auth_response = self.supabase.auth.sign_in_with_password({
+            auth_response = await self.supabase.auth.sign_in_with_password({
                 "email": credentials.email,
                 "password": credentials.password
             })
             
-            logger.info(f"Auth response received: {auth_response}")
-            
             if not auth_response.user:
                 logger.error("No user in auth response")
                 raise HTTPException(status_code=401, detail="Invalid credentials")
             
-            # Get user profile using service role client to ensure access
+            # Get user profile using service role connection to ensure access
             try:
-                profile = self.service_role_client.table("user_profiles") \
-                    .select("*") \
-                    .eq("id", auth_response.user.id) \
-                    .single() \
-                    .execute()
-                
-                logger.info(f"Profile retrieved: {profile}")
+                profile = await self.db.profiles.get(auth_response.user.id)
                 
-                if not profile.data:
-                    logger.error(f"No profile found for user {auth_response.user.id}")
+                if not profile:
+                    logger.error("No profile found for user %s", auth_response.user.id)
                     raise HTTPException(status_code=404, detail="User profile not found")
                 
+                logger.debug("Logged in user %s", auth_response.user.id)
                 # Create response matching LoginResponse model
                 return LoginResponse(
                     access_token=auth_response.session.access_token,
@@ -94,27 +93,31 @@ class AuthService:
                     user=UserProfileResponse(
                         id=auth_response.user.id,
                         email=auth_response.user.email,
-                        full_name=profile.data["full_name"],
-                        avatar_url=profile.data.get("avatar_url")
+                        full_name=profile["full_name"],
+                        avatar_url=profile.get("avatar_url")
                     )
                 )
             except Exception as profile_error:
-                logger.error(f"Error retrieving profile: {str(profile_error)}")
+                logger.error("Error retrieving profile: %s", profile_error)
                 raise HTTPException(status_code=500, detail="Error retrieving user profile")
                 
         except Exception as e:
-            logger.error(f"Login error: {str(e)}")
+            logger.error("Login error: %s", e)
             raise HTTPException(status_code=401, detail=f"Login failed: {str(e)}")
 
     async def logout(self, token: str) -> None:
         """Log out a user using their token."""
         try:
-            logger.info("Attempting to logout user")
-            # For Supabase, we don't need to pass the token to sign_out
-            self.supabase.auth.sign_out()
-            logger.info("Successfully logged out user")
+            # Deny the token locally, since requests are no longer checked against Supabase Auth
+            revoked = token_verifier.revoke(token)
+            if revoked is not None:
+                key, expires_at = revoked
+                event_bus.invalidate("tokens", key, expires_at=expires_at)
+            # The client is shared, so sign out the caller's session by its token, not the client's stored one
+            await self.supabase.auth.admin.sign_out(token, scope="local")
+            logger.debug("Logged out user")
         except Exception as e:
-            logger.error(f"Logout error: {str(e)}")
+            logger.error("Logout error: %s", e)
             raise HTTPException(status_code=401, detail="Failed to logout")
 
 auth_service = AuthService() 
\ No newline at end of file
@@ -1,88 +1,207 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 from uuid import UUID
-from ..models.chat import MessageCreate, ConversationCreate, MessageResponse, ConversationResponse
-from .supabase import service_role_client
+from ..models.chat import (
+    MessageCreate,
+    MessageBatchCreate,
+    ConversationCreate,
+    MessageResponse,
+    ConversationResponse,
+    MessagePage
+)
+from ..core.config import get_settings
+from ..core.pagination import encode_cursor, decode_cursor
+from ..core.prompts import prompts_manager
+from .anthropic_service import anthropic_service
+from .scheduler import INTERACTIVE
+from .database import database, is_foreign_key_violation
+from .chat_context import context_builder, message_metadata
 from fastapi import HTTPException
+from pydantic import TypeAdapter
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Validates raw rows into models in a single pass
+message_list_adapter = TypeAdapter(List[MessageResponse])
+
+def _message_cursor(message: Dict[str, Any]) -> str:
+    return encode_cursor(message["created_at"], message["id"])
 
 class ChatService:
     def __init__(self):
-        self.client = service_role_client
+        self.db = database
 
     async def create_conversation(self, conversation_data: ConversationCreate) -> ConversationResponse:
         """Create a new conversation."""
         try:
-            result = self.client.table("conversations").insert({
-                "project_id": str(conversation_data.project_id)
-            }).execute()
+            conversation = await self.db.conversations.create(conversation_data.project_id)
 
-            if not result.data:
+            if not conversation:
                 raise HTTPException(status_code=400, detail="Failed to create conversation")
 
-            return ConversationResponse(**result.data[0], messages=[])
+            return ConversationResponse.model_validate({**conversation, "messages": []})
 
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Create conversation error: {str(e)}")
+            logger.error("Create conversation error: %s", e)
             raise HTTPException(status_code=400, detail=str(e))
 
     async def get_conversation(self, conversation_id: UUID) -> ConversationResponse:
-        """Get a conversation and its messages."""
+        """Get a conversation and its newest page of messages."""
         try:
-            # Get conversation
-            conv_result = self.client.table("conversations").select("*").eq("id", str(conversation_id)).single().execute()
+            # Get the conversation with its newest page of messages embedded
+            conversation = await self.db.conversations.get_with_messages(
+                conversation_id,
+                settings.MESSAGE_PAGE_SIZE
+            )
             
-            if not conv_result.data:
+            if not conversation:
                 raise HTTPException(status_code=404, detail="Conversation not found")
 
-            # Get messages for this conversation
-            msg_result = self.client.table("messages").select("*").eq("conversation_id", str(conversation_id)).execute()
+            rows = conversation.pop("messages") or []
+            has_more = len(rows) > settings.MESSAGE_PAGE_SIZE
+            rows = rows[:settings.MESSAGE_PAGE_SIZE][::-1]
             
-            # Convert to response model
-            messages = [MessageResponse(**msg) for msg in msg_result.data]
-            return ConversationResponse(**conv_result.data, messages=messages)
-
+            # Validate the conversation and its message rows in one pass
+            return ConversationResponse.model_validate({
+                **conversation,
+                "messages": rows,
+                "next_cursor": _message_cursor(rows[0]) if has_more else None
+            })
+
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Get conversation error: {str(e)}")
+            logger.error("Get conversation error: %s", e)
             raise HTTPException(status_code=400, detail=str(e))
 
     async def create_message(self, conversation_id: UUID, message_data: MessageCreate) -> MessageResponse:
         """Create a new message in a conversation."""
         try:
-            # First verify conversation exists
-            conv_exists = self.client.table("conversations").select("id").eq("id", str(conversation_id)).single().execute()
-            
-            if not conv_exists.data:
-                raise HTTPException(status_code=404, detail="Conversation not found")
-
-            # Create message
-            result = self.client.table("messages").insert({
+            # A missing conversation surfaces as a foreign key violation on insert
+            message = await self.db.messages.create({
                 "conversation_id": str(conversation_id),
                 "content": message_data.content,
                 "role": message_data.role,
-                "metadata": message_data.metadata
-            }).execute()
+                "metadata": message_metadata(message_data.content, message_data.metadata)
+            })
 
-            if not result.data:
+            if not message:
                 raise HTTPException(status_code=400, detail="Failed to create message")
 
-            return MessageResponse(**result.data[0])
+            return MessageResponse.model_validate(message)
 
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(f"Create message error: {str(e)}")
+            if is_foreign_key_violation(e):
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            logger.error("Create message error: %s", e)
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def create_messages(self, conversation_id: UUID, batch: MessageBatchCreate) -> List[MessageResponse]:
+        """Create several messages in a conversation with a single insert."""
+        try:
+            rows = await self.db.messages.create_many([
+                {
+                    "conversation_id": str(conversation_id),
+                    "content": message.content,
+                    "role": message.role,
+                    "metadata": message_metadata(message.content, message.metadata)
+                }
+                for message in batch.messages
+            ])
+            return message_list_adapter.validate_python(rows)
+
+        except Exception as e:
+            if is_foreign_key_violation(e):
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            logger.error("Create messages error: %s", e)
             raise HTTPException(status_code=400, detail=str(e))
 
-    async def get_messages(self, conversation_id: UUID) -> List[MessageResponse]:
-        """Get all messages in a conversation."""
+    async def get_messages(
+        self,
+        conversation_id: UUID,
+        limit: Optional[int] = None,
+        before: Optional[str] = None,
+        after: Optional[str] = None
+    ) -> MessagePage:
+        """Get a page of messages in a conversation, keyset-paginated on (created_at, id)."""
+        if before and after:
+            raise HTTPException(status_code=400, detail="Use either 'before' or 'after', not both")
         try:
-            result = self.client.table("messages").select("*").eq("conversation_id", str(conversation_id)).execute()
-            return [MessageResponse(**msg) for msg in result.data]
+            before_key = decode_cursor(before) if before else None
+            after_key = decode_cursor(after) if after else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        try:
+            rows, has_more = await self.db.messages.list_page(
+                conversation_id,
+                limit or settings.MESSAGE_PAGE_SIZE,
+                before=before_key,
+                after=after_key
+            )
+            # Paging forwards from a cursor implies older messages exist
+            has_older = bool(rows) and (has_more if after_key is None else True)
+            return MessagePage.model_validate({
+                "messages": rows,
+                "has_more": has_more,
+                "before": _message_cursor(rows[0]) if has_older else None,
+                "after": _message_cursor(rows[-1]) if rows else after
+            })
 
         except Exception as e:
-            logger.error(f"Get messages error: {str(e)}")
+            logger.error("Get messages error: %s", e)
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def build_prompt(self, conversation_id: UUID, user_id: Optional[str] = None) -> List[Dict[str, str]]:
+        """Build the model message history for a reply: rolling summary plus recent turns within budget."""
+        try:
+            return await context_builder.build(conversation_id, user_id)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error("Build prompt error: %s", e)
             raise HTTPException(status_code=400, detail=str(e))
 
-chat_service = ChatService() 
\ No newline at end of file
+    async def stream_reply(
+        self,
+        conversation_id: UUID,
+        history: List[Dict[str, str]],
+        user_id: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream an assistant reply as events, then persist the complete message.
+
+        The model call is queued as interactive traffic, shared fairly per user.
+
+        Yields `delta` events for each text chunk, followed by a single `done`
+        event carrying the stored message, or an `error` event on failure.
+        """
+        chunks: List[str] = []
+        try:
+            async for text in anthropic_service.stream_response(
+                system_prompt=prompts_manager.get_prompt("chat", "reply"),
+                messages=history,
+                flow=f"user:{user_id}" if user_id else None,
+                priority=INTERACTIVE,
+                stage="chat"
+            ):
+                chunks.append(text)
+                yield {"event": "delta", "data": {"text": text}}
+
+            # Persist the full reply in a single write once the stream completes
+            message = await self.create_message(
+                conversation_id,
+                MessageCreate(content="".join(chunks), role="assistant")
+            )
+            yield {"event": "done", "data": message.model_dump(mode="json")}
+
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error("Stream reply error: %s", detail)
+            yield {"event": "error", "data": {"detail": detail}}
+
+chat_service = ChatService()
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID
+from fastapi import HTTPException
+from ..core.config import get_settings
+from ..core.prompts import prompts_manager
+from .anthropic_service import anthropic_service
+from .database import database
+from .scheduler import estimate_tokens, BACKGROUND
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+SUMMARY_COLUMNS = "id, summary, summarized_until_created_at, summarized_until_id"
+MESSAGE_COLUMNS = "id, conversation_id, role, content, created_at, metadata"
+
+def message_metadata(content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Message metadata with the cached token count used for context packing."""
+    return {**metadata, "tokens": estimate_tokens(content)}
+
+def _tokens(message: Dict[str, Any]) -> int:
+    tokens = (message.get("metadata") or {}).get("tokens")
+    return tokens if isinstance(tokens, int) else estimate_tokens(message["content"])
+
+def _boundary(conversation: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    if not conversation.get("summarized_until_id"):
+        return None
+    return conversation["summarized_until_created_at"], conversation["summarized_until_id"]
+
+class ConversationContextBuilder:
+    """Build bounded model input for chat replies.
+
+    Each reply sends the conversation's rolling summary plus the most recent
+    turns that fit CHAT_CONTEXT_TOKENS. Once the unsummarized tail outgrows
+    the budget, its oldest half is folded into the summary in the background,
+    so per-turn input stays roughly constant however long the conversation runs.
+    """
+
+    def __init__(self, db=database):
+        self.db = db
+        self._compactions: Dict[str, asyncio.Task] = {}
+
+    async def _load(self, conversation_id: UUID) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        conversation = await self.db.conversations.get(conversation_id, columns=SUMMARY_COLUMNS)
+        if not conversation:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+
+        rows = await self.db.messages.list_for_conversation(
+            conversation_id,
+            columns=MESSAGE_COLUMNS,
+            after=_boundary(conversation)
+        )
+        await self._backfill_tokens(rows)
+        return conversation, rows
+
+    async def _backfill_tokens(self, rows: List[Dict[str, Any]]) -> None:
+        """Cache token counts on messages stored before counts were recorded."""
+        missing = [row for row in rows if not isinstance((row.get("metadata") or {}).get("tokens"), int)]
+        if not missing:
+            return
+        for row in missing:
+            row["metadata"] = message_metadata(row["content"], row.get("metadata") or {})
+        try:
+            await self.db.messages.set_token_counts(missing)
+        except Exception as e:
+            logger.warning("Could not cache message token counts: %s", e)
+
+    async def build(self, conversation_id: UUID, user_id: Optional[str] = None) -> List[Dict[str, str]]:
+        """Build the model message history for the next reply."""
+        conversation, rows = await self._load(conversation_id)
+
+        # Keep the newest messages that fit the budget; the latest message is always kept
+        budget = settings.CHAT_CONTEXT_TOKENS
+        used = 0
+        start = len(rows)
+        while start > 0 and (start == len(rows) or used + _tokens(rows[start - 1]) <= budget):
+            start -= 1
+            used += _tokens(rows[start])
+
+        if start > 0 or used > budget:
+            self._schedule_compaction(conversation_id, user_id)
+
+        # The API expects alternating turns, so merge consecutive messages from the same role
+        history: List[Dict[str, str]] = []
+        for msg in rows[start:]:
+            if history and history[-1]["role"] == msg["role"]:
+                history[-1]["content"] += "\n\n" + msg["content"]
+            else:
+                history.append({"role": msg["role"], "content": msg["content"]})
+
+        if not history or history[-1]["role"] != "user":
+            raise HTTPException(status_code=400, detail="Conversation has no user message to reply to")
+        if history[0]["role"] != "user":
+            history.pop(0)
+
+        # Carry the summary in the first user turn so the system prompt stays cacheable
+        if conversation.get("summary"):
+            history[0]["content"] = (
+                f"<conversation_summary>\n{conversation['summary']}\n</conversation_summary>\n\n"
+                f"{history[0]['content']}"
+            )
+        return history
+
+    def _schedule_compaction(self, conversation_id: UUID, user_id: Optional[str]) -> None:
+        key = str(conversation_id)
+        if key in self._compactions:
+            return
+        task = asyncio.create_task(self.compact(conversation_id, user_id))
+        self._compactions[key] = task
+        task.add_done_callback(lambda _: self._compactions.pop(key, None))
+
+    async def compact(self, conversation_id: UUID, user_id: Optional[str] = None) -> bool:
+        """Fold the oldest unsummarized messages into the rolling summary.
+
+        Messages are folded until the remaining tail fits half the budget, so
+        summarization runs once per half-budget of new conversation.
+        """
+        try:
+            conversation, rows = await self._load(conversation_id)
+            if sum(_tokens(row) for row in rows) <= settings.CHAT_CONTEXT_TOKENS:
+                return False
+
+            # rows[split:] stay verbatim; the newest message is never folded
+            kept = 0
+            split = len(rows)
+            while split > 1 and kept + _tokens(rows[split - 1]) <= settings.CHAT_CONTEXT_TOKENS // 2:
+                split -= 1
+                kept += _tokens(rows[split])
+            folded = rows[:min(split, len(rows) - 1)]
+            if not folded:
+                return False
+
+            transcript = "\n\n".join(f"{row['role'].capitalize()}: {row['content']}" for row in folded)
+            summary = await anthropic_service.generate_response(
+                system_prompt=prompts_manager.get_prompt("chat", "summarize"),
+                user_message=(
+                    f"Previous summary:\n{conversation.get('summary') or '(none)'}\n\n"
+                    f"New messages:\n{transcript}"
+                ),
+                model=settings.CHAT_SUMMARY_MODEL,
+                temperature=0,
+                max_tokens=settings.CHAT_SUMMARY_MAX_TOKENS,
+                flow=f"user:{user_id}" if user_id else None,
+                priority=BACKGROUND,
+                stage="chat_summary"
+            )
+
+            last = folded[-1]
+            stored = await self.db.conversations.update_summary(
+                conversation_id,
+                {
+                    "summary": summary,
+                    "summarized_until_created_at": last["created_at"],
+                    "summarized_until_id": last["id"]
+                },
+                expected_until_id=conversation.get("summarized_until_id")
+            )
+            if stored:
+                logger.info("Summarized %d messages of conversation %s", len(folded), conversation_id)
+            return stored
+
+        except Exception as e:
+            logger.error("Conversation summary error for %s: %s", conversation_id, e)
+            return False
+
+context_builder = ConversationContextBuilder()
@@ -0,0 +1,52 @@
+import hashlib
+import posixpath
+import re
+from typing import Dict, List, Optional, Set
+
+# Static and dynamic imports, re-exports and require() calls
+IMPORT_PATTERN = re.compile(
+    r"""(?:import|export)\s+(?:[^'";]*?\s+from\s+)?['"]([^'"]+)['"]"""
+    r"""|(?:import|require)\s*\(\s*['"]([^'"]+)['"]\s*\)"""
+)
+
+RESOLVE_SUFFIXES = [
+    "", ".ts", ".tsx", ".js", ".jsx",
+    "/index.ts", "/index.tsx", "/index.js", "/index.jsx"
+]
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+def _resolve(specifier: str, importer: str, paths: Set[str]) -> Optional[str]:
+    """Resolve an import specifier to a file in the codebase, if it is local."""
+    if specifier.startswith("@/"):
+        base = posixpath.join("src", specifier[2:])
+    elif specifier.startswith("."):
+        base = posixpath.normpath(posixpath.join(posixpath.dirname(importer), specifier))
+    else:
+        return None  # Package import
+    for suffix in RESOLVE_SUFFIXES:
+        if base + suffix in paths:
+            return base + suffix
+    return None
+
+def import_graph(files: Dict[str, str], known_paths: Optional[Set[str]] = None) -> Dict[str, List[str]]:
+    """Map each file to the local files it imports directly.
+
+    `known_paths` adds resolvable paths that are not in `files`, such as
+    files removed since a previous version.
+    """
+    paths = set(files) | (known_paths or set())
+    graph: Dict[str, List[str]] = {}
+    for path, content in files.items():
+        imports = set()
+        for match in IMPORT_PATTERN.finditer(content):
+            resolved = _resolve(match.group(1) or match.group(2), path, paths)
+            if resolved and resolved != path:
+                imports.add(resolved)
+        graph[path] = sorted(imports)
+    return graph
+
+def direct_importers(graph: Dict[str, List[str]], targets: Set[str]) -> Set[str]:
+    """Files that directly import any of `targets`."""
+    return {path for path, imports in graph.items() if targets.intersection(imports)}
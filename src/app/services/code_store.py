@@ -0,0 +1,61 @@
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+from .code_graph import content_hash
+from .database import database, Database
+
+class CodeStore:
+    """Content-addressed storage for generated code.
+
+    File contents are stored once per hash in `code_blobs`; each
+    `code_versions` row only holds a manifest of path -> hash.
+    """
+
+    def __init__(self, db: Database):
+        self.db = db
+
+    async def save_version(
+        self,
+        project_id: UUID,
+        files: Dict[str, str],
+        commit_message: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Store any new blobs and create the next version with its manifest."""
+        manifest = {path: content_hash(content) for path, content in files.items()}
+        blobs = {blob_hash: files[path] for path, blob_hash in manifest.items()}
+
+        # Only upload content the blob table does not already hold
+        stored = await self.db.code_blobs.existing(list(blobs))
+        await self.db.code_blobs.put_many({h: c for h, c in blobs.items() if h not in stored})
+
+        latest = await self.db.code_versions.latest(project_id, columns="version")
+        return await self.db.code_versions.create({
+            "project_id": str(project_id),
+            "version": latest["version"] + 1 if latest else 1,
+            "manifest": manifest,
+            "commit_message": commit_message,
+            "metadata": metadata or {}
+        })
+
+    async def get_files(self, version: Dict[str, Any], paths: Optional[List[str]] = None) -> Dict[str, str]:
+        """Load the contents of a version's files, optionally only `paths`."""
+        manifest = version.get("manifest")
+        if manifest is None:
+            # Version written before manifests existed
+            files = version.get("files") or {}
+            return {path: files[path] for path in (paths or files) if path in files}
+
+        wanted = {path: manifest[path] for path in (paths or manifest) if path in manifest}
+        contents = await self.db.code_blobs.get_many(sorted(set(wanted.values())))
+        return {path: contents[blob_hash] for path, blob_hash in wanted.items()}
+
+    @staticmethod
+    def diff(base: Dict[str, str], target: Dict[str, str]) -> Dict[str, List[str]]:
+        """Compare two manifests by hash without loading any file contents."""
+        return {
+            "added": sorted(path for path in target if path not in base),
+            "removed": sorted(path for path in base if path not in target),
+            "modified": sorted(path for path in target if path in base and base[path] != target[path])
+        }
+
+code_store = CodeStore(database)
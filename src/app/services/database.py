@@ -0,0 +1,436 @@
+from datetime import datetime, timedelta, timezone
+import logging
+import time
+from typing import Dict, Any, List, Optional, Tuple
+from uuid import UUID
+import httpx
+from postgrest import AsyncPostgrestClient, APIError
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+from ..core.config import get_settings
+from ..core.exceptions import DatabaseError
+from ..core.pagination import keyset_filter
+from ..core.metrics import DB_QUERY_DURATION, DB_QUERY_ERRORS
+from ..core.tracing import span
+from .events import event_bus
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Postgres error code raised when an insert references a missing parent row
+FOREIGN_KEY_VIOLATION = "23503"
+
+def is_foreign_key_violation(error: Exception) -> bool:
+    return isinstance(error, APIError) and error.code == FOREIGN_KEY_VIOLATION
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+_OPERATIONS = {"GET": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+def _operation(query) -> str:
+    """Name a PostgREST request by its HTTP method, telling upserts apart from inserts."""
+    operation = _OPERATIONS.get(getattr(query, "http_method", None), "other")
+    if operation == "insert" and "resolution=" in (getattr(query, "headers", None) or {}).get("Prefer", ""):
+        return "upsert"
+    return operation
+
+class _PooledPostgrestClient(AsyncPostgrestClient):
+    """PostgREST client whose HTTP session uses a configurable connection pool."""
+
+    def __init__(self, base_url: str, *, limits: httpx.Limits, **kwargs):
+        self._limits = limits
+        super().__init__(base_url, **kwargs)
+
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            verify=verify,
+            proxy=proxy,
+            limits=self._limits,
+            follow_redirects=True
+        )
+
+class BaseRepository:
+    table_name: str
+
+    def __init__(self, db: "Database"):
+        self.db = db
+
+    def _table(self):
+        return self.db.client.from_(self.table_name)
+
+    async def _execute(self, query, operation: Optional[str] = None):
+        """Execute a query, timing it by table and operation."""
+        operation = operation or _operation(query)
+        started = time.perf_counter()
+        try:
+            with span("db.query", table=self.table_name, operation=operation):
+                return await query.execute()
+        except Exception:
+            DB_QUERY_ERRORS.labels(self.table_name, operation).inc()
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            DB_QUERY_DURATION.labels(self.table_name, operation).observe(elapsed)
+            # Runs on every query; sample it with LOG_SAMPLE_RATES when DEBUG is enabled
+            logger.debug("%s %s took %.1fms", operation, self.table_name, elapsed * 1000)
+
+class UserProfileRepository(BaseRepository):
+    table_name = "user_profiles"
+
+    async def create(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result = await self._execute(self._table().insert(data))
+        return result.data[0] if result.data else None
+
+    async def get(self, user_id: str, columns: str = "*") -> Optional[Dict[str, Any]]:
+        result = await self._execute(self._table().select(columns).eq("id", user_id).limit(1))
+        return result.data[0] if result.data else None
+
+class ProjectRepository(BaseRepository):
+    table_name = "projects"
+
+    async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self._execute(self._table().insert(data))
+        return result.data[0]
+
+    async def get(self, project_id: UUID, columns: str = "*") -> Optional[Dict[str, Any]]:
+        result = await self._execute(self._table().select(columns).eq("id", str(project_id)).limit(1))
+        return result.data[0] if result.data else None
+
+    async def update(self, project_id: UUID, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result = await self._execute(self._table().update(data).eq("id", str(project_id)))
+        event_bus.invalidate("projects", str(project_id))
+        return result.data[0] if result.data else None
+
+    async def list_page(
+        self,
+        user_id: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+        columns: str = "*"
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Fetch one page of a user's projects, most recently updated first.
+
+        Ordered by (updated_at desc, id) to match idx_projects_user_updated_id.
+        `after` is the decoded (updated_at, id) position of the previous page's
+        last row; `columns` must include both. Returns the rows and whether more exist.
+        """
+        query = self._table().select(columns).eq("user_id", user_id)
+        if after is not None:
+            query = query.or_(keyset_filter("updated_at", *after, op="lt", id_op="gt"))
+
+        # Fetch one extra row to learn whether another page exists
+        result = await self._execute(query.order("updated_at", desc=True).order("id").limit(limit + 1))
+        return result.data[:limit], len(result.data) > limit
+
+class ConversationRepository(BaseRepository):
+    table_name = "conversations"
+
+    async def create(self, project_id: UUID) -> Dict[str, Any]:
+        result = await self._execute(self._table().insert({"project_id": str(project_id)}))
+        return result.data[0]
+
+    async def get(self, conversation_id: UUID, columns: str = "*") -> Optional[Dict[str, Any]]:
+        result = await self._execute(self._table().select(columns).eq("id", str(conversation_id)).limit(1))
+        return result.data[0] if result.data else None
+
+    async def update_summary(
+        self,
+        conversation_id: UUID,
+        data: Dict[str, Any],
+        expected_until_id: Optional[str]
+    ) -> bool:
+        """Store a new rolling summary unless another writer advanced it first."""
+        query = self._table().update(data).eq("id", str(conversation_id))
+        if expected_until_id is None:
+            query = query.is_("summarized_until_id", "null")
+        else:
+            query = query.eq("summarized_until_id", expected_until_id)
+        result = await self._execute(query)
+        return bool(result.data)
+
+    async def get_with_messages(self, conversation_id: UUID, message_limit: int) -> Optional[Dict[str, Any]]:
+        """Fetch a conversation and its newest messages in one query via resource embedding.
+
+        The embedded `messages` are returned newest first, with up to
+        `message_limit + 1` rows so callers can tell whether older ones exist.
+        """
+        result = await self._execute(
+            self._table()
+            .select("*, messages(*)")
+            .eq("id", str(conversation_id))
+            .order("created_at", desc=True, foreign_table="messages")
+            .order("id", desc=True, foreign_table="messages")
+            .limit(message_limit + 1, foreign_table="messages")
+            .limit(1)
+        )
+        return result.data[0] if result.data else None
+
+class MessageRepository(BaseRepository):
+    table_name = "messages"
+
+    async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Timestamped here rather than by DEFAULT NOW(), so single and batch inserts share one clock
+        result = await self._execute(self._table().insert({"created_at": _now().isoformat(timespec="microseconds"), **data}))
+        return result.data[0]
+
+    async def create_many(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert several messages in a single request, keeping their order.
+
+        NOW() is the same for every row of one statement, which would leave the
+        batch ordered by its random ids; each row gets the next microsecond instead.
+        """
+        started = _now()
+        result = await self._execute(self._table().insert([
+            {"created_at": (started + timedelta(microseconds=position)).isoformat(timespec="microseconds"), **row}
+            for position, row in enumerate(rows)
+        ]))
+        return result.data
+
+    async def list_for_conversation(
+        self,
+        conversation_id: UUID,
+        columns: str = "*",
+        after: Optional[Tuple[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """List messages oldest first, optionally only those after a (created_at, id) position."""
+        query = self._table().select(columns).eq("conversation_id", str(conversation_id))
+        if after is not None:
+            query = query.or_(keyset_filter("created_at", *after, op="gt"))
+        result = await self._execute(query.order("created_at").order("id"))
+        return result.data
+
+    async def set_token_counts(self, rows: List[Dict[str, Any]]) -> None:
+        """Write back token counts computed for older messages, in a single request."""
+        await self._execute(self._table().upsert(rows, on_conflict="id"))
+
+    async def list_page(
+        self,
+        conversation_id: UUID,
+        limit: int,
+        before: Optional[Tuple[str, str]] = None,
+        after: Optional[Tuple[str, str]] = None,
+        columns: str = "*"
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """Fetch one page of messages ordered by (created_at, id).
+
+        Without a cursor this returns the newest page. `before`/`after` are
+        decoded (created_at, id) positions. Rows are returned oldest first,
+        along with whether more rows exist in the paging direction.
+        """
+        query = self._table().select(columns).eq("conversation_id", str(conversation_id))
+        if after is not None:
+            query = query.or_(keyset_filter("created_at", *after, op="gt")) \
+                .order("created_at") \
+                .order("id")
+        else:
+            if before is not None:
+                query = query.or_(keyset_filter("created_at", *before, op="lt"))
+            query = query.order("created_at", desc=True).order("id", desc=True)
+
+        # Fetch one extra row to learn whether another page exists
+        result = await self._execute(query.limit(limit + 1))
+        rows = result.data[:limit]
+        has_more = len(result.data) > limit
+        if after is None:
+            rows.reverse()
+        return rows, has_more
+
+class CodeVersionRepository(BaseRepository):
+    table_name = "code_versions"
+
+    async def create(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self._execute(self._table().insert(data))
+        return result.data[0]
+
+    async def get(self, project_id: UUID, version: int, columns: str = "*") -> Optional[Dict[str, Any]]:
+        result = await self._execute(
+            self._table()
+            .select(columns)
+            .eq("project_id", str(project_id))
+            .eq("version", version)
+            .limit(1)
+        )
+        return result.data[0] if result.data else None
+
+    async def latest(self, project_id: UUID, columns: str = "*") -> Optional[Dict[str, Any]]:
+        result = await self._execute(
+            self._table()
+            .select(columns)
+            .eq("project_id", str(project_id))
+            .order("version", desc=True)
+            .limit(1)
+        )
+        return result.data[0] if result.data else None
+
+    async def latest_reviewed(self, project_id: UUID, columns: str = "*") -> Optional[Dict[str, Any]]:
+        """Get the newest version that has been through QA review."""
+        result = await self._execute(
+            self._table()
+            .select(columns)
+            .eq("project_id", str(project_id))
+            .eq("metadata->>reviewed", "true")
+            .order("version", desc=True)
+            .limit(1)
+        )
+        return result.data[0] if result.data else None
+
+    async def update(self, project_id: UUID, version: int, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        result = await self._execute(
+            self._table()
+            .update(data)
+            .eq("project_id", str(project_id))
+            .eq("version", version)
+        )
+        return result.data[0] if result.data else None
+
+class CodeBlobRepository(BaseRepository):
+    table_name = "code_blobs"
+
+    # Hashes per `in` filter, keeping request URLs to a reasonable length
+    CHUNK_SIZE = 100
+
+    async def existing(self, hashes: List[str]) -> set:
+        found = set()
+        for i in range(0, len(hashes), self.CHUNK_SIZE):
+            result = await self._execute(
+                self._table().select("hash").in_("hash", hashes[i:i + self.CHUNK_SIZE])
+            )
+            found.update(row["hash"] for row in result.data)
+        return found
+
+    async def put_many(self, blobs: Dict[str, str]) -> None:
+        """Store blobs keyed by content hash, skipping any that already exist."""
+        if not blobs:
+            return
+        await self._execute(
+            self._table().upsert(
+                [
+                    {"hash": blob_hash, "content": content, "size": len(content.encode())}
+                    for blob_hash, content in blobs.items()
+                ],
+                on_conflict="hash",
+                ignore_duplicates=True
+            )
+        )
+
+    async def get_many(self, hashes: List[str]) -> Dict[str, str]:
+        contents: Dict[str, str] = {}
+        for i in range(0, len(hashes), self.CHUNK_SIZE):
+            result = await self._execute(
+                self._table().select("hash, content").in_("hash", hashes[i:i + self.CHUNK_SIZE])
+            )
+            contents.update((row["hash"], row["content"]) for row in result.data)
+        return contents
+
+class GenerationJobRepository(BaseRepository):
+    table_name = "generation_jobs"
+
+    async def enqueue(self, project_id: UUID, max_attempts: int, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        result = await self._execute(self._table().insert({
+            "project_id": str(project_id),
+            "max_attempts": max_attempts,
+            "payload": payload or {}
+        }))
+        return result.data[0]
+
+    async def claim(self, worker_id: str, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """Claim the next runnable job (FOR UPDATE SKIP LOCKED inside the RPC)."""
+        result = await self._execute(self.db.client.rpc("claim_generation_job", {
+            "p_worker_id": worker_id,
+            "p_lease_seconds": lease_seconds
+        }), operation="rpc")
+        return result.data[0] if result.data else None
+
+    async def checkpoint(self, job_id: str, worker_id: str, checkpoints: Dict[str, Any]) -> None:
+        """Store finished stage outputs and renew the lease."""
+        await self._execute(
+            self._table()
+            .update({"checkpoints": checkpoints, "locked_at": _now().isoformat()})
+            .eq("id", job_id)
+            .eq("locked_by", worker_id)
+        )
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> None:
+        await self._execute(
+            self._table()
+            .update({"locked_at": _now().isoformat()})
+            .eq("id", job_id)
+            .eq("locked_by", worker_id)
+        )
+
+    async def complete(self, job_id: str, worker_id: str) -> None:
+        await self._execute(
+            self._table()
+            .update({"status": "completed", "locked_by": None, "error": None})
+            .eq("id", job_id)
+            .eq("locked_by", worker_id)
+        )
+
+    async def fail(self, job: Dict[str, Any], worker_id: str, error: str, retry_delay: float) -> None:
+        """Requeue a failed job with a delay, or mark it failed once attempts run out."""
+        if job["attempts"] < job["max_attempts"]:
+            data = {
+                "status": "queued",
+                "run_after": (_now() + timedelta(seconds=retry_delay)).isoformat()
+            }
+        else:
+            data = {"status": "failed"}
+        await self._execute(
+            self._table()
+            .update({**data, "locked_by": None, "error": error})
+            .eq("id", job["id"])
+            .eq("locked_by", worker_id)
+        )
+
+class Database:
+    """Long-lived, pooled PostgREST connection shared by all repositories.
+
+    Connected and closed by the application lifespan; routes get the
+    repositories through the dependencies in `api/dependencies.py`.
+    """
+
+    def __init__(self):
+        self._client: Optional[_PooledPostgrestClient] = None
+        self.profiles = UserProfileRepository(self)
+        self.projects = ProjectRepository(self)
+        self.conversations = ConversationRepository(self)
+        self.messages = MessageRepository(self)
+        self.code_versions = CodeVersionRepository(self)
+        self.code_blobs = CodeBlobRepository(self)
+        self.generation_jobs = GenerationJobRepository(self)
+
+    async def connect(self) -> None:
+        """Open the pooled HTTP session using the service role key."""
+        if self._client is not None:
+            return
+        self._client = _PooledPostgrestClient(
+            f"{settings.SUPABASE_URL}/rest/v1",
+            headers={
+                **DEFAULT_POSTGREST_CLIENT_HEADERS,
+                "apikey": settings.SUPABASE_SERVICE_ROLE_KEY,
+                "Authorization": f"Bearer {settings.SUPABASE_SERVICE_ROLE_KEY}"
+            },
+            timeout=settings.DB_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.DB_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DB_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.DB_KEEPALIVE_EXPIRY
+            )
+        )
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> AsyncPostgrestClient:
+        if self._client is None:
+            raise DatabaseError("Database is not connected")
+        return self._client
+
+database = Database()
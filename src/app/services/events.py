@@ -0,0 +1,140 @@
+import asyncio
+import inspect
+import json
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+import asyncpg
+from ..core.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Channels shared by every worker
+PROGRESS_CHANNEL = "devoo_progress"
+INVALIDATE_CHANNEL = "devoo_invalidate"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+Handler = Callable[[Dict[str, Any]], Any]
+
+class EventBus:
+    """Cross-worker pub/sub over Postgres LISTEN/NOTIFY.
+
+    Publishing never blocks the caller: events go into a bounded outbox that
+    a background task drains. Handlers run in every worker except the one that
+    published the event, which is expected to have applied it locally already.
+    """
+
+    def __init__(self, dsn: Optional[str]):
+        self.dsn = dsn
+        self.origin = uuid4().hex
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._invalidation_handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._outbox: Optional[asyncio.Queue] = None
+        self._publisher: Optional[asyncio.Task] = None
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._publish_conn: Optional[asyncpg.Connection] = None
+        self.subscribe(INVALIDATE_CHANNEL, self._dispatch_invalidation)
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers[channel].append(handler)
+
+    def on_invalidate(self, kind: str, handler: Handler) -> None:
+        """Register a handler for remote cache invalidations of `kind` (currently projects and tokens)."""
+        self._invalidation_handlers[kind].append(handler)
+
+    async def connect(self) -> None:
+        if not self.dsn:
+            logger.info("DATABASE_URL not set; events stay within this worker")
+            return
+        self._outbox = asyncio.Queue(maxsize=settings.EVENT_BUS_OUTBOX)
+        self._publish_conn = await asyncpg.connect(self.dsn)
+        await self._listen()
+        self._publisher = asyncio.create_task(self._publish_loop())
+
+    async def close(self) -> None:
+        if self._publisher is not None:
+            self._publisher.cancel()
+            await asyncio.gather(self._publisher, return_exceptions=True)
+            self._publisher = None
+        for conn in (self._listen_conn, self._publish_conn):
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        self._listen_conn = self._publish_conn = None
+        self._outbox = None
+
+    def publish(self, channel: str, payload: Dict[str, Any]) -> None:
+        """Queue an event for other workers without waiting on the database."""
+        if self._outbox is None:
+            return
+        message = json.dumps({"origin": self.origin, "payload": payload}, default=str)
+        if len(message.encode()) > MAX_PAYLOAD_BYTES:
+            logger.warning("Event on %s too large to publish (%d bytes)", channel, len(message))
+            return
+        try:
+            self._outbox.put_nowait((channel, message))
+        except asyncio.QueueFull:
+            logger.warning("Event outbox full; dropping event on %s", channel)
+
+    def invalidate(self, kind: str, key: str, **data: Any) -> None:
+        """Tell other workers to drop cached state for `kind`/`key`."""
+        self.publish(INVALIDATE_CHANNEL, {**data, "kind": kind, "key": key})
+
+    async def _listen(self) -> None:
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        self._listen_conn.add_termination_listener(self._on_listener_lost)
+        for channel in self._handlers:
+            await self._listen_conn.add_listener(channel, self._on_notify)
+
+    def _on_listener_lost(self, conn: asyncpg.Connection) -> None:
+        if self._publisher is not None:
+            logger.warning("Event listener connection lost; reconnecting")
+            asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 1.0
+        while self._publisher is not None:
+            try:
+                await self._listen()
+                return
+            except Exception as e:
+                logger.error("Event listener reconnect failed: %s", e)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+
+    async def _publish_loop(self) -> None:
+        while True:
+            channel, message = await self._outbox.get()
+            try:
+                if self._publish_conn is None or self._publish_conn.is_closed():
+                    self._publish_conn = await asyncpg.connect(self.dsn)
+                await self._publish_conn.execute("SELECT pg_notify($1, $2)", channel, message)
+            except Exception as e:
+                logger.error("Event publish error on %s: %s", channel, e)
+
+    def _on_notify(self, conn: asyncpg.Connection, pid: int, channel: str, message: str) -> None:
+        try:
+            event = json.loads(message)
+        except ValueError:
+            return
+        if event.get("origin") == self.origin:
+            return
+        self._dispatch(self._handlers.get(channel, ()), event.get("payload") or {})
+
+    def _dispatch_invalidation(self, payload: Dict[str, Any]) -> None:
+        self._dispatch(self._invalidation_handlers.get(payload.get("kind"), ()), payload)
+
+    @staticmethod
+    def _dispatch(handlers, payload: Dict[str, Any]) -> None:
+        for handler in handlers:
+            try:
+                result = handler(payload)
+                if inspect.isawaitable(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.error("Event handler error: %s", e)
+
+event_bus = EventBus(settings.DATABASE_URL)
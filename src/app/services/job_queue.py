@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Dict, Any, List, Optional
+from uuid import UUID
+from ..core.config import get_settings
+from ..core.tracing import span, current_context
+from .agent_system import agent_coordinator, AgentCoordinator
+from .database import database, Database
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+class GenerationWorkerPool:
+    """Pool of workers that claim generation jobs from Postgres and run them.
+
+    Jobs are claimed with `SELECT ... FOR UPDATE SKIP LOCKED`, so any number of
+    pools (in web processes or standalone `worker.py` processes) can share the
+    queue. Each finished stage is checkpointed on the job row.
+    """
+
+    def __init__(self, db: Database, coordinator: AgentCoordinator, concurrency: int):
+        self.db = db
+        self.coordinator = coordinator
+        self.concurrency = concurrency
+        self._tasks: List[asyncio.Task] = []
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    async def enqueue(self, project_id: UUID, payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a generation job for a project.
+
+        The current trace context travels in the payload, so the job's spans
+        join the trace of the request that queued it.
+        """
+        payload = dict(payload or {})
+        trace = current_context()
+        if trace is not None:
+            payload["trace"] = {**trace, "enqueued_at": time.time()}
+        return await self.db.generation_jobs.enqueue(
+            project_id,
+            max_attempts=settings.GENERATION_MAX_ATTEMPTS,
+            payload=payload
+        )
+
+    async def start(self) -> None:
+        for n in range(self.concurrency):
+            self._tasks.append(asyncio.create_task(self._worker(f"{self._worker_prefix}:{n}")))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, worker_id: str) -> None:
+        while True:
+            try:
+                job = await self.db.generation_jobs.claim(worker_id, settings.GENERATION_JOB_LEASE)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Job claim error: %s", e)
+                job = None
+
+            if job is None:
+                await asyncio.sleep(settings.GENERATION_POLL_INTERVAL)
+                continue
+
+            await self._run_job(job, worker_id)
+
+    async def _run_job(self, job: Dict[str, Any], worker_id: str) -> None:
+        checkpoints = dict(job.get("checkpoints") or {})
+
+        async def on_checkpoint(stage: str, output: Any) -> None:
+            checkpoints[stage] = output
+            await self.db.generation_jobs.checkpoint(job["id"], worker_id, checkpoints)
+
+        trace = (job.get("payload") or {}).get("trace")
+        job_span = span(
+            "generation.job",
+            parent=trace,
+            job_id=job["id"],
+            project_id=job["project_id"],
+            worker_id=worker_id,
+            attempt=job["attempts"],
+            resumed_stages=sorted(checkpoints),
+            queue_delay_seconds=round(time.time() - trace["enqueued_at"], 3) if trace else None
+        )
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"], worker_id))
+        try:
+            logger.info("Worker %s running job %s (attempt %s)", worker_id, job["id"], job["attempts"])
+            with job_span:
+                await self.coordinator.start_generation(
+                    job["project_id"],
+                    checkpoints=checkpoints,
+                    on_checkpoint=on_checkpoint
+                )
+                await self.db.generation_jobs.complete(job["id"], worker_id)
+        except asyncio.CancelledError:
+            # Leave the job running; its lease expires and another worker resumes it
+            raise
+        except Exception as e:
+            logger.error("Job %s failed: %s", job["id"], e)
+            try:
+                await self.db.generation_jobs.fail(job, worker_id, str(e), settings.GENERATION_RETRY_DELAY)
+            except Exception as fail_error:
+                logger.error("Job fail update error: %s", fail_error)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str, worker_id: str) -> None:
+        """Renew the job lease while a long stage is running."""
+        while True:
+            await asyncio.sleep(settings.GENERATION_JOB_LEASE / 3)
+            try:
+                await self.db.generation_jobs.heartbeat(job_id, worker_id)
+            except Exception as e:
+                logger.error("Job heartbeat error: %s", e)
+
+generation_workers = GenerationWorkerPool(
+    db=database,
+    coordinator=agent_coordinator,
+    concurrency=settings.GENERATION_WORKERS
+)
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Set, Optional, Any
+from uuid import UUID
+from fastapi import WebSocket
+from ..core.config import get_settings
+from ..models.schemas import AgentProgressUpdate, AgentStatus, ProjectStatus
+from .events import event_bus, PROGRESS_CHANNEL
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Agent and overall progress a generation reports when it enters each status, for statuses read from the database
+_STAGE_BY_STATUS = {
+    AgentStatus.ANALYZING.value: ("requirements", 0.1),
+    AgentStatus.DESIGNING.value: ("architecture", 0.3),
+    AgentStatus.IMPLEMENTING.value: ("implementation", 0.6),
+    AgentStatus.REVIEWING.value: ("qa", 0.9),
+    AgentStatus.COMPLETED.value: ("system", 1.0),
+    AgentStatus.ERROR.value: ("system", 0.0)
+}
+
+class _Subscriber:
+    """A websocket client with its own coalescing send queue.
+
+    Only the latest pending update per agent is kept, so a client that falls
+    behind receives the current state rather than every intermediate step.
+    The queue therefore never grows; a slow client shows up as a send that
+    has not completed.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.pending: "OrderedDict[str, str]" = OrderedDict()
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        # When the send in flight started; None while the sender is idle
+        self.sending_since: Optional[float] = None
+
+    def offer(self, agent_type: str, message: str) -> bool:
+        """Queue an update without blocking; returns False if the client is too far behind."""
+        if self.closed:
+            return False
+        self.pending.pop(agent_type, None)
+        self.pending[agent_type] = message
+        self.wakeup.set()
+        return self.sending_since is None or time.monotonic() - self.sending_since <= settings.PROGRESS_MAX_SEND_LAG
+
+class _StatusEntry:
+    def __init__(self, status: ProjectStatus, expires_at: Optional[float]):
+        self.status = status
+        self.body = status.model_dump_json()
+        self.etag = f'"{hashlib.sha1(self.body.encode()).hexdigest()[:16]}"'
+        # None for statuses published by a local generation; those never go stale
+        self.expires_at = expires_at
+
+    def fresh(self) -> bool:
+        return self.expires_at is None or self.expires_at > time.monotonic()
+
+class ProgressManager:
+    def __init__(self):
+        self.active_connections: Dict[str, Set[_Subscriber]] = defaultdict(set)
+        # Websocket closes in flight, referenced until done so they are not garbage collected
+        self._closing: Set[asyncio.Task] = set()
+        # Latest serialized update per agent for each project, sent to new subscribers
+        self.latest: "OrderedDict[str, OrderedDict[str, str]]" = OrderedDict()
+        self.project_status: "OrderedDict[str, _StatusEntry]" = OrderedDict()
+        self._status_changed: Dict[str, asyncio.Event] = {}
+        self._status_waiters: Dict[str, int] = defaultdict(int)
+        # Database reads in flight, shared by every request for the same project
+        self._status_loads: Dict[str, asyncio.Task] = {}
+        # Updates from generations running on other workers
+        event_bus.subscribe(PROGRESS_CHANNEL, self._on_remote_update)
+        event_bus.on_invalidate("projects", self._on_project_invalidated)
+
+    def _on_remote_update(self, payload: Dict[str, Any]) -> None:
+        self.broadcast_update(
+            payload["project_id"],
+            AgentProgressUpdate(**payload["update"]),
+            publish=False
+        )
+
+    def _on_project_invalidated(self, payload: Dict[str, Any]) -> None:
+        # Only database-backed entries can be stale; live ones arrive as progress events
+        entry = self.project_status.get(payload["key"])
+        if entry is not None and entry.expires_at is not None:
+            del self.project_status[payload["key"]]
+
+    def set_status(self, project_id: UUID, status: ProjectStatus, ttl: Optional[float] = None) -> _StatusEntry:
+        """Cache a project's status and wake any long-polling readers if it changed."""
+        key = str(project_id)
+        entry = _StatusEntry(status, time.monotonic() + ttl if ttl is not None else None)
+        previous = self.project_status.get(key)
+        self.project_status[key] = entry
+        self.project_status.move_to_end(key)
+        if len(self.project_status) > settings.PROGRESS_STATE_SIZE:
+            self.project_status.popitem(last=False)
+
+        if previous is None or previous.etag != entry.etag:
+            event = self._status_changed.pop(key, None)
+            if event is not None:
+                event.set()
+        return entry
+
+    def get_status(self, project_id: UUID) -> Optional[_StatusEntry]:
+        """Get the cached status, or None if missing or stale."""
+        entry = self.project_status.get(str(project_id))
+        return entry if entry is not None and entry.fresh() else None
+
+    async def load_status(
+        self,
+        project_id: UUID,
+        fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[_StatusEntry]:
+        """Get the cached status, reading the project row with `fetch` when it is missing or stale.
+
+        Concurrent callers for the same project share one read, so many
+        long-polling clients waking at once cost a single query. Returns
+        None if `fetch` finds no project.
+        """
+        entry = self.get_status(project_id)
+        if entry is not None:
+            return entry
+        key = str(project_id)
+        task = self._status_loads.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load_status(project_id, fetch))
+            self._status_loads[key] = task
+            task.add_done_callback(lambda _: self._status_loads.pop(key, None))
+        # A caller giving up must not cancel the read for the others
+        return await asyncio.shield(task)
+
+    async def _load_status(
+        self,
+        project_id: UUID,
+        fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[_StatusEntry]:
+        project = await fetch()
+        if project is None:
+            return None
+        return self.set_status(project_id, self._status_from_project(project), ttl=settings.STATUS_CACHE_TTL)
+
+    async def wait_for_status_change(self, project_id: UUID, etag: str, timeout: float) -> None:
+        """Wait until the project's cached status no longer matches `etag`, or `timeout` passes."""
+        key = str(project_id)
+        entry = self.project_status.get(key)
+        if entry is not None and entry.etag != etag:
+            return
+        event = self._status_changed.setdefault(key, asyncio.Event())
+        self._status_waiters[key] += 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._status_waiters[key] -= 1
+            if not self._status_waiters[key]:
+                del self._status_waiters[key]
+                if self._status_changed.get(key) is event:
+                    del self._status_changed[key]
+
+    @staticmethod
+    def _status_from_update(update: AgentProgressUpdate) -> ProjectStatus:
+        metadata = update.metadata or {}
+        if metadata.get("total"):
+            stage_progress = metadata.get("completed", 0) / metadata["total"]
+        else:
+            stage_progress = 1.0 if update.status == AgentStatus.COMPLETED else 0.0
+        return ProjectStatus(
+            current_agent=update.agent_type,
+            overall_progress=update.progress,
+            stage_progress=stage_progress,
+            status_message=update.message,
+            last_update=datetime.now(timezone.utc)
+        )
+
+    @staticmethod
+    def _status_from_project(project: Dict[str, Any]) -> ProjectStatus:
+        """Status of a project not generating in this process, from its `status` and `updated_at` columns."""
+        agent, progress = _STAGE_BY_STATUS.get(project["status"], ("initializing", 0.0))
+        return ProjectStatus(
+            current_agent=agent,
+            overall_progress=progress,
+            stage_progress=1.0 if project["status"] == AgentStatus.COMPLETED.value else 0.0,
+            status_message=f"Project is in {project['status']} state",
+            last_update=project["updated_at"]
+        )
+
+    def broadcast_update(self, project_id: UUID, update: AgentProgressUpdate, publish: bool = True) -> None:
+        """Broadcast a progress update to all connected clients.
+
+        Never awaits a client: the update is serialized once and handed to each
+        subscriber's queue, and clients that cannot keep up are dropped. With
+        `publish`, the update is also sent to the other workers.
+        """
+        key = str(project_id)
+        data = update.model_dump(mode="json")
+        message = json.dumps(data)
+        if publish:
+            event_bus.publish(PROGRESS_CHANNEL, {"project_id": key, "update": data})
+        self.set_status(project_id, self._status_from_update(update))
+
+        state = self.latest.setdefault(key, OrderedDict())
+        state.pop(update.agent_type, None)
+        state[update.agent_type] = message
+        self.latest.move_to_end(key)
+        if len(self.latest) > settings.PROGRESS_STATE_SIZE:
+            self.latest.popitem(last=False)
+
+        for subscriber in list(self.active_connections.get(key, ())):
+            if not subscriber.offer(update.agent_type, message):
+                logger.warning("Dropping slow progress subscriber for project %s", key)
+                self._drop(key, subscriber)
+
+    async def subscribe(self, project_id: UUID, websocket: WebSocket) -> None:
+        """Serve progress updates to an accepted websocket until it disconnects."""
+        key = str(project_id)
+        subscriber = _Subscriber(websocket)
+        for agent_type, message in self.latest.get(key, {}).items():
+            subscriber.offer(agent_type, message)
+        self.active_connections[key].add(subscriber)
+
+        sender = asyncio.create_task(self._send_loop(key, subscriber))
+        try:
+            # Keep reading so disconnects are noticed; client messages are ignored
+            while not subscriber.closed:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        finally:
+            self._drop(key, subscriber)
+            sender.cancel()
+
+    async def _send_loop(self, key: str, subscriber: _Subscriber) -> None:
+        while not subscriber.closed:
+            await subscriber.wakeup.wait()
+            subscriber.wakeup.clear()
+            while subscriber.pending:
+                _, message = subscriber.pending.popitem(last=False)
+                subscriber.sending_since = time.monotonic()
+                try:
+                    await asyncio.wait_for(
+                        subscriber.websocket.send_text(message),
+                        settings.PROGRESS_SEND_TIMEOUT
+                    )
+                except Exception as e:
+                    logger.warning("Dropping progress subscriber for project %s: %s", key, str(e) or type(e).__name__)
+                    self._drop(key, subscriber)
+                    return
+                subscriber.sending_since = None
+
+    def _drop(self, key: str, subscriber: _Subscriber) -> None:
+        if subscriber.closed:
+            return
+        subscriber.closed = True
+        subscriber.wakeup.set()
+        connections = self.active_connections.get(key)
+        if connections is not None:
+            connections.discard(subscriber)
+            if not connections:
+                del self.active_connections[key]
+        task = asyncio.create_task(self._close(subscriber.websocket))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(), settings.PROGRESS_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+progress_manager = ProgressManager()
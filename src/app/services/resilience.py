@@ -0,0 +1,407 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from contextlib import contextmanager, AsyncExitStack
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Callable, Awaitable, AsyncIterator, AsyncContextManager, TypeVar
+import httpx
+from ..core.config import get_settings
+from ..core.exceptions import AIGenerationError
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Reserves capacity for a hedge request: yields its attempt function, or None if there is none to spare
+HedgeLane = Callable[[], AsyncContextManager[Optional[Callable[["Attempt"], Awaitable[T]]]]]
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+class CircuitOpenError(AIGenerationError):
+    """Raised when a model's circuit breaker is rejecting calls."""
+    pass
+
+class DeadlineExceeded(AIGenerationError):
+    """Raised when the current deadline leaves no time for another attempt."""
+    pass
+
+# Absolute (monotonic) deadline for model calls made in the current context
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """Bound all model calls (including retries) inside the block; nested deadlines only tighten."""
+    if seconds is None:
+        yield
+        return
+    current = _deadline.get()
+    new = time.monotonic() + seconds
+    token = _deadline.set(new if current is None else min(current, new))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None when unbounded."""
+    current = _deadline.get()
+    return None if current is None else current - time.monotonic()
+
+def time_budget(timeout: float) -> float:
+    """Cap an attempt's timeout by the current deadline."""
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Deadline exceeded before the model call could complete")
+    return min(timeout, left)
+
+def _status(exc: BaseException) -> Optional[int]:
+    return getattr(exc, "status_code", None)
+
+def _is_timeout(exc: BaseException) -> bool:
+    from anthropic import APITimeoutError
+    return isinstance(exc, (asyncio.TimeoutError, APITimeoutError))
+
+def _is_connection_failure(exc: BaseException) -> bool:
+    # Imported here so that importing this module does not load the SDK
+    from anthropic import APIConnectionError
+    return isinstance(exc, (asyncio.TimeoutError, APIConnectionError, httpx.TransportError))
+
+def is_retryable(exc: BaseException) -> bool:
+    if _is_connection_failure(exc):
+        return True
+    return _status(exc) in RETRYABLE_STATUS
+
+def is_server_failure(exc: BaseException) -> bool:
+    """Failures that count against a model's health (rate limiting and client errors do not)."""
+    if _is_connection_failure(exc):
+        return True
+    status = _status(exc)
+    return status is not None and status >= 500
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Server-requested delay from a `retry-after` / `retry-after-ms` header, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+# Why the policy cancelled an attempt
+TIMED_OUT = "timeout"
+
+class Attempt:
+    """One try of a model call, handed to the attempt function by the policy.
+
+    The policy sets `cancelled_for` before it cancels the attempt itself, so
+    the attempt can tell its own timeout apart from a lost hedge race or a
+    caller that went away.
+    """
+
+    def __init__(self, number: int, hedge: bool = False):
+        self.number = number
+        self.hedge = hedge
+        self.cancelled_for: Optional[str] = None
+
+    def outcome(self, error: Optional[BaseException]) -> str:
+        """Metric label for how the attempt ended: ok, error, timeout or cancelled."""
+        if error is None:
+            return "ok"
+        if isinstance(error, (asyncio.CancelledError, GeneratorExit)):
+            return "timeout" if self.cancelled_for == TIMED_OUT else "cancelled"
+        if _is_timeout(error):
+            return "timeout"
+        return "error"
+
+async def _cancel(task: asyncio.Future) -> None:
+    """Cancel `task` and wait until it has finished unwinding."""
+    task.cancel()
+    await asyncio.wait({task})
+    if not task.cancelled():
+        # Finished before the cancellation landed; retrieve the outcome so it is not reported as lost
+        task.exception()
+
+async def _run(attempt: Attempt, work: Awaitable[T], timeout: float) -> T:
+    """Await `work` in its own task for at most `timeout` seconds.
+
+    Like asyncio.wait_for, but the attempt is marked as timed out before it
+    is cancelled, so its outcome is recorded as a timeout rather than a
+    cancellation.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        await _cancel(task)
+        raise
+    if not done:
+        attempt.cancelled_for = TIMED_OUT
+        await _cancel(task)
+        raise asyncio.TimeoutError()
+    return task.result()
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            # Half-open: let one probe through per reset interval
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+class LatencyTracker:
+    def __init__(self, size: int = 200):
+        self.samples: deque = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < settings.ANTHROPIC_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(p * (len(ordered) - 1))]
+
+class ModelCallPolicy:
+    """Timeouts, retries with jittered backoff, per-model circuit breaking and hedging for model calls."""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(
+                settings.ANTHROPIC_BREAKER_THRESHOLD,
+                settings.ANTHROPIC_BREAKER_RESET
+            )
+        return self._breakers[model]
+
+    def latency(self, model: str) -> LatencyTracker:
+        if model not in self._latency:
+            self._latency[model] = LatencyTracker()
+        return self._latency[model]
+
+    def check(self, model: str) -> None:
+        """Raise CircuitOpenError while the model's circuit is open, without using up a half-open probe."""
+        if self.breaker(model).state == "open":
+            raise CircuitOpenError(f"Model {model} is unavailable (circuit open)")
+
+    def _admit(self, model: str) -> CircuitBreaker:
+        breaker = self.breaker(model)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Model {model} is unavailable (circuit open)")
+        return breaker
+
+    @staticmethod
+    def _record(breaker: CircuitBreaker, exc: BaseException, deadline_bound: bool = False) -> None:
+        """Count a failed attempt against the model's health.
+
+        A timeout of an attempt whose budget was cut short by the caller's
+        deadline says nothing about the model, so it is not counted.
+        """
+        if deadline_bound and isinstance(exc, asyncio.TimeoutError):
+            return
+        if is_server_failure(exc):
+            breaker.record_failure()
+        elif _status(exc) is not None:
+            # The model answered, just not successfully for this request
+            breaker.record_success()
+
+    @staticmethod
+    def _retry_delay(exc: BaseException, attempt: int) -> Optional[float]:
+        """Delay before the next attempt, or None if the call should not be retried."""
+        if not is_retryable(exc) or attempt >= settings.ANTHROPIC_MAX_RETRIES:
+            return None
+        # Capped exponential backoff with full jitter, never sooner than the server asked
+        delay = random.uniform(0, min(
+            settings.ANTHROPIC_RETRY_MAX_DELAY,
+            settings.ANTHROPIC_RETRY_BASE_DELAY * 2 ** attempt
+        ))
+        requested = retry_after(exc)
+        if requested is not None:
+            delay = max(delay, requested)
+        left = remaining()
+        if left is not None and delay >= left:
+            return None
+        return delay
+
+    async def call(
+        self,
+        model: str,
+        attempt: Callable[[Attempt], Awaitable[T]],
+        timeout: float,
+        hedge: Optional[HedgeLane] = None
+    ) -> T:
+        """Run `attempt` until it succeeds, retrying transient failures within the current deadline.
+
+        `attempt` must only make the HTTP request: anything it waits on locally
+        (queues, semaphores) would count towards the timeout, the latency
+        percentiles and the circuit breaker. Slow attempts are hedged with the
+        attempt function `hedge` yields, if one is given.
+        """
+        for attempt_number in itertools.count():
+            budget = time_budget(timeout)
+            breaker = self._admit(model)
+            current = Attempt(attempt_number)
+            try:
+                if hedge is not None:
+                    result = await self._hedged(model, attempt, hedge, current, budget)
+                else:
+                    result = await _run(current, self._timed(model, attempt, current), budget)
+            except Exception as e:
+                self._record(breaker, e, deadline_bound=budget < timeout)
+                delay = self._retry_delay(e, attempt_number)
+                if delay is None:
+                    raise
+                logger.warning("Model call to %s failed (%r); retrying in %.2fs", model, e, delay)
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
+
+    async def stream(self, model: str, open_stream: Callable[[Attempt], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Relay a stream, cutting it off when idle; retried only if it fails before the first item.
+
+        As with `call`, `open_stream` must not wait on local queues.
+        """
+        for attempt_number in itertools.count():
+            time_budget(settings.ANTHROPIC_STREAM_IDLE_TIMEOUT)
+            breaker = self._admit(model)
+            current = Attempt(attempt_number)
+            stream = open_stream(current)
+            started = False
+            budget = settings.ANTHROPIC_STREAM_IDLE_TIMEOUT
+            try:
+                while True:
+                    budget = time_budget(settings.ANTHROPIC_STREAM_IDLE_TIMEOUT)
+                    try:
+                        item = await _run(current, stream.__anext__(), budget)
+                    except StopAsyncIteration:
+                        break
+                    started = True
+                    yield item
+            except Exception as e:
+                self._record(breaker, e, deadline_bound=budget < settings.ANTHROPIC_STREAM_IDLE_TIMEOUT)
+                delay = None if started else self._retry_delay(e, attempt_number)
+                if delay is None:
+                    raise
+                logger.warning("Stream from %s failed before its first event (%r); retrying in %.2fs", model, e, delay)
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                await stream.aclose()
+            breaker.record_success()
+            return
+
+    async def _timed(self, model: str, attempt: Callable[[Attempt], Awaitable[T]], current: Attempt) -> T:
+        started = time.monotonic()
+        result = await attempt(current)
+        self.latency(model).record(time.monotonic() - started)
+        return result
+
+    async def _hedged(
+        self,
+        model: str,
+        attempt: Callable[[Attempt], Awaitable[T]],
+        hedge: HedgeLane,
+        first: Attempt,
+        budget: float
+    ) -> T:
+        """Send a second request if the first is slower than the model's hedge percentile; first success wins.
+
+        The hedge runs in the lane `hedge` reserves, and is skipped when the
+        lane has no capacity to spare. The slower request is cancelled, and
+        recorded as cancelled rather than failed.
+        """
+        hedge_after = self.latency(model).percentile(settings.ANTHROPIC_HEDGE_PERCENTILE)
+        if hedge_after is None or hedge_after >= budget:
+            return await _run(first, self._timed(model, attempt, first), budget)
+
+        ends_at = time.monotonic() + budget
+        tasks = {asyncio.ensure_future(self._timed(model, attempt, first)): first}
+        pending = set(tasks)
+        # Entered only if the call is hedged, and left once the hedge request has finished
+        async with AsyncExitStack() as lane:
+            try:
+                done, pending = await asyncio.wait(pending, timeout=hedge_after)
+                if not done:
+                    hedge_attempt = await lane.enter_async_context(hedge())
+                    if hedge_attempt is None:
+                        logger.debug("Not hedging call to %s: no spare slot or tokens", model)
+                    else:
+                        logger.info("Hedging call to %s after %.2fs", model, hedge_after)
+                        second = Attempt(first.number, hedge=True)
+                        hedge_task = asyncio.ensure_future(self._timed(model, hedge_attempt, second))
+                        tasks[hedge_task] = second
+                        pending.add(hedge_task)
+
+                error: Optional[BaseException] = None
+                while True:
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        error = task.exception()
+                    if not pending:
+                        raise error
+                    done, pending = await asyncio.wait(
+                        pending,
+                        timeout=max(ends_at - time.monotonic(), 0),
+                        return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        for task in pending:
+                            tasks[task].cancelled_for = TIMED_OUT
+                        raise asyncio.TimeoutError()
+            finally:
+                # Losers are waited for, so their outcome is recorded before the call returns
+                await asyncio.gather(*(_cancel(task) for task in tasks if not task.done()))
+
+    def stats(self) -> Dict[str, Any]:
+        """Circuit state and recent latency percentiles per model."""
+        return {
+            model: {
+                "circuit": self.breaker(model).state,
+                "consecutive_failures": self.breaker(model).failures,
+                "p50_seconds": self.latency(model).percentile(0.5),
+                "p95_seconds": self.latency(model).percentile(0.95)
+            }
+            for model in set(self._breakers) | set(self._latency)
+        }
+
+model_call_policy = ModelCallPolicy()
@@ -0,0 +1,93 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+from ..core.config import get_settings
+
+settings = get_settings()
+
+def normalize_input(user_input: Any) -> str:
+    """Normalize agent input so equivalent requests share a cache key."""
+    if isinstance(user_input, str):
+        return " ".join(user_input.split())
+    return json.dumps(user_input, sort_keys=True, separators=(",", ":"), default=str)
+
+class ResponseCache:
+    """Memoize agent responses in an in-memory LRU with TTL, plus an optional disk tier."""
+
+    def __init__(self, max_entries: int, ttl: int, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        agent_type: str,
+        prompt_key: str,
+        prompt_version: str,
+        normalized_input: str,
+        model: str,
+        temperature: float
+    ) -> str:
+        raw = json.dumps(
+            [agent_type, prompt_key, prompt_version, normalized_input, model, temperature],
+            separators=(",", ":")
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _remember(self, key: str, expires_at: float, value: str) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, str]]:
+        try:
+            with open(self._disk_path(key), "r") as f:
+                entry = json.load(f)
+            return entry["expires_at"], entry["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, expires_at: float, value: str) -> None:
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"expires_at": expires_at, "value": value}, f)
+        os.replace(tmp_path, path)
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+            del self._entries[key]
+
+        if self.disk_dir:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None and entry[0] > now:
+                self._remember(key, *entry)
+                return entry[1]
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        expires_at = time.time() + self.ttl
+        self._remember(key, expires_at, value)
+        if self.disk_dir:
+            await asyncio.to_thread(self._write_disk, key, expires_at, value)
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_SIZE,
+    ttl=settings.RESPONSE_CACHE_TTL,
+    disk_dir=settings.RESPONSE_CACHE_DIR
+)
@@ -0,0 +1,217 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+from ..core.config import get_settings
+
+settings = get_settings()
+
+# Request priorities; lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Fairness flow for model calls made in the current context (e.g. "project:<id>")
+current_flow: ContextVar[str] = ContextVar("current_flow", default="default")
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate used for budgeting before the real usage is known."""
+    return len(text) // 4 + 1
+
+class TokenBucket:
+    def __init__(self, tokens_per_minute: int):
+        self.capacity = float(tokens_per_minute)
+        self.rate = tokens_per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (requests above capacity wait for a full bucket)."""
+        self._refill()
+        needed = min(amount, self.capacity) - self.tokens
+        return max(needed / self.rate, 0.0)
+
+    def take(self, amount: float) -> None:
+        """Consume tokens; the balance may go negative when actual usage exceeds the estimate."""
+        self._refill()
+        self.tokens -= amount
+
+class Grant:
+    __slots__ = ("model", "flow", "priority", "input_tokens", "output_tokens",
+                 "start_tag", "finish_tag", "enqueued_at", "future", "cancelled")
+
+    def __init__(self, model: str, flow: str, priority: int, input_tokens: int, output_tokens: int):
+        self.model = model
+        self.flow = flow
+        self.priority = priority
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.start_tag = 0.0
+        self.finish_tag = 0.0
+        self.enqueued_at = time.monotonic()
+        self.future: Optional[asyncio.Future] = None
+        self.cancelled = False
+
+class _ModelQueue:
+    def __init__(self, input_per_minute: int, output_per_minute: int):
+        self.input_bucket = TokenBucket(input_per_minute)
+        self.output_bucket = TokenBucket(output_per_minute)
+        self.heap: List[Tuple[int, float, int, Grant]] = []
+        self.virtual_time = 0.0
+        self.flow_finish: Dict[str, float] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.granted = 0
+        self.wait_ewma = 0.0
+        self.wait_max = 0.0
+
+class TokenScheduler:
+    """Admit model calls against per-model input/output token budgets.
+
+    Requests wait in a per-model queue ordered by priority (interactive before
+    background), then by weighted fair queuing tags per flow, so a single
+    project or user cannot starve the others.
+    """
+
+    def __init__(self):
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, model: str) -> _ModelQueue:
+        if model not in self._queues:
+            limits = settings.ANTHROPIC_RATE_LIMITS.get(model, {})
+            self._queues[model] = _ModelQueue(
+                limits.get("input", settings.ANTHROPIC_INPUT_TOKENS_PER_MINUTE),
+                limits.get("output", settings.ANTHROPIC_OUTPUT_TOKENS_PER_MINUTE)
+            )
+        return self._queues[model]
+
+    async def acquire(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        flow: Optional[str] = None,
+        priority: int = BACKGROUND,
+        weight: float = 1.0
+    ) -> Grant:
+        """Wait until the call fits the model's token budget and it is this request's turn."""
+        queue = self._queue(model)
+        grant = Grant(model, flow or current_flow.get(), priority, input_tokens, output_tokens)
+
+        # Weighted fair queuing: each flow's requests are tagged by cumulative cost / weight
+        grant.start_tag = max(queue.virtual_time, queue.flow_finish.get(grant.flow, 0.0))
+        grant.finish_tag = grant.start_tag + (input_tokens + output_tokens) / weight
+        queue.flow_finish[grant.flow] = grant.finish_tag
+
+        grant.future = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue.heap, (priority, grant.finish_tag, next(self._seq), grant))
+        queue.waiting[priority] += 1
+        self._pump(model)
+        try:
+            await grant.future
+        except asyncio.CancelledError:
+            if not grant.future.done() or grant.future.cancelled():
+                grant.cancelled = True
+                queue.waiting[priority] -= 1
+            else:
+                self.release(grant, 0, 0)
+            raise
+        return grant
+
+    def try_acquire(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        flow: Optional[str] = None,
+        priority: int = BACKGROUND,
+        weight: float = 1.0
+    ) -> Optional[Grant]:
+        """Take the call's budget now, or return None if it would have to wait.
+
+        Never jumps the queue: while any request is waiting, nothing is granted.
+        """
+        queue = self._queue(model)
+        if queue.waiting[INTERACTIVE] or queue.waiting[BACKGROUND]:
+            return None
+        if queue.input_bucket.wait_time(input_tokens) > 0 or queue.output_bucket.wait_time(output_tokens) > 0:
+            return None
+        grant = Grant(model, flow or current_flow.get(), priority, input_tokens, output_tokens)
+        grant.start_tag = max(queue.virtual_time, queue.flow_finish.get(grant.flow, 0.0))
+        grant.finish_tag = grant.start_tag + (input_tokens + output_tokens) / weight
+        queue.flow_finish[grant.flow] = grant.finish_tag
+        queue.input_bucket.take(input_tokens)
+        queue.output_bucket.take(output_tokens)
+        queue.virtual_time = max(queue.virtual_time, grant.start_tag)
+        self._record_wait(queue, 0.0)
+        return grant
+
+    def release(self, grant: Grant, input_tokens: int, output_tokens: int) -> None:
+        """Reconcile the budget with the call's actual token usage."""
+        queue = self._queue(grant.model)
+        queue.input_bucket.take(input_tokens - grant.input_tokens)
+        queue.output_bucket.take(output_tokens - grant.output_tokens)
+        self._pump(grant.model)
+
+    def _pump(self, model: str) -> None:
+        queue = self._queues[model]
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+
+        while queue.heap:
+            grant = queue.heap[0][3]
+            if grant.cancelled:
+                heapq.heappop(queue.heap)
+                continue
+            wait = max(
+                queue.input_bucket.wait_time(grant.input_tokens),
+                queue.output_bucket.wait_time(grant.output_tokens)
+            )
+            if wait > 0:
+                queue.timer = asyncio.get_running_loop().call_later(wait, self._pump, model)
+                return
+
+            heapq.heappop(queue.heap)
+            queue.input_bucket.take(grant.input_tokens)
+            queue.output_bucket.take(grant.output_tokens)
+            queue.virtual_time = max(queue.virtual_time, grant.start_tag)
+            queue.waiting[grant.priority] -= 1
+            self._record_wait(queue, time.monotonic() - grant.enqueued_at)
+            grant.future.set_result(None)
+
+        # Forget flows that have gone idle
+        if len(queue.flow_finish) > 10000:
+            queue.flow_finish = {
+                flow: finish for flow, finish in queue.flow_finish.items() if finish > queue.virtual_time
+            }
+
+    @staticmethod
+    def _record_wait(queue: _ModelQueue, wait: float) -> None:
+        queue.granted += 1
+        queue.wait_ewma = wait if queue.granted == 1 else 0.9 * queue.wait_ewma + 0.1 * wait
+        queue.wait_max = max(queue.wait_max, wait)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, wait times and remaining budget per model."""
+        return {
+            model: {
+                "queued_interactive": queue.waiting[INTERACTIVE],
+                "queued_background": queue.waiting[BACKGROUND],
+                "granted": queue.granted,
+                "avg_wait_seconds": round(queue.wait_ewma, 4),
+                "max_wait_seconds": round(queue.wait_max, 4),
+                "input_tokens_available": int(queue.input_bucket.tokens),
+                "output_tokens_available": int(queue.output_bucket.tokens)
+            }
+            for model, queue in self._queues.items()
+        }
+
+token_scheduler = TokenScheduler()
@@ -1,25 +1,36 @@
-from supabase import create_client, Client
+from typing import Optional, TYPE_CHECKING
 from ..core.config import get_settings
+from ..core.exceptions import DatabaseError
+
+if TYPE_CHECKING:
+    from supabase import AsyncClient
 
 settings = get_settings()
 
-def get_supabase_client() -> Client:
-    """Initialize and return regular Supabase client."""
-    return create_client(
-        settings.SUPABASE_URL,
-        settings.SUPABASE_KEY
-    )
+_client: Optional["AsyncClient"] = None
+
+async def init_supabase() -> "AsyncClient":
+    """Create the shared async Supabase client used for auth (GoTrue) calls."""
+    global _client
+    if _client is None:
+        # Deferred so that importing the app does not pull in the Supabase SDK
+        from supabase import acreate_client
+        _client = await acreate_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_KEY
+        )
+    return _client
 
-def get_service_role_client() -> Client:
-    """Initialize and return Supabase client with service role key."""
-    return create_client(
-        settings.SUPABASE_URL,
-        settings.SUPABASE_SERVICE_ROLE_KEY
-    )
+async def close_supabase() -> None:
+    """Drop the shared async Supabase client."""
+    global _client
+    _client = None
 
-# Initialize both clients
-supabase = get_supabase_client()
-service_role_client = get_service_role_client()
+def get_supabase_client() -> "AsyncClient":
+    """Return the shared async Supabase client (anon key)."""
+    if _client is None:
+        raise DatabaseError("Supabase client is not initialized")
+    return _client
 
-# Export all necessary functions and instances
-__all__ = ['supabase', 'service_role_client', 'get_supabase_client', 'get_service_role_client'] 
\ No newline at end of file
+# Export all necessary functions
+__all__ = ['init_supabase', 'close_supabase', 'get_supabase_client']
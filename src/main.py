@@ -1,13 +1,48 @@
 import uvicorn
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.openapi.utils import get_openapi
+from fastapi.responses import ORJSONResponse
 from app.api.v1.router import router as v1_router
-from app.core.config import debug_env
-from app.models.auth import UserLogin, LoginResponse, UserResponse, UserProfileResponse
-from app.models.schemas import ProjectStatus, ProjectCreate, ProjectResponse
-from app.models.responses import HTTPError, HTTPValidationError, ValidationErrorDetail
-from app.models.chat import MessageCreate, MessageResponse, ConversationCreate, ConversationResponse
+from app.api.middleware import MetricsMiddleware
+from app.api.openapi import load_openapi
+from app.core.metrics import render_metrics, CONTENT_TYPE_LATEST
+from app.core.config import debug_env, get_settings
+from app.core.logs import configure_logging, shutdown_logging
+from app.core.tracing import configure_tracing, shutdown_tracing
+from app.services.anthropic_service import anthropic_service
+from app.services.database import database
+from app.services.supabase import init_supabase, close_supabase
+from app.services.job_queue import generation_workers
+from app.services.events import event_bus
+
+settings = get_settings()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging(
+        settings.LOG_LEVEL,
+        settings.LOG_FORMAT,
+        queue_size=settings.LOG_QUEUE_SIZE,
+        debug_sample_rate=settings.LOG_DEBUG_SAMPLE_RATE,
+        sample_rates=settings.LOG_SAMPLE_RATES
+    )
+    configure_tracing(settings.TRACE_EXPORTER, settings.TRACE_FILE)
+    # Clients are created here rather than at import, so importing the app has no side effects
+    await database.connect()
+    await anthropic_service.connect()
+    await init_supabase()
+    await event_bus.connect()
+    await generation_workers.start()
+    yield
+    await generation_workers.stop()
+    await event_bus.close()
+    # Release pooled connections on shutdown
+    await close_supabase()
+    await database.close()
+    await anthropic_service.close()
+    shutdown_tracing()
+    shutdown_logging()
 
 app = FastAPI(
     title="Devoo API",
@@ -26,73 +61,16 @@ app = FastAPI(
             "name": "chat",
             "description": "Chat operations"
         }
-    ]
+    ],
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Define custom OpenAPI schema
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-    
-    openapi_schema = get_openapi(
-        title="Devoo API",
-        version="1.0.0",
-        description="AI-powered software development assistant",
-        routes=app.routes,
-    )
-    
-    # Add security scheme and components
-    openapi_schema["components"] = {
-        "securitySchemes": {
-            "Bearer": {
-                "type": "http",
-                "scheme": "bearer",
-                "bearerFormat": "JWT",
-                "description": "Enter the token you received from the login endpoint"
-            }
-        },
-        "schemas": {}
-    }
-
-    # Add model schemas
-    schemas = openapi_schema["components"]["schemas"]
-    
-    # Add validation error detail schema
-    validation_error_schema = ValidationErrorDetail.model_json_schema()
-    schemas["ValidationErrorDetail"] = validation_error_schema
-    
-    # Add HTTP error schema
-    http_error_schema = HTTPError.model_json_schema()
-    schemas["HTTPError"] = http_error_schema
-    
-    # Add HTTP validation error schema
-    validation_error_schema = HTTPValidationError.model_json_schema()
-    schemas["HTTPValidationError"] = validation_error_schema
-    
-    # Auth models
-    schemas["UserLogin"] = UserLogin.model_json_schema()
-    schemas["UserProfileResponse"] = UserProfileResponse.model_json_schema()
-    schemas["LoginResponse"] = LoginResponse.model_json_schema()
-    
-    # Project models
-    schemas["ProjectCreate"] = ProjectCreate.model_json_schema()
-    schemas["ProjectResponse"] = ProjectResponse.model_json_schema()
-    schemas["ProjectStatus"] = ProjectStatus.model_json_schema()
-    
-    # Chat models
-    schemas["MessageCreate"] = MessageCreate.model_json_schema()
-    schemas["MessageResponse"] = MessageResponse.model_json_schema()
-    schemas["ConversationCreate"] = ConversationCreate.model_json_schema()
-    schemas["ConversationResponse"] = ConversationResponse.model_json_schema()
-    
-    # Add global security requirement
-    openapi_schema["security"] = [{"Bearer": []}]
-    
-    app.openapi_schema = openapi_schema
-    return app.openapi_schema
+def openapi():
+    return load_openapi(app, settings.OPENAPI_FILE)
 
-# Set custom OpenAPI schema
-app.openapi = custom_openapi
+# Load the schema exported at build time instead of generating it in every worker
+app.openapi = openapi
 
 # CORS middleware configuration
 app.add_middleware(
@@ -103,11 +81,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so it times everything including CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Include API router
 app.include_router(v1_router, prefix="/api/v1")
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus metrics for requests, database queries and model calls"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     print("\n=== Environment Configuration ===")
     debug_env()
     print("\n=== Starting Server ===")
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, log_config=None) 
\ No newline at end of file
@@ -0,0 +1,48 @@
+import asyncio
+import signal
+from app.core.config import get_settings
+from app.core.logs import configure_logging, shutdown_logging
+from app.core.tracing import configure_tracing, shutdown_tracing
+from app.services.anthropic_service import anthropic_service
+from app.services.database import database
+from app.services.events import event_bus
+from app.services.job_queue import GenerationWorkerPool
+from app.services.agent_system import agent_coordinator
+
+settings = get_settings()
+
+async def main():
+    """Run generation workers outside the web process."""
+    configure_logging(
+        settings.LOG_LEVEL,
+        settings.LOG_FORMAT,
+        queue_size=settings.LOG_QUEUE_SIZE,
+        debug_sample_rate=settings.LOG_DEBUG_SAMPLE_RATE,
+        sample_rates=settings.LOG_SAMPLE_RATES
+    )
+    configure_tracing(settings.TRACE_EXPORTER, settings.TRACE_FILE)
+    await database.connect()
+    await anthropic_service.connect()
+    await event_bus.connect()
+    pool = GenerationWorkerPool(
+        db=database,
+        coordinator=agent_coordinator,
+        concurrency=max(settings.GENERATION_WORKERS, 1)
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await pool.start()
+    print(f"\n=== Generation worker started ({pool.concurrency} workers) ===")
+    await stop.wait()
+    await pool.stop()
+    await event_bus.close()
+    await database.close()
+    await anthropic_service.close()
+    shutdown_tracing()
+    shutdown_logging()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,6 @@
+-- Composite index for keyset pagination of messages on (created_at, id)
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_created_id
+    ON public.messages(conversation_id, created_at, id);
+
+-- Superseded by the composite index above (it covers conversation_id lookups)
+DROP INDEX IF EXISTS public.idx_messages_conversation_id;
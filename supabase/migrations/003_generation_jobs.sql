@@ -0,0 +1,58 @@
+-- Durable queue of project generation jobs, claimed by workers with SKIP LOCKED
+CREATE TABLE public.generation_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    project_id UUID REFERENCES public.projects(id) ON DELETE CASCADE NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    checkpoints JSONB NOT NULL DEFAULT '{}'::jsonb,  -- Output of each finished stage, keyed by stage
+    payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+    error TEXT,
+    locked_by TEXT,
+    locked_at TIMESTAMP WITH TIME ZONE,
+    run_after TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX idx_generation_jobs_project_id ON public.generation_jobs(project_id);
+CREATE INDEX idx_generation_jobs_claimable
+    ON public.generation_jobs(run_after, created_at)
+    WHERE status IN ('queued', 'running');
+
+ALTER TABLE public.generation_jobs ENABLE ROW LEVEL SECURITY;
+
+CREATE TRIGGER update_generation_jobs_updated_at
+    BEFORE UPDATE ON public.generation_jobs
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+-- Atomically claim the next runnable job. Jobs whose worker stopped renewing
+-- its lease are reclaimed so a crashed generation resumes from its checkpoints.
+CREATE OR REPLACE FUNCTION public.claim_generation_job(p_worker_id TEXT, p_lease_seconds INT)
+RETURNS SETOF public.generation_jobs AS $$
+BEGIN
+    -- Give up on jobs that keep losing their lease
+    UPDATE public.generation_jobs
+    SET status = 'failed', error = 'Lease expired after max attempts', locked_by = NULL
+    WHERE status = 'running'
+        AND locked_at < NOW() - make_interval(secs => p_lease_seconds)
+        AND attempts >= max_attempts;
+
+    RETURN QUERY
+    UPDATE public.generation_jobs AS j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_by = p_worker_id,
+        locked_at = NOW()
+    WHERE j.id = (
+        SELECT id FROM public.generation_jobs
+        WHERE (status = 'queued' AND run_after <= NOW())
+            OR (status = 'running' AND locked_at < NOW() - make_interval(secs => p_lease_seconds))
+        ORDER BY run_after, created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING j.*;
+END;
+$$ LANGUAGE plpgsql;
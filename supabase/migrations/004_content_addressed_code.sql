@@ -0,0 +1,33 @@
+-- Generated file contents stored once per SHA-256 content hash
+CREATE TABLE public.code_blobs (
+    hash TEXT PRIMARY KEY,
+    content TEXT NOT NULL,
+    size INT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE public.code_blobs ENABLE ROW LEVEL SECURITY;
+
+-- Versions hold a manifest of path -> blob hash instead of full file contents
+ALTER TABLE public.code_versions ADD COLUMN manifest JSONB;
+ALTER TABLE public.code_versions ALTER COLUMN files DROP NOT NULL;
+
+-- Move existing versions over to blobs + manifests
+INSERT INTO public.code_blobs (hash, content, size)
+SELECT DISTINCT
+    encode(sha256(convert_to(f.value #>> '{}', 'UTF8')), 'hex'),
+    f.value #>> '{}',
+    octet_length(convert_to(f.value #>> '{}', 'UTF8'))
+FROM public.code_versions v, jsonb_each(v.files) f
+WHERE v.files IS NOT NULL
+ON CONFLICT (hash) DO NOTHING;
+
+UPDATE public.code_versions v
+SET manifest = COALESCE((
+        SELECT jsonb_object_agg(f.key, encode(sha256(convert_to(f.value #>> '{}', 'UTF8')), 'hex'))
+        FROM jsonb_each(v.files) f
+    ), '{}'::jsonb),
+    files = NULL
+WHERE v.manifest IS NULL AND v.files IS NOT NULL;
+
+CREATE UNIQUE INDEX idx_code_versions_project_version ON public.code_versions(project_id, version);
@@ -0,0 +1,6 @@
+-- Rolling summary of older turns, kept per conversation so replies only send recent messages.
+-- summarized_until_* is the (created_at, id) keyset position of the last message folded in.
+ALTER TABLE public.conversations
+    ADD COLUMN summary TEXT,
+    ADD COLUMN summarized_until_created_at TIMESTAMP WITH TIME ZONE,
+    ADD COLUMN summarized_until_id UUID;
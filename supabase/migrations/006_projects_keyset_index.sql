@@ -0,0 +1,6 @@
+-- Composite index for listing a user's projects by recency, keyset-paginated on (updated_at desc, id)
+CREATE INDEX IF NOT EXISTS idx_projects_user_updated_id
+    ON public.projects(user_id, updated_at DESC, id);
+
+-- Superseded by the composite index above (it covers user_id lookups)
+DROP INDEX IF EXISTS public.idx_projects_user_id;
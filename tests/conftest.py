@@ -0,0 +1,158 @@
+"""Shared fixtures: the app's services running against the offline fakes in benchmarks/.
+
+The fake Supabase and Anthropic servers run as subprocesses, so the only
+work on the test's event loop is the app's own.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+
+import httpx
+import pytest
+import pytest_asyncio
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCHMARKS = ROOT / "benchmarks"
+JWT_SECRET = "test-secret"
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+SUPABASE_URL = f"http://127.0.0.1:{_free_port()}"
+ANTHROPIC_URL = f"http://127.0.0.1:{_free_port()}"
+
+# A real Postgres for tests that need one (LISTEN/NOTIFY); the app itself runs without it
+POSTGRES_URL: Optional[str] = os.environ.get("DATABASE_URL") or None
+
+# Settings are read once, when app modules are first imported
+os.environ.update({
+    "SUPABASE_URL": SUPABASE_URL,
+    "SUPABASE_KEY": "test-anon-key",
+    "SUPABASE_SERVICE_ROLE_KEY": "test-service-role-key",
+    "SUPABASE_JWT_TOKEN": JWT_SECRET,
+    "ANTHROPIC_API_KEY": "test-anthropic-key",
+    "ANTHROPIC_BASE_URL": ANTHROPIC_URL,
+    "PERPLEXITY_API_KEY": "test-perplexity-key",
+    "DATABASE_URL": "",
+    "GENERATION_WORKERS": "0"
+})
+sys.path.insert(0, str(ROOT / "src"))
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            httpx.get(f"{url}/stats")
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Fake server at {url} did not start")
+
+@pytest.fixture(scope="session")
+def fakes():
+    """Run the fake Supabase and Anthropic servers for the whole session."""
+    processes = [
+        subprocess.Popen([
+            sys.executable, str(BENCHMARKS / "fake_supabase.py"),
+            "--port", SUPABASE_URL.rsplit(":", 1)[1],
+            "--jwt-secret", JWT_SECRET
+        ]),
+        subprocess.Popen([
+            sys.executable, str(BENCHMARKS / "fake_anthropic.py"),
+            "--port", ANTHROPIC_URL.rsplit(":", 1)[1],
+            "--latency-ms", "5",
+            "--jitter-ms", "0",
+            "--tokens-per-second", "2000",
+            "--reply-words", "20"
+        ])
+    ]
+    try:
+        _wait_ready(SUPABASE_URL, processes[0])
+        _wait_ready(ANTHROPIC_URL, processes[1])
+        yield
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+@asynccontextmanager
+async def app_services():
+    """Connect the app's clients as the lifespan does, and close them afterwards."""
+    from app.services.anthropic_service import anthropic_service
+    from app.services.database import database
+    from app.services.events import event_bus
+    from app.services.supabase import init_supabase, close_supabase
+
+    await database.connect()
+    await anthropic_service.connect()
+    await init_supabase()
+    await event_bus.connect()
+    try:
+        yield
+    finally:
+        await event_bus.close()
+        await close_supabase()
+        await database.close()
+        await anthropic_service.close()
+
+@pytest_asyncio.fixture
+async def services(fakes):
+    async with app_services():
+        yield
+
+async def script_model(*calls: dict) -> None:
+    """Script how the fake model answers its next calls (see benchmarks/fake_anthropic.py)."""
+    async with httpx.AsyncClient() as client:
+        response = await client.post(f"{ANTHROPIC_URL}/script", json={"calls": list(calls)})
+        response.raise_for_status()
+
+async def model_calls() -> int:
+    """Requests the fake model has received so far."""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{ANTHROPIC_URL}/stats")
+        return response.json()["calls"]
+
+async def model_requests() -> List[Dict[str, Any]]:
+    """Bodies of the most recent requests the fake model received."""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{ANTHROPIC_URL}/requests")
+        return response.json()
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes a short sleeper.
+
+    Anything that blocks the loop (synchronous I/O, long CPU work) delays
+    the wake-up by as long as it runs, so `max_lag` is the longest stall.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, loop.time() - started - self.interval)
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self._task = asyncio.create_task(self._run())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
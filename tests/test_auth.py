@@ -0,0 +1,40 @@
+import asyncio
+import uuid
+
+import httpx
+import pytest
+from jose import jwt
+
+from conftest import SUPABASE_URL
+from app.core.exceptions import AuthenticationError
+from app.core.security import token_verifier
+from app.models.auth import UserSignUp, UserLogin
+from app.services.auth import auth_service
+
+PASSWORD = "test-password"
+
+async def _login() -> str:
+    email = f"user-{uuid.uuid4().hex[:12]}@example.com"
+    await auth_service.sign_up(UserSignUp(email=email, password=PASSWORD, full_name="Test User"))
+    return (await auth_service.login(UserLogin(email=email, password=PASSWORD))).access_token
+
+async def _signed_out_sessions() -> set:
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{SUPABASE_URL}/stats")
+    return {logout["session_id"] for logout in response.json()["logouts"]}
+
+@pytest.mark.asyncio
+async def test_logout_ends_only_the_callers_session(services):
+    # Logins share one Supabase client, so the client's stored session is whoever logged in last
+    tokens = await asyncio.gather(*[_login() for _ in range(6)])
+    leaving, staying = tokens[:5], tokens[5]
+    before = await _signed_out_sessions()
+
+    await asyncio.gather(*[auth_service.logout(token) for token in leaving])
+
+    signed_out = await _signed_out_sessions() - before
+    assert signed_out == {jwt.get_unverified_claims(token)["session_id"] for token in leaving}
+    for token in leaving:
+        with pytest.raises(AuthenticationError):
+            token_verifier.verify(token)
+    assert token_verifier.verify(staying)["sub"] == jwt.get_unverified_claims(staying)["sub"]
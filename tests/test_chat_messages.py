@@ -0,0 +1,45 @@
+import pytest
+
+from app.models.chat import ConversationCreate, MessageCreate, MessageBatchCreate
+from app.services.chat import chat_service
+from app.services.database import database
+
+async def _conversation():
+    project = await database.projects.create({
+        "name": "Batch order project",
+        "requirements": "Build a todo list",
+        "status": "initialized"
+    })
+    return await chat_service.create_conversation(ConversationCreate(project_id=project["id"]))
+
+@pytest.mark.asyncio
+async def test_message_batch_reads_back_in_insertion_order(services):
+    conversation = await _conversation()
+    contents = [f"message {position}" for position in range(50)]
+
+    created = await chat_service.create_messages(
+        conversation.id,
+        MessageBatchCreate(messages=[MessageCreate(content=content) for content in contents])
+    )
+    page = await chat_service.get_messages(conversation.id, limit=100)
+
+    assert [message.content for message in created] == contents
+    assert [message.content for message in page.messages] == contents
+
+@pytest.mark.asyncio
+async def test_message_batch_pages_in_insertion_order(services):
+    conversation = await _conversation()
+    await chat_service.create_message(conversation.id, MessageCreate(content="before the batch"))
+    contents = [f"message {position}" for position in range(20)]
+    await chat_service.create_messages(
+        conversation.id,
+        MessageBatchCreate(messages=[MessageCreate(content=content) for content in contents])
+    )
+
+    page = await chat_service.get_messages(conversation.id, limit=7)
+    read = [message.content for message in page.messages]
+    while page.has_more:
+        page = await chat_service.get_messages(conversation.id, limit=7, before=page.before)
+        read = [message.content for message in page.messages] + read
+
+    assert read == ["before the batch"] + contents
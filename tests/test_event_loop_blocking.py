@@ -0,0 +1,74 @@
+import asyncio
+import gc
+import uuid
+
+import pytest
+
+from conftest import LoopLagMonitor
+from app.models.auth import UserSignUp, UserLogin, LoginResponse
+from app.models.chat import ConversationCreate, MessageCreate
+from app.services.auth import auth_service
+from app.services.chat import chat_service
+from app.services.database import database
+
+PASSWORD = "test-password"
+# Longest acceptable stall of the event loop while the flows run
+MAX_LOOP_LAG = 0.005
+
+def _email() -> str:
+    return f"user-{uuid.uuid4().hex[:12]}@example.com"
+
+async def _signup_and_login() -> LoginResponse:
+    email = _email()
+    await auth_service.sign_up(UserSignUp(email=email, password=PASSWORD, full_name="Test User"))
+    return await auth_service.login(UserLogin(email=email, password=PASSWORD))
+
+async def _start_conversation(user_id: str) -> uuid.UUID:
+    project = await database.projects.create({
+        "name": "Loop lag project",
+        "requirements": "Build a todo list",
+        "status": "initialized",
+        "user_id": user_id
+    })
+    conversation = await chat_service.create_conversation(ConversationCreate(project_id=project["id"]))
+    return conversation.id
+
+async def _chat_turn(conversation_id: uuid.UUID, user_id: str) -> None:
+    await chat_service.create_message(conversation_id, MessageCreate(content="How should I structure the state?"))
+    history = await chat_service.build_prompt(conversation_id, user_id)
+    events = [event async for event in chat_service.stream_reply(conversation_id, history, user_id)]
+    assert events[-1]["event"] == "done", events[-1]
+    await chat_service.get_messages(conversation_id)
+    await chat_service.get_conversation(conversation_id)
+
+async def _measure(flow) -> float:
+    gc.collect()
+    async with LoopLagMonitor() as monitor:
+        await flow
+    return monitor.max_lag
+
+@pytest.mark.asyncio
+async def test_auth_flow_does_not_block_event_loop(services):
+    # Warm up first: one-time imports and client setup are not what this test is about
+    await _signup_and_login()
+
+    async def flow():
+        logins = await asyncio.gather(*[_signup_and_login() for _ in range(10)])
+        await asyncio.gather(*[auth_service.logout(login.access_token) for login in logins])
+
+    max_lag = await _measure(flow())
+    assert max_lag < MAX_LOOP_LAG, f"event loop stalled for {max_lag * 1000:.1f}ms during auth"
+
+@pytest.mark.asyncio
+async def test_chat_flow_does_not_block_event_loop(services):
+    login = await _signup_and_login()
+    user_id = str(login.user.id)
+    conversations = [await _start_conversation(user_id) for _ in range(5)]
+    await _chat_turn(conversations[0], user_id)
+
+    async def flow():
+        for _ in range(3):
+            await asyncio.gather(*[_chat_turn(conversation, user_id) for conversation in conversations])
+
+    max_lag = await _measure(flow())
+    assert max_lag < MAX_LOOP_LAG, f"event loop stalled for {max_lag * 1000:.1f}ms during chat"
@@ -0,0 +1,58 @@
+import asyncio
+import uuid
+
+import pytest
+
+from conftest import POSTGRES_URL
+from app.services.events import EventBus
+
+pytestmark = pytest.mark.skipif(POSTGRES_URL is None, reason="DATABASE_URL not set")
+
+DELIVERY_TIMEOUT = 5.0
+
+async def _connected(*buses: EventBus) -> None:
+    for bus in buses:
+        await bus.connect()
+
+async def _closed(*buses: EventBus) -> None:
+    for bus in buses:
+        await bus.close()
+
+@pytest.mark.asyncio
+async def test_event_published_on_one_bus_reaches_another():
+    channel = f"test_{uuid.uuid4().hex}"
+    sender, receiver = EventBus(POSTGRES_URL), EventBus(POSTGRES_URL)
+    received = asyncio.get_running_loop().create_future()
+    receiver.subscribe(channel, received.set_result)
+    # The publisher skips its own events, so it must not see this one
+    echoed = []
+    sender.subscribe(channel, echoed.append)
+
+    await _connected(sender, receiver)
+    try:
+        sender.publish(channel, {"project_id": "p1", "progress": 0.5})
+        payload = await asyncio.wait_for(received, DELIVERY_TIMEOUT)
+    finally:
+        await _closed(sender, receiver)
+
+    assert payload == {"project_id": "p1", "progress": 0.5}
+    assert echoed == []
+
+@pytest.mark.asyncio
+async def test_invalidation_reaches_handlers_of_its_kind():
+    sender, receiver = EventBus(POSTGRES_URL), EventBus(POSTGRES_URL)
+    key = uuid.uuid4().hex
+    received = asyncio.get_running_loop().create_future()
+    receiver.on_invalidate("projects", lambda payload: payload["key"] == key and received.set_result(payload))
+    other_kinds = []
+    receiver.on_invalidate("tokens", other_kinds.append)
+
+    await _connected(sender, receiver)
+    try:
+        sender.invalidate("projects", key, reason="updated")
+        payload = await asyncio.wait_for(received, DELIVERY_TIMEOUT)
+    finally:
+        await _closed(sender, receiver)
+
+    assert payload == {"kind": "projects", "key": key, "reason": "updated"}
+    assert [payload for payload in other_kinds if payload["key"] == key] == []
@@ -0,0 +1,261 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+import pytest_asyncio
+from prometheus_client import REGISTRY
+
+from conftest import script_model, model_calls
+from app.core.config import get_settings
+from app.core.exceptions import AIGenerationError
+from app.core.tracing import SpanExporter, set_exporter
+from app.services.anthropic_service import anthropic_service
+from app.services.resilience import model_call_policy, deadline, CircuitOpenError
+
+SYSTEM_PROMPT = "Answer briefly."
+
+@pytest_asyncio.fixture
+async def model(services, monkeypatch):
+    """A model name of its own, so breaker and latency state start fresh, with fast policy settings."""
+    settings = get_settings()
+    for name, value in {
+        "ANTHROPIC_CALL_TIMEOUT": 1.0,
+        "ANTHROPIC_STREAM_IDLE_TIMEOUT": 0.3,
+        "ANTHROPIC_MAX_RETRIES": 2,
+        "ANTHROPIC_RETRY_BASE_DELAY": 0.01,
+        "ANTHROPIC_RETRY_MAX_DELAY": 0.05,
+        "ANTHROPIC_BREAKER_THRESHOLD": 2,
+        "ANTHROPIC_BREAKER_RESET": 0.5,
+        "ANTHROPIC_HEDGE_PERCENTILE": 0.5,
+        "ANTHROPIC_HEDGE_MIN_SAMPLES": 5
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    yield f"test-model-{uuid.uuid4().hex[:8]}"
+    await script_model()
+
+def outcomes(model: str, stage: str) -> dict:
+    """Attempts recorded on devoo_model_call_duration_seconds, by outcome."""
+    return {
+        outcome: REGISTRY.get_sample_value(
+            "devoo_model_call_duration_seconds_count",
+            {"model": model, "stage": stage, "outcome": outcome}
+        ) or 0
+        for outcome in ("ok", "error", "timeout", "cancelled")
+    }
+
+async def generate(model: str, stage: str = "test", **kwargs) -> str:
+    return await anthropic_service.generate_response(
+        system_prompt=SYSTEM_PROMPT,
+        user_message="Hello",
+        model=model,
+        max_tokens=50,
+        stage=stage,
+        **kwargs
+    )
+
+def stream(model: str, stage: str = "test"):
+    return anthropic_service.stream_response(
+        system_prompt=SYSTEM_PROMPT,
+        user_message="Hello",
+        model=model,
+        max_tokens=50,
+        stage=stage
+    )
+
+def warm_latency(model: str, seconds: float = 0.05) -> None:
+    """Give the model a latency history, so hedging has a percentile to go by."""
+    for _ in range(get_settings().ANTHROPIC_HEDGE_MIN_SAMPLES):
+        model_call_policy.latency(model).record(seconds)
+
+@pytest.mark.asyncio
+async def test_policy_timeouts_are_recorded_as_timeouts(model, monkeypatch):
+    monkeypatch.setattr(get_settings(), "ANTHROPIC_MAX_RETRIES", 0)
+
+    await script_model({"latency_ms": 3000})
+    with pytest.raises(AIGenerationError):
+        await generate(model, stage="call-timeout", hedge=False)
+    assert outcomes(model, "call-timeout") == {"ok": 0, "error": 0, "timeout": 1, "cancelled": 0}
+
+    await script_model({"stall_after": 2, "stall_ms": 3000})
+    received = []
+    with pytest.raises(AIGenerationError):
+        async for text in stream(model, stage="stream-idle"):
+            received.append(text)
+    assert len(received) == 2
+    assert outcomes(model, "stream-idle") == {"ok": 0, "error": 0, "timeout": 1, "cancelled": 0}
+
+@pytest.mark.asyncio
+async def test_client_disconnect_is_recorded_as_cancelled(model):
+    # The consumer stops reading after the first delta
+    replies = stream(model, stage="closed")
+    await replies.__anext__()
+    await replies.aclose()
+    assert outcomes(model, "closed") == {"ok": 0, "error": 0, "timeout": 0, "cancelled": 1}
+
+    # The request task is cancelled mid-stream, as when a client drops an SSE connection
+    started = asyncio.Event()
+
+    async def consume():
+        async for _ in stream(model, stage="disconnected"):
+            started.set()
+
+    await script_model({"stall_after": 1, "stall_ms": 3000})
+    task = asyncio.create_task(consume())
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert outcomes(model, "disconnected") == {"ok": 0, "error": 0, "timeout": 0, "cancelled": 1}
+
+@pytest.mark.asyncio
+async def test_hedge_loser_is_recorded_as_cancelled(model):
+    warm_latency(model)
+    await script_model({"latency_ms": 3000}, {"latency_ms": 0})
+
+    assert await generate(model, stage="hedged", hedge=True)
+    assert outcomes(model, "hedged") == {"ok": 1, "error": 0, "timeout": 0, "cancelled": 1}
+
+@pytest.mark.asyncio
+async def test_retry_waits_as_long_as_the_server_asks(model):
+    await script_model({"status": 529, "retry_after": 0.3}, {})
+    calls = await model_calls()
+    started = time.monotonic()
+    assert await generate(model, hedge=False)
+    assert time.monotonic() - started >= 0.3
+    assert await model_calls() == calls + 2
+
+    # retry-after-ms is more precise, so it takes precedence
+    await script_model({"status": 429, "retry_after": 5, "retry_after_ms": 200}, {})
+    started = time.monotonic()
+    assert await generate(model, hedge=False)
+    assert 0.2 <= time.monotonic() - started < 5
+    assert await model_calls() == calls + 4
+
+@pytest.mark.asyncio
+async def test_no_retry_when_the_deadline_is_too_short(model):
+    await script_model({"status": 529, "retry_after": 2}, {})
+    calls = await model_calls()
+    started = time.monotonic()
+    with deadline(0.5), pytest.raises(AIGenerationError):
+        await generate(model, hedge=False)
+    assert time.monotonic() - started < 0.5
+    assert await model_calls() == calls + 1
+
+@pytest.mark.asyncio
+async def test_breaker_opens_then_lets_a_single_probe_through(model, monkeypatch):
+    monkeypatch.setattr(get_settings(), "ANTHROPIC_MAX_RETRIES", 0)
+    breaker = model_call_policy.breaker(model)
+
+    await script_model({"status": 500}, {"status": 500})
+    for _ in range(2):
+        with pytest.raises(AIGenerationError):
+            await generate(model, hedge=False)
+    assert breaker.state == "open"
+
+    # Rejected without reaching the model
+    calls = await model_calls()
+    with pytest.raises(CircuitOpenError):
+        await generate(model, hedge=False)
+    assert await model_calls() == calls
+
+    await asyncio.sleep(get_settings().ANTHROPIC_BREAKER_RESET)
+    assert breaker.state == "half_open"
+    await script_model({"latency_ms": 200})
+    results = await asyncio.gather(
+        generate(model, hedge=False),
+        generate(model, hedge=False),
+        return_exceptions=True
+    )
+    assert sum(isinstance(result, str) for result in results) == 1
+    assert sum(isinstance(result, CircuitOpenError) for result in results) == 1
+    assert await model_calls() == calls + 1
+    assert breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_breaker_ignores_client_errors_and_deadline_bound_timeouts(model):
+    breaker = model_call_policy.breaker(model)
+
+    await script_model(*[{"status": 400}] * 3)
+    for _ in range(3):
+        with pytest.raises(AIGenerationError):
+            await generate(model, hedge=False)
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+    # The caller's deadline cut these attempts short; the model may be fine
+    await script_model(*[{"latency_ms": 2000}] * 3)
+    for _ in range(3):
+        with deadline(0.2), pytest.raises(AIGenerationError):
+            await generate(model, hedge=False)
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_after_the_latency_percentile(model):
+    warm_latency(model)
+    await script_model({"latency_ms": 3000}, {"latency_ms": 0})
+    calls = await model_calls()
+
+    started = time.monotonic()
+    assert await generate(model, stage="hedge-wins", hedge=True)
+    assert time.monotonic() - started < 1
+    assert await model_calls() == calls + 2
+    assert outcomes(model, "hedge-wins") == {"ok": 1, "error": 0, "timeout": 0, "cancelled": 1}
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_a_spare_slot(model, monkeypatch):
+    monkeypatch.setattr(anthropic_service, "_global_limit", asyncio.Semaphore(1))
+    warm_latency(model)
+    await script_model({"latency_ms": 300}, {"latency_ms": 0})
+    calls = await model_calls()
+
+    assert await generate(model, stage="hedge-saturated", hedge=True)
+    assert await model_calls() == calls + 1
+    assert outcomes(model, "hedge-saturated") == {"ok": 1, "error": 0, "timeout": 0, "cancelled": 0}
+
+@pytest.mark.asyncio
+async def test_stream_is_retried_only_before_its_first_event(model, monkeypatch):
+    monkeypatch.setattr(get_settings(), "ANTHROPIC_BREAKER_THRESHOLD", 5)
+    # Failing or idle before the first event: retried
+    await script_model({"status": 529}, {"latency_ms": 2000}, {})
+    calls = await model_calls()
+    assert [text async for text in stream(model)]
+    assert await model_calls() == calls + 3
+
+    # Idle after the first event: cut off and not retried, as the consumer already has part of the reply
+    await script_model({"stall_after": 1, "stall_ms": 2000})
+    received = []
+    started = time.monotonic()
+    with pytest.raises(AIGenerationError):
+        async for text in stream(model):
+            received.append(text)
+    assert len(received) == 1
+    assert time.monotonic() - started < 1
+    assert await model_calls() == calls + 4
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+@pytest.mark.asyncio
+async def test_each_attempt_is_traced_under_its_call(model):
+    exporter = ListExporter()
+    set_exporter(exporter)
+    try:
+        warm_latency(model)
+        await script_model({"status": 529}, {"latency_ms": 3000}, {"latency_ms": 0})
+        assert await generate(model, hedge=True)
+    finally:
+        set_exporter(None)
+
+    [call] = [span for span in exporter.spans if span["name"] == "model.call"]
+    attempts = [span for span in exporter.spans if span["name"] == "model.attempt"]
+    assert all(span["parent_id"] == call["span_id"] for span in attempts)
+    assert sorted(
+        (span["attributes"]["attempt"], span["attributes"]["hedge"], span["attributes"]["outcome"])
+        for span in attempts
+    ) == [(0, False, "error"), (1, False, "cancelled"), (1, True, "ok")]
@@ -0,0 +1,27 @@
+import uuid
+
+import pytest
+
+from app.core.pagination import encode_cursor, decode_cursor, keyset_filter
+
+def test_cursor_round_trips():
+    row_id = str(uuid.uuid4())
+    cursor = encode_cursor("2026-10-18T12:00:00.123456+00:00", row_id)
+    assert decode_cursor(cursor) == ("2026-10-18T12:00:00.123456+00:00", row_id)
+
+@pytest.mark.parametrize("sort_value, row_id", [
+    # Filter syntax smuggled into either half of the position
+    ('2026-10-18T12:00:00+00:00",user_id.neq."x', str(uuid.uuid4())),
+    ("2026-10-18T12:00:00+00:00", "00000000-0000-0000-0000-000000000000),user_id.neq.(x"),
+    ("yesterday", str(uuid.uuid4())),
+    ("2026-10-18T12:00:00+00:00", "42")
+])
+def test_cursor_rejects_anything_but_a_timestamp_and_uuid(sort_value, row_id):
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(sort_value, row_id))
+    with pytest.raises(ValueError):
+        keyset_filter("created_at", sort_value, row_id, op="gt")
+
+def test_garbage_cursor_is_invalid():
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
@@ -0,0 +1,46 @@
+import json
+import uuid
+
+import pytest
+
+from conftest import model_requests
+from app.services.agent_system import ImplementationAgent
+
+def _architecture(marker: str, files: int) -> dict:
+    return {
+        "component_hierarchy": [
+            {"name": "App", "type": "page", "children": ["Header", "TodoList"]},
+            {"name": "Header", "type": "component", "children": []},
+            {"name": "TodoList", "type": "component", "children": []}
+        ],
+        "folder_structure": {"src/components": [f"Component{i}.tsx" for i in range(files)]},
+        "data_flow": f"Props flow from App to its children ({marker})"
+    }
+
+async def _unit_requests(marker: str) -> list:
+    return [body for body in await model_requests() if marker in json.dumps(body["system"])]
+
+@pytest.mark.asyncio
+async def test_implementation_units_share_a_cached_prefix(services):
+    marker = uuid.uuid4().hex
+    await ImplementationAgent().generate_code(_architecture(marker, files=400))
+
+    requests = await _unit_requests(marker)
+    assert len(requests) == 3
+    for body in requests:
+        instructions, architecture = body["system"]
+        assert "cache_control" not in instructions
+        assert architecture["cache_control"] == {"type": "ephemeral"}
+        # The architecture is in the cached prefix only, not repeated per unit
+        assert marker not in json.dumps(body["messages"])
+    # Byte-identical across units, so every unit after the first reads the cache
+    assert all(body["system"] == requests[0]["system"] for body in requests)
+
+@pytest.mark.asyncio
+async def test_prefix_below_the_cache_minimum_is_not_marked(services):
+    marker = uuid.uuid4().hex
+    await ImplementationAgent().generate_code(_architecture(marker, files=3))
+
+    requests = await _unit_requests(marker)
+    assert len(requests) == 3
+    assert all(isinstance(body["system"], str) for body in requests)